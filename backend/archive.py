@@ -0,0 +1,28 @@
+import zipfile
+from io import BytesIO
+from typing import Dict
+
+
+def build_zip(files: Dict[str, str]) -> bytes:
+    """Empaqueta {ruta dentro del ZIP: contenido} en un archivo ZIP en memoria."""
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for path, content in files.items():
+            zip_file.writestr(path, content)
+    return zip_buffer.getvalue()
+
+
+def payload_scripts(payload: dict) -> Dict[str, str]:
+    """
+    Extrae los scripts no vacíos de una respuesta del pipeline como {tipo: contenido}.
+    Acepta tanto valores directos (script_221) como listas (script_222, script_add, ...).
+    """
+    scripts = {}
+    for key, value in payload.items():
+        if not key.startswith('script_'):
+            continue
+        if isinstance(value, list):
+            value = value[0] if value else ""
+        if value:
+            scripts[key[len('script_'):]] = value
+    return scripts
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+
+def _today() -> str:
+    """Fecha del día como la escriben los generadores (adiciones de MB22)."""
+    return time.strftime("%d.%m.%Y")
+
+
+def make_cache_key(endpoint: str, digest: str, *params) -> str:
+    """
+    Clave de caché: endpoint + hash del archivo subido (calculado al leerlo) + hash de los
+    parámetros del formulario y de la fecha del día. Se usa repr de la tupla para que valores
+    que contienen el separador o que se ven iguales como texto (None y "None", 1 y "1") no
+    compartan clave; la fecha porque los scripts de adición la llevan escrita, y un resultado
+    de ayer no sirve hoy.
+    """
+    params_digest = hashlib.sha256(repr((*params, _today())).encode()).hexdigest()
+    return f"{endpoint}|{digest}|{params_digest}"
+
+
+class _ComputeCancelled(Exception):
+    """El cálculo en curso que esperaba una petición se canceló (se desconectó quien lo inició)."""
+
+
+class ResultCache:
+    """
+    Caché LRU con TTL para los resultados de generación de scripts.
+
+    Las peticiones idénticas que llegan mientras el resultado se está calculando
+    esperan el mismo cálculo en curso en lugar de repetirlo.
+    """
+    def __init__(self, max_entries: int = 32, ttl_seconds: float = 600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expira_en, valor)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Retorna el valor en caché o lo calcula una sola vez aunque haya peticiones concurrentes."""
+        if self.max_entries <= 0:
+            return await compute()
+
+        while True:
+            value = self._get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(in_flight)
+            except _ComputeCancelled:
+                # Se canceló la petición que calculaba, no esta: se vuelve a buscar y, si nadie
+                # más tomó el cálculo, esta petición lo hace
+                continue
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await compute()
+        except BaseException as e:
+            # La cancelación es de quien inició el cálculo; los que esperan no la reciben
+            future.set_exception(_ComputeCancelled() if isinstance(e, asyncio.CancelledError) else e)
+            # Evita el aviso de "exception was never retrieved" si nadie más esperaba
+            future.exception()
+            raise
+        else:
+            self._put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Caché compartida por el API, configurable por variables de entorno
+result_cache = ResultCache(
+    max_entries=int(os.getenv("SAP_CACHE_MAX_ENTRIES", "32")),
+    ttl_seconds=float(os.getenv("SAP_CACHE_TTL_SECONDS", "600")),
+)
@@ -1,110 +1,501 @@
-import pandas as pd
+from __future__ import annotations
+
+import codecs
+import json
+import os
 from io import BytesIO
+from operator import itemgetter
+
+from .lazy import lazy_import
+from .ledger import LEDGER_KEY_COLUMNS, RowLedger
+from .metrics import logger
+from .partition import partition
+
+# pandas, numpy y openpyxl se importan en el primer uso (backend/lazy.py)
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+openpyxl = lazy_import("openpyxl")
+
+# headers = ['PO','EECC','Localidad','PROYECTO','Tipo Solicitud','Codigo Material','Descripcion','Cantidad','Codigo Almacen','ELEMENTO PEP','IP','VR','SOLICITUD','Codigo destino mercancías','Gestor','Numero de registro','ESTADO']
+EMISIONES_HEADERS = ['PO','EECC','Localidad','MOV_SAP','Tipo Solicitud','Codigo Material','Descripcion','Cantidad','Codigo Almacen','ELEMENTO PEP','IP','VR','SOLICITUD','Codigo destino mercancías','Gestor','Numero de registro','ESTADO']
+# headers = ['SVR','PO','IP','EECC','PROYECTO','POS','Codigo Material','Descripcion','Cantidad','TIPO SOLICITUD REAL','Tipo Solicitud','VR','VD','Codigo Almacen','ELEMENTO PEP','Observacion','Codigo destino mercancías','ESTADO','FECHA DE ATENCION','GESTOR','N°']
+SOLICITUDES_HEADERS = ['SVR','PO','IP','EECC','MOV_SAP','POS','Codigo Material','Descripcion','Cantidad','TIPO SOLICITUD REAL','Tipo Solicitud','VR','VD','Codigo Almacen','ELEMENTO PEP','Observacion','Codigo destino mercancías','ESTADO','FECHA DE ATENCION','GESTOR','N°']
+
+# Columnas que realmente consumen los generadores (modo streaming)
+EMISIONES_COLUMNS = ['PO','EECC','MOV_SAP','Tipo Solicitud','Codigo Material','Cantidad','Codigo Almacen','ELEMENTO PEP','IP','VR','Numero de registro','ESTADO']
+SOLICITUDES_COLUMNS = ['SVR','PO','IP','EECC','MOV_SAP','POS','Codigo Material','Cantidad','Tipo Solicitud','VR','Codigo Almacen','ELEMENTO PEP','ESTADO','N°']
+
+# Argumentos de _read_pending_rows para cada plantilla: hoja, headers, índice de ESTADO, columnas usadas
+EMISIONES_LAYOUT = ("Sheet1", EMISIONES_HEADERS, 16, EMISIONES_COLUMNS)
+SOLICITUDES_LAYOUT = ("DETALLE", SOLICITUDES_HEADERS, 17, SOLICITUDES_COLUMNS)
+
+# Emisiones divididas por proyecto: la cuarta columna trae el PROYECTO en lugar del movimiento
+EMISIONES_PROJECT_HEADERS = [('PROYECTO' if col == 'MOV_SAP' else col) for col in EMISIONES_HEADERS]
+EMISIONES_PROJECT_COLUMNS = [('PROYECTO' if col == 'MOV_SAP' else col) for col in EMISIONES_COLUMNS]
+EMISIONES_PROJECT_LAYOUT = ("Sheet1", EMISIONES_PROJECT_HEADERS, 16, EMISIONES_PROJECT_COLUMNS)
+
+# Plantilla de Emisiones según cómo se dividen en 221/201 (split_by de la petición)
+EMISIONES_LAYOUTS = {
+    'movement': EMISIONES_LAYOUT,
+    'project': EMISIONES_PROJECT_LAYOUT,
+}
+
+# Tipo final de cada columna, común a las plantillas de Emisiones y Solicitudes:
+#   int       entero (lo que no es numérico queda en 0)
+#   int_str   entero escrito como texto, tal como va en el script
+#   str       texto
+#   category  texto/número de pocos valores distintos
+#   almacen   código de almacén con 4 dígitos ('0004'), categórica
+COLUMN_SCHEMA = {
+    'VR': 'int',
+    'POS': 'int',
+    'Codigo Material': 'int_str',
+    'Cantidad': 'int_str',
+    'Codigo Almacen': 'almacen',
+    'ELEMENTO PEP': 'str',
+    'Tipo Solicitud': 'category',
+    'MOV_SAP': 'category',
+    'ESTADO': 'category',
+    'PROYECTO': 'category',
+}
+
+# Formatos de entrada aceptados por extensión
+SUPPORTED_EXTENSIONS = ('.xlsx', '.csv', '.parquet')
+
+# Filas enviadas directamente por el cliente (sin archivo): tipo de contenido -> formato
+RECORDS_CONTENT_TYPES = {
+    'application/json': 'json',
+    'application/vnd.apache.arrow.stream': 'arrow',
+}
+
+# Marca de continuación con la que empieza cada mensaje de un stream IPC de Arrow
+ARROW_STREAM_MARKER = b'\xff\xff\xff\xff'
+
+# dtypes explícitos para el parser C de CSV: todo texto salvo los enteros que se comparan como números.
+# Las columnas numéricas de COLUMN_SCHEMA (Cantidad, VR, POS, ...) las infiere el parser y se
+# terminan de convertir en la limpieza, sin volver a interpretar texto.
+CSV_INT_COLUMNS = ['MOV_SAP', 'Numero de registro', 'N°']
+
+
+# Lectores de hojas .xlsx (modo streaming), del más rápido al más compatible:
+#   calamine  lector en Rust (python-calamine), si está instalado
+#   openpyxl  iterador read-only de openpyxl, fila por fila
+#   pandas    pd.read_excel con el motor por defecto (openpyxl), hoja completa
+EXCEL_READERS = ('calamine', 'openpyxl', 'pandas')
+
+# Lector por despliegue: 'auto' (el primero instalado de EXCEL_READERS) o uno de ellos.
+# Si el lector elegido no puede leer un archivo se prueban los siguientes.
+EXCEL_READER = os.getenv("SAP_EXCEL_READER", "auto")
+
+
+def excel_reader_chain(reader: str) -> tuple:
+    """Orden en que se prueban los lectores de .xlsx para el lector configurado."""
+    if reader == 'auto':
+        return EXCEL_READERS
+    if reader not in EXCEL_READERS:
+        raise ValueError(f"Lector de Excel desconocido: {reader}. Use auto o {', '.join(EXCEL_READERS)}")
+    return (reader, *[name for name in EXCEL_READERS if name != reader])
+
+
+def _csv_dtype(col: str):
+    """dtype de lectura CSV de una columna; None deja que el parser C lo infiera."""
+    if col in CSV_INT_COLUMNS:
+        return 'Int64'
+    if col == 'ESTADO':
+        # Se filtra antes de limpiar: basta con una categoría por estado
+        return 'category'
+    if COLUMN_SCHEMA.get(col) in ('int', 'int_str', 'almacen'):
+        return None
+    return 'str'
+
+
+class UnsupportedFormatError(ValueError):
+    """El contenido no es ninguno de los formatos que se leen (xlsx, CSV, Parquet, Arrow, JSON)."""
+
+
+def _is_text(head: bytes) -> bool:
+    """Los primeros bytes son texto UTF-8 (el último carácter puede venir cortado)."""
+    if b'\x00' in head:
+        return False
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_file_format(file_stream: BytesIO) -> str:
+    """
+    Detecta el formato por los primeros bytes: 'xlsx' (ZIP), 'parquet' (PAR1),
+    'arrow' (stream IPC), 'json' (lista de registros) o 'csv' (texto UTF-8).
+    Cualquier otro contenido (un .xls, un PDF renombrado) levanta UnsupportedFormatError.
+    """
+    position = file_stream.tell()
+    head = file_stream.read(64)
+    file_stream.seek(position)
+    if head.startswith(b'PK\x03\x04'):
+        return 'xlsx'
+    if head.startswith(b'PAR1'):
+        return 'parquet'
+    if head.startswith(ARROW_STREAM_MARKER):
+        return 'arrow'
+    if head.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'['):
+        return 'json'
+    if _is_text(head):
+        return 'csv'
+    raise UnsupportedFormatError("No se reconoce el formato del archivo. Suba un .xlsx, un CSV en UTF-8 o un .parquet")
+
+
+def _records_columns(names: list, headers: list, columns: list) -> dict:
+    """
+    Columna recibida -> header de la plantilla, solo para las columnas usadas.
+    Si llegan con los nombres de la plantilla se toman por nombre; si no, por posición
+    (igual que los headers de la plantilla Excel).
+    """
+    names = list(names)
+    if all(col in names for col in columns):
+        return {col: col for col in columns}
+    return {names[headers.index(col)]: col for col in columns if headers.index(col) < len(names)}
+
+
+def _excel_value(value):
+    """Normaliza una celda de openpyxl igual que lo hace pd.read_excel."""
+    if value is None:
+        return float('nan')
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _calamine_value(value):
+    """Normaliza una celda de calamine, que deja las celdas vacías como ''."""
+    if value == '':
+        return float('nan')
+    return _excel_value(value)
+
+
+def _key_part(series: pd.Series) -> np.ndarray:
+    """Valores de una columna de la clave como texto; los números sin decimales (10402551067.0 y '10402551067' son lo mismo)."""
+    numbers = pd.to_numeric(series, errors='coerce')
+    text = series.astype(str).to_numpy(dtype=object)
+    present = numbers.notna().to_numpy()
+    text[present] = numbers[present].astype('int64').astype(str).to_numpy()
+    return text
+
+
+def row_keys(df: pd.DataFrame, kind: str) -> list:
+    """
+    Clave de cada fila para el registro incremental: 'n:<registro>:<material>' en Emisiones
+    y 'n:<registro>:<posición>:<material>' en Solicitudes (LEDGER_KEY_COLUMNS), porque un
+    número de registro se repite en todas las filas de su PO/VR. Si la misma combinación
+    aparece más de una vez, las repeticiones llevan '#<n>' en el orden del archivo. Las
+    filas sin número de registro usan 'h:<hash>' del contenido de las columnas leídas.
+    """
+    if df.empty:
+        return []
+    keys = np.empty(len(df), dtype=object)
+    missing = np.ones(len(df), dtype=bool)
+
+    number_column, *columns = LEDGER_KEY_COLUMNS[kind]
+    if number_column in df.columns:
+        numbers = pd.to_numeric(df[number_column], errors='coerce')
+        missing = numbers.isna().to_numpy()
+        present = ~missing
+        if present.any():
+            parts = pd.DataFrame({
+                col: _key_part(df[col].iloc[present])
+                for col in [number_column, *columns] if col in df.columns
+            })
+            joined = parts.iloc[:, 0]
+            for col in parts.columns[1:]:
+                joined = joined + ':' + parts[col]
+            repeats = parts.groupby(list(parts.columns), sort=False).cumcount().to_numpy()
+            keys[present] = [
+                f'n:{key}' if repeat == 0 else f'n:{key}#{repeat}'
+                for key, repeat in zip(joined.to_numpy(), repeats)
+            ]
+
+    if missing.any():
+        hashes = pd.util.hash_pandas_object(df[missing], index=False).to_numpy()
+        keys[missing] = ['h:%016x' % value for value in hashes]
+    return keys.tolist()
+
 
 class DataProcessor:
     """
-    Handles all data extraction and manipulation from Excel files.
+    Handles all data extraction and manipulation from Excel files (and CSV/Parquet exports
+    with the same column layout; the format is detected from the file content).
+
+    Con streaming=True la hoja se recorre fila por fila con el lector configurado
+    (reader, por defecto SAP_EXCEL_READER): solo se conservan las columnas usadas
+    por los generadores y las filas que no estan PENDIENTE se descartan mientras se leen.
     """
+    def __init__(self, streaming: bool = False, reader: str = None):
+        self.streaming = streaming
+        self.excel_readers = excel_reader_chain(reader or EXCEL_READER)
+        # Lector que leyó la última hoja .xlsx
+        self.excel_reader = None
+        # Filas de datos leídas de la hoja en la última carga (antes del filtro PENDIENTE)
+        self.rows_read = 0
+        # Filas pendientes descartadas en modo incremental por tener ya su script
+        self.rows_skipped = 0
+
+    def _apply_schema(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Deja cada columna de COLUMN_SCHEMA con su tipo final, en una sola pasada."""
+        converted = {}
+        for col, kind in COLUMN_SCHEMA.items():
+            if col not in df.columns:
+                continue
+            series = df[col]
+            if kind == 'category':
+                converted[col] = series.astype('category')
+            elif kind == 'str':
+                converted[col] = series.astype(str)
+            else:
+                numbers = pd.to_numeric(series, errors='coerce').fillna(0).astype(int)
+                if kind == 'int':
+                    converted[col] = numbers
+                elif kind == 'int_str':
+                    converted[col] = numbers.astype(str)
+                else:
+                    # 'almacen': pocas categorías, el relleno con ceros se hace sobre ellas y no fila por fila
+                    codes = pd.Categorical(numbers)
+                    converted[col] = codes.rename_categories(codes.categories.astype(str).str.zfill(4))
+        return df.assign(**converted)
+
+    def _stream_pending_rows(self, file_stream: BytesIO, sheet_name: str, headers: list, filter_column_index: int, columns: list) -> pd.DataFrame:
+        """Lee la hoja fila por fila y construye el DataFrame solo con las filas PENDIENTE."""
+        width = len(headers)
+        pick = itemgetter(*[headers.index(col) for col in columns])
+        rows = []
+        rows_read = 0
+
+        workbook = openpyxl.load_workbook(file_stream, read_only=True, data_only=True)
+        try:
+            for row in workbook[sheet_name].iter_rows(min_row=2, values_only=True):
+                rows_read += 1
+                if len(row) < width:
+                    row = row + (None,) * (width - len(row))
+                if row[filter_column_index] != "PENDIENTE":
+                    continue
+                rows.append([_excel_value(value) for value in pick(row)])
+        finally:
+            workbook.close()
+
+        self.rows_read = rows_read
+        return pd.DataFrame(rows, columns=columns)
+
+    def _calamine_pending_rows(self, file_stream: BytesIO, sheet_name: str, headers: list, filter_column_index: int, columns: list) -> pd.DataFrame:
+        """Igual que _stream_pending_rows, pero con el lector de calamine (python-calamine)."""
+        from python_calamine import CalamineWorkbook
+
+        width = len(headers)
+        pick = itemgetter(*[headers.index(col) for col in columns])
+        rows = []
+        rows_read = 0
+
+        sheet = CalamineWorkbook.from_filelike(file_stream).get_sheet_by_name(sheet_name)
+        # calamine empieza en la primera celda con datos; se completa hasta A1 como openpyxl
+        first_row, first_col = sheet.start or (0, 0)
+        skip = max(0, 1 - first_row)
+        prefix = ('',) * first_col
+        for row in sheet.iter_rows():
+            if skip:
+                skip -= 1
+                continue
+            rows_read += 1
+            row = (*prefix, *row)
+            if len(row) < width:
+                row = row + ('',) * (width - len(row))
+            if row[filter_column_index] != "PENDIENTE":
+                continue
+            rows.append([_calamine_value(value) for value in pick(row)])
+
+        self.rows_read = rows_read
+        return pd.DataFrame(rows, columns=columns)
+
+    def _pandas_pending_rows(self, file_stream: BytesIO, sheet_name: str, headers: list, filter_column_index: int, columns: list) -> pd.DataFrame:
+        """Lee la hoja completa con pd.read_excel y se queda con las filas PENDIENTE y las columnas usadas."""
+        df = pd.read_excel(file_stream, sheet_name=sheet_name, header=None, names=headers, skiprows=1)
+        self.rows_read = len(df)
+        return df.loc[df.iloc[:, filter_column_index] == "PENDIENTE", columns].reset_index(drop=True)
+
+    def _read_excel_pending_rows(self, file_stream: BytesIO, sheet_name: str, headers: list, filter_column_index: int, columns: list) -> pd.DataFrame:
+        """
+        Lee la hoja con el primer lector de la cadena que pueda hacerlo: los que no están
+        instalados se omiten y los que fallan con el archivo ceden al siguiente. Si ninguno
+        puede, se propaga el error del último (el más compatible).
+        """
+        readers = {
+            'calamine': self._calamine_pending_rows,
+            'openpyxl': self._stream_pending_rows,
+            'pandas': self._pandas_pending_rows,
+        }
+        position = file_stream.tell()
+        error = None
+        for name in self.excel_readers:
+            file_stream.seek(position)
+            try:
+                df = readers[name](file_stream, sheet_name, headers, filter_column_index, columns)
+            except ImportError:
+                continue
+            except Exception as e:
+                logger.warning("El lector %s no pudo leer la hoja %s: %s", name, sheet_name, e)
+                error = e
+                continue
+            self.excel_reader = name
+            return df
+        raise error or ValueError("No hay lectores de Excel instalados")
+
+    def _read_csv_pending_rows(self, file_stream: BytesIO, headers: list, filter_column_index: int, columns: list) -> pd.DataFrame:
+        """Lee un CSV con el parser C de pandas, solo con las columnas usadas, y filtra PENDIENTE."""
+        first_line = file_stream.readline()
+        file_stream.seek(0)
+        separator = max([',', ';', '\t'], key=lambda sep: first_line.count(sep.encode()))
+
+        dtypes = {col: _csv_dtype(col) for col in columns if _csv_dtype(col) is not None}
+        df = pd.read_csv(
+            file_stream, sep=separator, header=None, names=headers, skiprows=1,
+            usecols=columns, dtype=dtypes, engine='c', encoding='utf-8-sig',
+        )
+        self.rows_read = len(df)
+        return df[df[headers[filter_column_index]] == "PENDIENTE"].reset_index(drop=True)
+
+    def _read_parquet_pending_rows(self, file_stream: BytesIO, headers: list, filter_column_index: int, columns: list) -> pd.DataFrame:
+        """
+        Lee un Parquet proyectando solo las columnas usadas y filtrando PENDIENTE al leer.
+        Las columnas se asignan por posición, igual que los headers de la plantilla Excel.
+        """
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("Para leer archivos .parquet instale pyarrow (pip install 'sap-scripts-generator[parquet]')") from e
+
+        parquet_file = pq.ParquetFile(file_stream)
+        file_columns = parquet_file.schema_arrow.names
+        self.rows_read = parquet_file.metadata.num_rows
+        to_header = {file_columns[headers.index(col)]: col for col in columns if headers.index(col) < len(file_columns)}
+        estado_column = file_columns[filter_column_index]
+
+        table = pq.read_table(file_stream, columns=list(to_header), filters=[(estado_column, '==', 'PENDIENTE')])
+        return table.to_pandas().rename(columns=to_header)
+
+    def _read_arrow_pending_rows(self, file_stream: BytesIO, headers: list, filter_column_index: int, columns: list) -> pd.DataFrame:
+        """Lee un stream IPC de Arrow, filtra PENDIENTE sobre la tabla y convierte solo las columnas usadas."""
+        try:
+            import pyarrow.compute as pc
+            import pyarrow.ipc as ipc
+        except ImportError as e:
+            raise ValueError("Para leer streams de Arrow instale pyarrow (pip install 'sap-scripts-generator[parquet]')") from e
+
+        table = ipc.open_stream(file_stream).read_all()
+        self.rows_read = table.num_rows
+        to_header = _records_columns(table.column_names, headers, [*columns, headers[filter_column_index]])
+        estado_column = next(name for name, col in to_header.items() if col == headers[filter_column_index])
+
+        table = table.filter(pc.equal(table[estado_column].cast('string'), 'PENDIENTE'))
+        to_header = {name: col for name, col in to_header.items() if col in columns}
+        return table.select(list(to_header)).to_pandas().rename(columns=to_header)
+
+    def _read_json_pending_rows(self, file_stream: BytesIO, headers: list, filter_column_index: int, columns: list) -> pd.DataFrame:
+        """
+        Lee una lista JSON de registros (objetos con los headers de la plantilla, o
+        listas de valores en el orden de la plantilla) y filtra PENDIENTE.
+        """
+        df = pd.DataFrame(json.load(file_stream))
+        self.rows_read = len(df)
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+        to_header = _records_columns(df.columns, headers, [*columns, headers[filter_column_index]])
+        df = df[list(to_header)].rename(columns=to_header)
+        df = df[df[headers[filter_column_index]] == "PENDIENTE"].reset_index(drop=True)
+        return df[columns]
+
+    def _as_csv_types(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Deja los enteros que se comparan como números (MOV_SAP, ...) con el mismo tipo que la
+        lectura CSV (Int64), lleguen como números o como texto; así todos los formatos
+        entregan las mismas columnas a la limpieza.
+        """
+        converted = {
+            col: pd.to_numeric(df[col], errors='coerce').astype('Int64')
+            for col in CSV_INT_COLUMNS if col in df.columns
+        }
+        return df.assign(**converted)
+
+    def _read_pending_rows(self, file_stream: BytesIO, sheet_name: str, headers: list, filter_column_index: int, columns: list = None) -> pd.DataFrame:
+        """Lee la hoja (o el CSV/Parquet, o los registros JSON/Arrow) y retorna solo las filas PENDIENTE, todavía sin limpiar."""
+        file_format = detect_file_format(file_stream)
+        if file_format != 'xlsx':
+            read_rows = {
+                'csv': self._read_csv_pending_rows,
+                'parquet': self._read_parquet_pending_rows,
+                'arrow': self._read_arrow_pending_rows,
+                'json': self._read_json_pending_rows,
+            }[file_format]
+            df_filtered = read_rows(file_stream, headers, filter_column_index, columns or headers)
+            df_filtered['Tipo Solicitud'] = df_filtered['Tipo Solicitud'].str.title()
+            return self._as_csv_types(df_filtered)
+
+        # The sheet_name and headers are expected to be consistent with the Excel file structure.
+        if self.streaming:
+            df_filtered = self._read_excel_pending_rows(file_stream, sheet_name, headers, filter_column_index, columns or headers)
+            df_filtered['Tipo Solicitud'] = df_filtered['Tipo Solicitud'].str.title()
+        else:
+            df = pd.read_excel(file_stream, sheet_name=sheet_name, header=None, names=headers, skiprows=1)
+            self.rows_read = len(df)
+
+            df['Tipo Solicitud'] = df['Tipo Solicitud'].str.title()
+
+            # Filtra por estado 'PENDIENTE'
+            df_filtered = df[df.iloc[:, filter_column_index] == "PENDIENTE"].copy()
+        return self._as_csv_types(df_filtered)
+
+    def skip_scripted(self, df: pd.DataFrame, kind: str, ledger: RowLedger) -> pd.DataFrame:
+        """
+        Modo incremental: descarta las filas pendientes que ya tienen script según el
+        registro. Las nuevas quedan con su clave del registro como índice, para reservar
+        en el lote solo las que entran en algún script (pipeline._stage_scripted).
+        """
+        keys = row_keys(df, kind)
+        seen = np.array(ledger.seen(kind, keys), dtype=bool)
+        self.rows_skipped = int(seen.sum())
+        df = df.set_axis(pd.Index(keys, dtype=object))
+        return df[~seen] if self.rows_skipped else df
+
+    def _clean(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Limpieza y conversión de tipos de las filas pendientes."""
+        return self._apply_schema(df)
+
     #221
-    def _clean_dataframe_generic(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Aplica limpieza genérica de strings a las columnas requeridas."""
-        df = df.copy()
-        str_cols = ['Codigo Almacen', 'Codigo Material', 'Cantidad', 'ELEMENTO PEP']
-        for col in str_cols:
-            if col in df.columns:
-                df[col] = df[col].astype(str)
-        
-        if 'Codigo Almacen' in df.columns:
-            df['Codigo Almacen'] = df['Codigo Almacen'].apply(lambda x: x.zfill(4))
-        
-        return df
-    
-    #221
-    def _clean_dataframe_numeric(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Convierte columnas a tipos numéricos, manejando errores."""
-        df = df.copy()
-        
-        # Columnas a convertir a numérico (entero)
-        numeric_cols = ['VR', 'Cantidad', 'Codigo Material', 'Codigo Almacen', 'POS']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-
-        # Manejo especial para ELEMENTO PEP que puede ser numérico o string
-        if 'ELEMENTO PEP' in df.columns:
-            pep_series = df['ELEMENTO PEP'].astype(str)
-            # Deja como string los que no son puramente dígitos.
-            df['ELEMENTO PEP'] = pep_series 
-            
-        return df
-    
-    #221
-    def _load_and_filter_data(self, file_stream: BytesIO, sheet_name: str, headers: list, filter_column_index: int) -> pd.DataFrame:
+    def _load_and_filter_data(self, file_stream: BytesIO, sheet_name: str, headers: list, filter_column_index: int, columns: list = None) -> pd.DataFrame:
         """Carga datos de un stream de archivo, los filtra y limpia."""
-        # The sheet_name and headers are expected to be consistent with the Excel file structure.
-        df = pd.read_excel(file_stream, sheet_name=sheet_name, header=None, names=headers, skiprows=1)
-        
-        df['Tipo Solicitud'] = df['Tipo Solicitud'].str.title()
-        
-        # Filtra por estado 'PENDIENTE'
-        df_filtered = df[df.iloc[:, filter_column_index] == "PENDIENTE"].copy()
-        
-        # Limpieza y conversión de tipos
-        df_cleaned_numeric = self._clean_dataframe_numeric(df_filtered)
-        df_final = self._clean_dataframe_generic(df_cleaned_numeric)
-        
-        return df_final
+        df_filtered = self._read_pending_rows(file_stream, sheet_name, headers, filter_column_index, columns)
+        return self._clean(df_filtered)
 
     #221
     def process_emisiones_file(self, file_stream: BytesIO) -> pd.DataFrame:
         # Establece los headers esperados para el archivo de Emisiones
         """Procesa el archivo de Emisiones."""
-        # headers = ['PO','EECC','Localidad','PROYECTO','Tipo Solicitud','Codigo Material','Descripcion','Cantidad','Codigo Almacen','ELEMENTO PEP','IP','VR','SOLICITUD','Codigo destino mercancías','Gestor','Numero de registro','ESTADO']
-        headers = ['PO','EECC','Localidad','MOV_SAP','Tipo Solicitud','Codigo Material','Descripcion','Cantidad','Codigo Almacen','ELEMENTO PEP','IP','VR','SOLICITUD','Codigo destino mercancías','Gestor','Numero de registro','ESTADO']
-        return self._load_and_filter_data(file_stream, "Sheet1", headers, 16)
+        return self._load_and_filter_data(file_stream, *EMISIONES_LAYOUT)
     
     
     def process_solicitudes_file(self, file_stream: BytesIO) -> pd.DataFrame:
         """Procesa el archivo de Solicitudes."""
-        # headers = ['SVR','PO','IP','EECC','PROYECTO','POS','Codigo Material','Descripcion','Cantidad','TIPO SOLICITUD REAL','Tipo Solicitud','VR','VD','Codigo Almacen','ELEMENTO PEP','Observacion','Codigo destino mercancías','ESTADO','FECHA DE ATENCION','GESTOR','N°']
-        headers = ['SVR','PO','IP','EECC','MOV_SAP','POS','Codigo Material','Descripcion','Cantidad','TIPO SOLICITUD REAL','Tipo Solicitud','VR','VD','Codigo Almacen','ELEMENTO PEP','Observacion','Codigo destino mercancías','ESTADO','FECHA DE ATENCION','GESTOR','N°']
-        
-        # Carga y filtro inicial
-        df_gsheet = pd.read_excel(file_stream, sheet_name="DETALLE", header=None, names=headers, skiprows=1)
-        df_gsheet['Tipo Solicitud'] = df_gsheet['Tipo Solicitud'].str.title()
-        df_filtered = df_gsheet[df_gsheet['ESTADO'] == "PENDIENTE"].copy()
-
-        # Limpieza
-        df_cleaned_numeric = self._clean_dataframe_numeric(df_filtered)
-        df_final = self._clean_dataframe_generic(df_cleaned_numeric)
-        
-        return df_final
+        # Carga, filtro por 'PENDIENTE' (columna ESTADO) y limpieza
+        return self._load_and_filter_data(file_stream, *SOLICITUDES_LAYOUT)
 
 
     def split_by_operation(self, df: pd.DataFrame) -> dict:
         """Divide el DataFrame en un diccionario de DataFrames por Tipo de Solicitud."""
-        operations = {
-            'Devolucion': df[df['Tipo Solicitud'] == 'Devolucion'],
-            'Adicionar': df[df['Tipo Solicitud'] == 'Adicionar'],
-            'Modificar': df[df['Tipo Solicitud'] == 'Modificar'],
-            'Sfin': df[df['Tipo Solicitud'] == 'Sfin'],
-            'Borrar': df[df['Tipo Solicitud'] == 'Borrar']
-        }
-        return operations
+        return partition(df, 'operation')
 
     #If users want to split by project type, use this method
     def split_by_project_type(self, df: pd.DataFrame) -> dict:
-        """Divide el DataFrame para proyectos 201 y 221."""
-        proyectos_201 = ['EDIFICIOS - BROWNFIELD', 'MERMAS 2025', 'DIFERENCIAS 2025', 'VENTAS']
-        df_201 = df[df['PROYECTO'].isin(proyectos_201)]
-        df_221 = df[~df['PROYECTO'].isin(proyectos_201)]
-        return {'201': df_201, '221': df_221}
+        """Divide el DataFrame para proyectos 201 y 221 (PROYECTOS_201 van con 201)."""
+        return partition(df, 'project')
     
     #If users want to split by movement type, use this method
     def split_by_movement_type(self, df: pd.DataFrame) -> dict:
         """Divide el DataFrame para proyectos 201 y 221."""
-        
-        df_201 = df[df['MOV_SAP'] == 201]
-        df_221 = df[df['MOV_SAP'] == 221]
-
-        return {'201': df_201, '221': df_221}
+        return partition(df, 'movement')
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+
+
+def _warm_up() -> None:
+    """Inicializador de cada worker: deja pandas y el pipeline importados antes de la primera petición."""
+    import pandas  # noqa: F401
+    import openpyxl  # noqa: F401
+    from . import pipeline  # noqa: F401
+
+
+def _ping(_: int = 0) -> int:
+    return os.getpid()
+
+
+class PipelineExecutor:
+    """
+    Ejecuta el trabajo de pandas y generación de scripts fuera del event loop.
+
+    kind="process" usa un ProcessPoolExecutor (el trabajo es CPU-bound y así
+    escala con los núcleos); si el pool de procesos no se puede crear o se rompe,
+    se cae a un ThreadPoolExecutor para que el API siga respondiendo.
+    """
+    def __init__(self, kind: str = "process", max_workers: Optional[int] = None):
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[Executor] = None
+        # El pool se puede crear desde el warm-up (en otro hilo) y desde una petición a la vez
+        self._lock = threading.Lock()
+
+    def _create(self) -> Executor:
+        if self.kind == "process":
+            try:
+                return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_up)
+            except (OSError, NotImplementedError, ImportError):
+                self.kind = "thread"
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="sap-pipeline", initializer=_warm_up)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._create()
+        return self._executor
+
+    def _fallback_to_threads(self) -> None:
+        with self._lock:
+            broken = self._executor
+            self.kind = "thread"
+            self._executor = self._create()
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Ejecuta fn(*args) en el pool y espera el resultado sin bloquear el event loop."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, partial(fn, *args))
+        except BrokenProcessPool:
+            self._fallback_to_threads()
+            return await loop.run_in_executor(self.executor, partial(fn, *args))
+
+    def warm_up(self) -> None:
+        """Arranca todos los workers por adelantado (cada uno importa pandas al iniciar)."""
+        try:
+            list(self.executor.map(_ping, range(self.max_workers)))
+        except BrokenProcessPool:
+            self._fallback_to_threads()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+pipeline_executor = PipelineExecutor(
+    kind=os.getenv("SAP_EXECUTOR", "process"),
+    max_workers=int(os.getenv("SAP_WORKERS", "0")) or None,
+)
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from .metrics import StageTimer, logger, record_request
+
+# Contadores del pipeline que se informan como progreso de un trabajo
+PROGRESS_COUNTERS = ("rows_read", "rows_pending", "pos", "vrs", "script_lines")
+
+
+class JobTimer(StageTimer):
+    """StageTimer que avisa al trabajo cada vez que se suma el resultado de una etapa del executor."""
+    def __init__(self, on_change: Callable[[dict], None]):
+        super().__init__()
+        self._on_change = on_change
+
+    def merge(self, snapshot: dict) -> None:
+        super().merge(snapshot)
+        self._on_change(snapshot)
+
+
+class Job:
+    """Un archivo encolado para generar sus scripts; guarda estado, progreso y resultado."""
+    def __init__(self, kind: str, cache_key: str, run: Callable[[StageTimer], Awaitable[dict]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.cache_key = cache_key
+        self.status = "queued"  # queued -> running -> done | error
+        self.stage = None
+        self.tasks_done = 0
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.timer = JobTimer(self._on_merge)
+        self.version = 0
+        self.run = run
+        self._waiters = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "error")
+
+    def _on_merge(self, snapshot: dict) -> None:
+        self.tasks_done += 1
+        if snapshot.get("stages"):
+            self.stage = list(snapshot["stages"])[-1]
+        self.changed()
+
+    def changed(self) -> None:
+        """Marca un cambio de estado y despierta a quienes esperan (SSE)."""
+        self.version += 1
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait_for_change(self, version: int, timeout: float) -> bool:
+        """Espera hasta que la versión cambie; False si pasó el timeout sin cambios."""
+        if self.version != version:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> dict:
+        counters = self.timer.counters
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": {
+                "tasks_done": self.tasks_done,
+                **{name: counters.get(name, 0) for name in PROGRESS_COUNTERS},
+            },
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.timer.stages.items()},
+            "message": self.result.get("message") if self.result else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class QueueFullError(Exception):
+    """No hay lugar en la cola de trabajos."""
+
+
+class JobManager:
+    """
+    Cola de trabajos en memoria con un número fijo de workers (tareas asyncio).
+
+    Cada worker toma un trabajo y lo ejecuta con el pipeline (que a su vez usa el
+    executor de procesos), así un archivo grande no bloquea la petición HTTP.
+    Los trabajos terminados se conservan ttl_seconds para consultar su resultado.
+    """
+    def __init__(self, workers: int = 2, max_queued: int = 16, ttl_seconds: float = 3600):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def start(self) -> None:
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, kind: str, cache_key: str, run: Callable[[StageTimer], Awaitable[dict]]) -> Job:
+        """Encola un trabajo; run(timer) retorna el payload del pipeline."""
+        self.start()
+        self._prune()
+        job = Job(kind, cache_key, run)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"La cola de trabajos está llena ({self.max_queued} en espera)")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and now - job.finished_at > self.ttl_seconds:
+                del self._jobs[job_id]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        job.changed()
+        try:
+            job.result = await job.run(job.timer)
+            job.status = "done"
+        except Exception as e:
+            job.status = "error"
+            job.error = f"Ocurrió un error al procesar el archivo: {e}"
+            logger.exception("Falló el trabajo %s", job.id)
+        job.finished_at = time.time()
+        job.changed()
+        record_request(f"job:{job.kind}", "JOB", 200 if job.status == "done" else 500, job.finished_at - job.started_at, job.timer)
+
+    def stats(self) -> dict:
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            **{status: statuses.count(status) for status in ("queued", "running", "done", "error")},
+        }
+
+
+# Cola compartida por el API, configurable por variables de entorno
+job_manager = JobManager(
+    workers=int(os.getenv("SAP_JOB_WORKERS", "2")),
+    max_queued=int(os.getenv("SAP_JOB_QUEUE_SIZE", "16")),
+    ttl_seconds=float(os.getenv("SAP_JOB_TTL_SECONDS", "3600")),
+)
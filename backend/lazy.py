@@ -0,0 +1,63 @@
+"""
+Importación diferida de los módulos pesados (pandas, numpy, openpyxl y el pipeline que los usa).
+
+lazy_import(nombre) registra el módulo sin ejecutarlo: se importa de verdad en el
+primer acceso a uno de sus atributos. Así el API arranca y responde (GET /,
+health checks) sin pagar la importación de pandas, que se hace en el warm-up en
+segundo plano o en la primera petición que la necesita. El frontend usa el mismo
+helper para pandas y requests.
+
+La carga se hace bajo un lock: si el warm-up y una petición tocan el módulo a la
+vez, la segunda espera a que termine de ejecutarse en lugar de ver un módulo a
+medio cargar (importlib.util.LazyLoader no lo garantiza antes de Python 3.12).
+"""
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+# Reentrante: un módulo diferido que al ejecutarse usa otro diferido lo carga en el mismo hilo
+_load_lock = threading.RLock()
+# Módulos que se están ejecutando (sus propios accesos durante la carga no la repiten)
+_loading = set()
+
+
+class _LazyModule(ModuleType):
+    """Módulo registrado pero no ejecutado: el primer acceso a un atributo lo ejecuta."""
+    def __getattribute__(self, attr):
+        with _load_lock:
+            name = ModuleType.__getattribute__(self, '__name__')
+            if type(self) is _LazyModule and name not in _loading:
+                _loading.add(name)
+                try:
+                    spec = ModuleType.__getattribute__(self, '__spec__')
+                    spec.loader.exec_module(self)
+                    self.__class__ = ModuleType
+                finally:
+                    _loading.discard(name)
+        return ModuleType.__getattribute__(self, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Módulo que se importa en el primer acceso a un atributo; si ya está importado lo retorna tal cual."""
+    with _load_lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ImportError(f"No se encontró el módulo {name}", name=name)
+        module = importlib.util.module_from_spec(spec)
+        module.__class__ = _LazyModule
+        sys.modules[name] = module
+        parent, _, child = name.rpartition('.')
+        if parent:
+            setattr(sys.modules[parent], child, module)
+        return module
+
+
+def ensure_loaded(*modules: ModuleType) -> None:
+    """Termina de importar los módulos diferidos (el acceso a cualquier atributo ejecuta el módulo)."""
+    for module in modules:
+        getattr(module, '__dict__')
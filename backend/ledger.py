@@ -0,0 +1,134 @@
+"""
+Registro (SQLite) de las filas que ya tienen script, para el modo incremental.
+
+El libro de Emisiones/Solicitudes solo crece y se vuelve a subir cada día; con
+incremental=True las filas que ya se generaron en una subida anterior se
+descartan después de leer, así cada ejecución cuesta lo que las filas nuevas.
+
+Cada fila se identifica por su número de registro (Numero de registro / N°) junto
+con su material (y su posición en Solicitudes): un número de registro agrupa las
+filas de un PO/VR. Si no tiene número de registro, por un hash de su contenido
+(data_processor.row_keys). Las claves
+se reservan al leer (stage) y solo pasan al registro cuando los scripts se
+generaron (commit). El módulo solo usa la biblioteca estándar, así el API lo
+importa sin cargar pandas.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Columnas que identifican una fila de cada plantilla: el número de registro primero
+LEDGER_KEY_COLUMNS = {
+    'emisiones': ('Numero de registro', 'Codigo Material'),
+    'solicitudes': ('N°', 'POS', 'Codigo Material'),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripted_rows (
+    kind TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    scripted_at REAL NOT NULL,
+    PRIMARY KEY (kind, row_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS staged_rows (
+    batch TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    PRIMARY KEY (batch, kind, row_key)
+) WITHOUT ROWID;
+"""
+
+
+class RowLedger:
+    """
+    Filas con script por tipo de archivo (emisiones / solicitudes) en un archivo SQLite.
+    Se puede usar desde varios procesos (workers del executor); la conexión se abre
+    en el primer uso, una por hilo.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def seen(self, kind: str, keys: List[str]) -> List[bool]:
+        """Qué claves ya están en el registro (una sola consulta con una tabla temporal)."""
+        connection = self._connect()
+        with connection:
+            connection.execute("CREATE TEMP TABLE IF NOT EXISTS lookup_keys (row_key TEXT PRIMARY KEY) WITHOUT ROWID")
+            connection.execute("DELETE FROM lookup_keys")
+            connection.executemany("INSERT OR IGNORE INTO lookup_keys VALUES (?)", ((key,) for key in keys))
+            known = {row for (row,) in connection.execute(
+                "SELECT l.row_key FROM lookup_keys l JOIN scripted_rows s ON s.kind = ? AND s.row_key = l.row_key",
+                (kind,),
+            )}
+            connection.execute("DELETE FROM lookup_keys")
+        return [key in known for key in keys]
+
+    def stage(self, batch: str, kind: str, keys: List[str]) -> None:
+        """Reserva las claves de un lote; pasan al registro con commit(batch)."""
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO staged_rows (batch, kind, row_key) VALUES (?, ?, ?)",
+                ((batch, kind, key) for key in keys),
+            )
+
+    def commit(self, batch: str) -> int:
+        """Marca como generadas las filas del lote; retorna cuántas se agregaron."""
+        with self._connect() as connection:
+            added = connection.execute(
+                "INSERT OR IGNORE INTO scripted_rows (kind, row_key, scripted_at) "
+                "SELECT kind, row_key, ? FROM staged_rows WHERE batch = ?",
+                (time.time(), batch),
+            ).rowcount
+            connection.execute("DELETE FROM staged_rows WHERE batch = ?", (batch,))
+        return added
+
+    def discard(self, batch: str) -> None:
+        """Descarta las claves de un lote que no llegó a generar sus scripts."""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM staged_rows WHERE batch = ?", (batch,))
+
+    def stats(self) -> Dict[str, dict]:
+        """Filas registradas y fecha de la última por tipo de archivo."""
+        rows = self._connect().execute(
+            "SELECT kind, COUNT(*), MAX(scripted_at) FROM scripted_rows GROUP BY kind"
+        ).fetchall()
+        return {
+            "path": self.path,
+            "kinds": {kind: {"rows": count, "last_scripted_at": last} for kind, count, last in rows},
+        }
+
+    def recent(self, kind: str, limit: int = 100) -> List[dict]:
+        """Últimas filas registradas de un tipo de archivo."""
+        rows = self._connect().execute(
+            "SELECT row_key, scripted_at FROM scripted_rows WHERE kind = ? ORDER BY scripted_at DESC LIMIT ?",
+            (kind, limit),
+        ).fetchall()
+        return [{"row_key": key, "scripted_at": scripted_at} for key, scripted_at in rows]
+
+    def reset(self, kind: Optional[str] = None) -> int:
+        """Borra el registro (de un tipo o completo); retorna cuántas filas se borraron."""
+        with self._connect() as connection:
+            if kind is None:
+                deleted = connection.execute("DELETE FROM scripted_rows").rowcount
+                connection.execute("DELETE FROM staged_rows")
+            else:
+                deleted = connection.execute("DELETE FROM scripted_rows WHERE kind = ?", (kind,)).rowcount
+                connection.execute("DELETE FROM staged_rows WHERE kind = ?", (kind,))
+        return deleted
+
+
+# Registro compartido por el API y los workers; ruta configurable por variable de entorno
+row_ledger = RowLedger(os.getenv("SAP_LEDGER_PATH", "sap_ledger.sqlite3"))
@@ -1,166 +1,672 @@
 from fastapi import FastAPI
-from fastapi import File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse
-import uvicorn
-from typing import Optional
-from io import BytesIO
+from fastapi import File, UploadFile, Form, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+import asyncio
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import partial
+from pathlib import PurePath
+from typing import List, Optional
 
 # Importa las clases de los otros archivos
-from .data_processor import DataProcessor
-from .script_generators import MB21, MB22
+from .archive import build_zip, payload_scripts
+from .cache import make_cache_key, result_cache
+from .executor import pipeline_executor
+from .jobs import QueueFullError, job_manager
+from .lazy import ensure_loaded, lazy_import
+from .ledger import LEDGER_KEY_COLUMNS, row_ledger
+from .metrics import StageTimer, configure_logging, logger, record_request, registry
+from .uploads import UploadLimitMiddleware, read_upload, spool_chunks
+
+# Módulos que cargan pandas/openpyxl: se importan en el primer uso o en el warm-up del arranque
+data_processor = lazy_import(f"{__package__}.data_processor")
+pipeline = lazy_import(f"{__package__}.pipeline")
+script_generators = lazy_import(f"{__package__}.script_generators")
+sharding = lazy_import(f"{__package__}.sharding")
+
+
+configure_logging()
+
+# Warm-up al arrancar (SAP_WARM_UP=0 lo desactiva): importa el pipeline y arranca los workers
+# en segundo plano, así el API responde desde el inicio y la primera petición no paga la espera
+WARM_UP = os.getenv("SAP_WARM_UP", "1") != "0"
+
+
+def _warm_up() -> None:
+    """Importa pandas y el pipeline en el proceso del API y arranca los workers del executor."""
+    start = time.perf_counter()
+    try:
+        ensure_loaded(data_processor, pipeline, script_generators, sharding)
+        pipeline_executor.warm_up()
+    except Exception:
+        logger.exception("Falló el warm-up del pipeline")
+        return
+    logger.info(json.dumps({"event": "warm_up", "duration_ms": round((time.perf_counter() - start) * 1000, 1)}))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_manager.start()
+    warm_up = asyncio.create_task(asyncio.to_thread(_warm_up)) if WARM_UP else None
+    yield
+    if warm_up is not None:
+        await warm_up
+    await job_manager.stop()
+    pipeline_executor.shutdown()
+
 
 app = FastAPI(
     title="SAP Script Automation API",
     description="API para generar scripts VBS para automatización de SAP.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+# Rechaza con 413 los cuerpos de más de SAP_MAX_UPLOAD_MB antes de recibirlos completos
+app.add_middleware(UploadLimitMiddleware)
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Mide cada petición: latencia por endpoint, header Server-Timing y log estructurado."""
+    start = time.perf_counter()
+    timer = request.state.timer = StageTimer()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if timer.stages:
+            response.headers["Server-Timing"] = timer.server_timing()
+        return response
+    finally:
+        # Sin ruta (404, 405) la etiqueta es fija: la URL cruda crearía una serie por cada ruta inventada
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        record_request(endpoint, request.method, status, time.perf_counter() - start, timer)
+
+
+@app.get("/metrics", tags=["General"], response_class=PlainTextResponse)
+def read_metrics():
+    """Métricas en formato de texto de Prometheus."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/", tags=["General"])
 def read_root():
     return {"message": "Bienvenido al API de Automatización de Scripts de SAP"}
 
+@app.get("/cache/stats", tags=["General"])
+def read_cache_stats():
+    """Contadores de la caché de resultados (hits, misses, peticiones coalescidas, desalojos)."""
+    return result_cache.stats()
+
+
+def _check_ledger_kind(kind: str) -> None:
+    if kind not in LEDGER_KEY_COLUMNS:
+        raise HTTPException(status_code=404, detail=f"Tipo de archivo desconocido: {kind}")
+
+
+@app.get("/ledger/stats", tags=["Registro incremental"])
+def read_ledger_stats():
+    """Filas con script registradas por tipo de archivo (modo incremental)."""
+    return row_ledger.stats()
+
+
+@app.get("/ledger/{kind}", tags=["Registro incremental"])
+def read_ledger(kind: str, limit: int = Query(100, ge=1, le=10000)):
+    """Últimas filas registradas de emisiones o solicitudes (clave n:<registro> o h:<hash>)."""
+    _check_ledger_kind(kind)
+    return {"kind": kind, "rows": row_ledger.recent(kind, limit)}
+
+
+@app.delete("/ledger/", tags=["Registro incremental"])
+def reset_ledger(kind: Optional[str] = Query(None)):
+    """Borra el registro (de un tipo o completo): la próxima subida incremental vuelve a generar todas las filas."""
+    if kind is not None:
+        _check_ledger_kind(kind)
+    return {"kind": kind, "deleted": row_ledger.reset(kind)}
+
+
+ZIP_MEDIA_TYPE = "application/zip"
+INVALID_FORMAT_MESSAGE = "Formato de archivo inválido. Por favor, suba un archivo .xlsx, .csv o .parquet"
+
+
+def _check_sessions(sessions: int) -> None:
+    """sessions: número de sesiones de SAP GUI entre las que se reparten los POs/VRs."""
+    if not 1 <= sessions <= sharding.MAX_SESSIONS:
+        raise HTTPException(status_code=400, detail=f"El número de sesiones debe estar entre 1 y {sharding.MAX_SESSIONS}")
+
+
+def _check_split(split_by: str) -> None:
+    """split_by: cómo se dividen las Emisiones en 221 y 201 (por movimiento MOV_SAP o por proyecto)."""
+    if split_by not in data_processor.EMISIONES_LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"División inválida. Use {' o '.join(data_processor.EMISIONES_LAYOUTS)}")
+
+
+def _incremental_key(key: str, incremental: bool) -> str:
+    """
+    En modo incremental el resultado depende del registro de filas con script, no solo del
+    archivo: cada ejecución usa su propia clave para no reutilizar (ni coalescer) otra.
+    """
+    return f"{key}|incremental:{uuid.uuid4().hex}" if incremental else key
+
+
+def _wants_zip(request: Request, output_format: Optional[str]) -> bool:
+    """El cliente pide el ZIP con ?format=zip o con el header Accept: application/zip."""
+    if output_format:
+        return output_format.lower() == "zip"
+    return ZIP_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _scripts_response(request: Request, output_format: Optional[str], key: str, payload: dict):
+    """Responde con el JSON del pipeline o, si el cliente lo pide, con un ZIP de archivos .vbs."""
+    timer = request.state.timer
+    if not _wants_zip(request, output_format):
+        with timer.stage("serialize"):
+            return JSONResponse(content=payload)
+
+    scripts = payload_scripts(payload)
+
+    async def compute_zip():
+        return build_zip({f"script_{script_type}.vbs": content for script_type, content in scripts.items()})
+
+    # El ZIP también queda en caché: un reintento no vuelve a comprimir
+    with timer.stage("serialize"):
+        zip_content = await result_cache.get_or_compute(f"{key}|zip", compute_zip)
+    return Response(
+        content=zip_content,
+        media_type=ZIP_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": 'attachment; filename="SAP_SCRIPTS.zip"',
+            "X-Message": payload["message"],
+            "X-Scripts": ",".join(scripts),
+        },
+    )
+
+
 @app.post("/emisiones/", tags=["Generación de Scripts"])
 async def create_emisiones_script(
+    request: Request,
     sap_user: str = Form(...),
     file_output: str = Form(...),  # Ruta de guardado del archivo VBS
-    file: Optional[UploadFile] = File(None)
+    file: Optional[UploadFile] = File(None),
+    sessions: int = Form(1),  # Sesiones de SAP GUI en paralelo (un script por sesión)
+    split_by: str = Form('movement'),  # División en 221/201: movement (MOV_SAP) o project (PROYECTO en la cuarta columna)
+    incremental: bool = Form(False),  # Omite las filas que ya tienen script según el registro (ledger)
+    compact: bool = Form(False),  # Formato compacto: Sub + arreglos por PO/VR en lugar del script desenrollado
+    checkpoint: bool = Form(False),  # Scripts reanudables: anotan cada PO/VR completado y saltan los ya anotados
+    start_from: Optional[str] = Form(None),  # Genera desde este PO/VR (en el orden del archivo)
+    output_format: Optional[str] = Query(None, alias="format")  # json (por defecto) o zip
 ):
     """
     Sube un archivo Excel de Emisiones y genera un script VBS para el movimiento 221.
+    Con ?format=zip (o Accept: application/zip) retorna directamente un ZIP con los .vbs.
+    Con sessions > 1 los POs se reparten en un script por sesión (script_221_s1, script_221_s2, ...).
+    Con split_by=project las filas se dividen en 221/201 por PROYECTO en lugar de MOV_SAP.
+    Con incremental=true solo se generan las filas que no tienen script de una subida anterior.
+    Con compact=true los scripts usan el formato compacto (mismos pasos, mucho más livianos).
+    Con checkpoint=true los scripts se pueden retomar donde fallaron; con start_from se generan desde ese PO/VR.
     """
-    # VB - Corrigio la lectura del nombre del archivo y solo reconoce que se suba un archivo .xlsx
+    _check_sessions(sessions)
+    _check_split(split_by)
+    # VB - Corrigio la lectura del nombre del archivo y solo reconoce que se suba un archivo .xlsx (o .csv/.parquet)
     if file:
-        if not file.filename.endswith('.xlsx'):
-            raise HTTPException(status_code=400, detail="Formato de archivo inválido. Por favor, suba un archivo .xlsx")
+        if not file.filename.lower().endswith(data_processor.SUPPORTED_EXTENSIONS):
+            raise HTTPException(status_code=400, detail=INVALID_FORMAT_MESSAGE)
         
+        timer = request.state.timer
+        # Lee el archivo subido por bloques (a disco si es grande)
+        with timer.stage("upload"):
+            upload = await read_upload(file)
+        async with upload:
+            try:
+                # Reutiliza el resultado si el mismo archivo ya fue procesado con los mismos parámetros
+                key = _incremental_key(make_cache_key("emisiones", upload.digest, sap_user, file_output, sessions, split_by, compact, checkpoint, start_from), incremental)
+
+                async def compute():
+                    return await pipeline.run_emisiones_payload(pipeline_executor, upload.source, sap_user, file_output, timer, sessions, split_by, incremental, compact, checkpoint, start_from)
+
+                payload = await result_cache.get_or_compute(key, compute)
+                return await _scripts_response(request, output_format, key, payload)
+
+            except pipeline.StartNotFoundError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except data_processor.UnsupportedFormatError as e:
+                raise HTTPException(status_code=415, detail=str(e))
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Ocurrió un error al procesar el archivo: {e}")
+        
+@app.post("/emisiones/records", tags=["Generación de Scripts"])
+async def create_emisiones_script_from_records(
+    request: Request,
+    sap_user: str = Query(...),
+    file_output: str = Query(...),  # Ruta de guardado del archivo VBS
+    sessions: int = Query(1),  # Sesiones de SAP GUI en paralelo (un script por sesión)
+    split_by: str = Query('movement'),  # División en 221/201: movement (MOV_SAP) o project (PROYECTO en la cuarta columna)
+    incremental: bool = Query(False),  # Omite las filas que ya tienen script según el registro (ledger)
+    compact: bool = Query(False),  # Formato compacto: Sub + arreglos por PO/VR en lugar del script desenrollado
+    checkpoint: bool = Query(False),  # Scripts reanudables: anotan cada PO/VR completado y saltan los ya anotados
+    start_from: Optional[str] = Query(None),  # Genera desde este PO/VR (en el orden del archivo)
+    output_format: Optional[str] = Query(None, alias="format")  # json (por defecto) o zip
+):
+    """
+    Genera los scripts de Emisiones a partir de filas enviadas directamente en el cuerpo,
+    sin pasar por un archivo Excel: una lista JSON de registros (Content-Type: application/json)
+    o un stream IPC de Arrow (Content-Type: application/vnd.apache.arrow.stream).
+    Las columnas se toman por nombre si coinciden con la plantilla de Emisiones, si no por posición.
+    La respuesta es la misma que la de /emisiones/.
+    """
+    _check_sessions(sessions)
+    _check_split(split_by)
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in data_processor.RECORDS_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Tipo de contenido no soportado. Use {' o '.join(data_processor.RECORDS_CONTENT_TYPES)}",
+        )
+
+    timer = request.state.timer
+    with timer.stage("upload"):
+        upload = await spool_chunks(request.stream())
+    async with upload:
+        with pipeline.open_content(upload.source) as body:
+            try:
+                body_format = data_processor.detect_file_format(body)
+            except data_processor.UnsupportedFormatError:
+                body_format = None
+        if body_format != data_processor.RECORDS_CONTENT_TYPES[content_type]:
+            raise HTTPException(status_code=400, detail=f"El cuerpo de la petición no es {content_type} válido")
+
         try:
-            # Lee el contenido del archivo subido
-            content = await file.read() 
-            # Crea un stream de bytes para procesar el archivo
-            file_stream = BytesIO(content)
-            # Procesa el archivo para extraer los datos necesarios
-            processor = DataProcessor()
-            df = processor.process_emisiones_file(file_stream)
-            
-            if df.empty:
-                return JSONResponse(status_code=200, content={"message": "No se encontraron solicitudes pendientes en el archivo.", "script": ""})
-            
-            # Dividir el dataframe por tipo de proyecto (221 o 201)
-            # project_dfs = processor.split_by_project_type(df)
-            project_dfs = processor.split_by_movement_type(df)
-            
-            print(project_dfs.keys())  # Verifica las claves disponibles
-            print(f"221 DataFrame shape: {project_dfs['221'].shape}")
-            print(f"201 DataFrame shape: {project_dfs['201'].shape}")
-            df['MOV_SAP'] = df['MOV_SAP'].astype(str)  # Asegura que MOV_SAP sea de tipo str
-            
-
-            # Generar script para 221
-            generator_221 = MB21(sap_user=sap_user, file_output=file_output) # Cambia 'YP00118' por el usuario SAP real
-            generator_221.generate_emission_script(project_dfs['221'], '221')
-            
-            # Generar script para 201
-            generator_201 = MB21(sap_user=sap_user, file_output=file_output)
-            generator_201.generate_emission_script(project_dfs['201'], '201')
-            
-            # Both 221 and 201 scripts are generated, now we need to return them individually
-            if not generator_221.get_script() and not generator_201.get_script():
-                return JSONResponse(status_code=200, content={"message": "No se generaron scripts para los tipos de movimiento especificados.", "script": ""})
-            
-            # # Combinar scripts
-            # full_script = generator_221.get_script() + "\n" + generator_201.get_script()
-            
-            return JSONResponse(content={
-                "message": "Script de emisiones generado exitosamente.",
-                "script_221": generator_221.get_script(),
-                "script_201": generator_201.get_script(),
-                })
+            key = _incremental_key(make_cache_key("emisiones", upload.digest, sap_user, file_output, sessions, split_by, compact, checkpoint, start_from), incremental)
+
+            async def compute():
+                return await pipeline.run_emisiones_payload(pipeline_executor, upload.source, sap_user, file_output, timer, sessions, split_by, incremental, compact, checkpoint, start_from)
 
+            payload = await result_cache.get_or_compute(key, compute)
+            return await _scripts_response(request, output_format, key, payload)
+
+        except pipeline.StartNotFoundError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Ocurrió un error al procesar el archivo: {e}")
-        
+            raise HTTPException(status_code=500, detail=f"Ocurrió un error al procesar los datos: {e}")
+
 #In test        
 @app.post("/solicitudes/", tags=["Generación de Scripts"])
 async def create_solicitudes_script(
+    request: Request,
     sap_user: str = Form(...),
     file_output: str = Form(...),  # Ruta de guardado del archivo VBS
-    file: UploadFile = File(...)  # Archivo de Solicitudes (XLSX
+    file: UploadFile = File(...),  # Archivo de Solicitudes (XLSX
+    sessions: int = Form(1),  # Sesiones de SAP GUI en paralelo (un script por sesión)
+    incremental: bool = Form(False),  # Omite las filas que ya tienen script según el registro (ledger)
+    compact: bool = Form(False),  # Formato compacto: Sub + arreglos por PO/VR en lugar del script desenrollado
+    checkpoint: bool = Form(False),  # Scripts reanudables: anotan cada PO/VR completado y saltan los ya anotados
+    start_from: Optional[str] = Form(None),  # Genera desde este PO/VR (en el orden del archivo)
+    output_format: Optional[str] = Query(None, alias="format")  # json (por defecto) o zip
 ):
     """
     Sube un archivo de Solicitudes (con múltiples operaciones) y genera los scripts VBS correspondientes.
+    Con ?format=zip (o Accept: application/zip) retorna directamente un ZIP con los .vbs.
+    Con sessions > 1 los POs/VRs de cada operación se reparten en un script por sesión.
+    Con incremental=true solo se generan las filas que no tienen script de una subida anterior.
+    Con compact=true los scripts usan el formato compacto (mismos pasos, mucho más livianos).
+    Con checkpoint=true los scripts se pueden retomar donde fallaron; con start_from se generan desde ese PO/VR.
     """
-    if not file.filename.endswith('.xlsx'):
-        raise HTTPException(status_code=400, detail="Formato de archivo inválido. Por favor, suba un archivo .xlsx")
+    _check_sessions(sessions)
+    if not file.filename.lower().endswith(data_processor.SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail=INVALID_FORMAT_MESSAGE)
+
+    timer = request.state.timer
+    with timer.stage("upload"):
+        upload = await read_upload(file)
+    async with upload:
+        try:
+            key = _incremental_key(make_cache_key("solicitudes", upload.digest, sap_user, file_output, sessions, compact, checkpoint, start_from), incremental)
+
+            async def compute():
+                return await pipeline.run_solicitudes_payload(pipeline_executor, upload.source, sap_user, file_output, timer, sessions, incremental=incremental, compact=compact, checkpoint=checkpoint, start_from=start_from)
+
+            payload = await result_cache.get_or_compute(key, compute)
+            return await _scripts_response(request, output_format, key, payload)
+
+        except pipeline.StartNotFoundError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except data_processor.UnsupportedFormatError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Ocurrió un error al procesar el archivo: {e}")
+
+# Pipelines disponibles como trabajo en segundo plano: tipo -> función del pipeline
+JOB_PIPELINES = {
+    'emisiones': 'run_emisiones_payload',
+    'solicitudes': 'run_solicitudes_payload',
+}
+# Cada cuánto se envía un comentario por el stream SSE para mantener viva la conexión
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado o expirado")
+    return job
+
+
+@app.post("/jobs/{kind}/", tags=["Trabajos"], status_code=202)
+async def create_job(
+    request: Request,
+    kind: str,
+    sap_user: str = Form(...),
+    file_output: str = Form(...),  # Ruta de guardado del archivo VBS
+    file: UploadFile = File(...),
+    sessions: int = Form(1),  # Sesiones de SAP GUI en paralelo (un script por sesión)
+    split_by: str = Form('movement'),  # Solo Emisiones: división en 221/201 por movement o project
+    incremental: bool = Form(False),  # Omite las filas que ya tienen script según el registro (ledger)
+    compact: bool = Form(False),  # Formato compacto: Sub + arreglos por PO/VR en lugar del script desenrollado
+    checkpoint: bool = Form(False),  # Scripts reanudables: anotan cada PO/VR completado y saltan los ya anotados
+    start_from: Optional[str] = Form(None)   # Genera desde este PO/VR (en el orden del archivo)
+):
+    """
+    Encola un archivo de Emisiones o Solicitudes (kind) y retorna de inmediato el ID del trabajo.
+    El progreso se consulta en /jobs/{id} o se recibe por SSE en /jobs/{id}/events,
+    y los scripts se descargan de /jobs/{id}/result cuando el trabajo termina.
+    """
+    if kind not in JOB_PIPELINES:
+        raise HTTPException(status_code=404, detail=f"Tipo de trabajo desconocido: {kind}")
+    if not file.filename.lower().endswith(data_processor.SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail=INVALID_FORMAT_MESSAGE)
+    _check_sessions(sessions)
+    _check_split(split_by)
+    if kind != 'emisiones' and split_by != 'movement':
+        raise HTTPException(status_code=400, detail="split_by solo aplica a trabajos de emisiones")
+
+    with request.state.timer.stage("upload"):
+        upload = await read_upload(file)
+    key = _incremental_key(make_cache_key(kind, upload.digest, sap_user, file_output, sessions, split_by, compact, checkpoint, start_from), incremental)
+    run_payload = partial(getattr(pipeline, JOB_PIPELINES[kind]), incremental=incremental, compact=compact, checkpoint=checkpoint, start_from=start_from)
+    if kind == 'emisiones':
+        run_payload = partial(run_payload, split_by=split_by)
+
+    # El archivo (o su copia en disco) vive hasta que el trabajo termina
+    async def run(timer: StageTimer) -> dict:
+        async with upload:
+            async def compute():
+                return await run_payload(pipeline_executor, upload.source, sap_user, file_output, timer, sessions)
+            return await result_cache.get_or_compute(key, compute)
 
     try:
-        content = await file.read()
-        file_stream = BytesIO(content)
-        
-        processor = DataProcessor()
-        df = processor.process_solicitudes_file(file_stream)
+        job = job_manager.submit(kind, key, run)
+    except QueueFullError as e:
+        upload.close()
+        raise HTTPException(status_code=503, detail=str(e))
 
-        if df.empty:
-            return JSONResponse(status_code=200, content={"message": "No se encontraron solicitudes pendientes en el archivo.", "script": ""})
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/jobs/{job.id}",
+            "events_url": f"/jobs/{job.id}/events",
+            "result_url": f"/jobs/{job.id}/result",
+        },
+        headers={"Location": f"/jobs/{job.id}"},
+    )
 
-        # Dividir el dataframe por tipo de operación
-        op_dfs = processor.split_by_operation(df)
-        
-        gen_222_script = []
-        gen_202_script = []
-        gen_add_script = []
-        gen_mod_script = []
-        gen_del_script = []
-        gen_sfin_script = []
-
-        # 1. Devoluciones (MB21 - 222 y 202)
-        if not op_dfs['Devolucion'].empty:
-            project_dfs = processor.split_by_project_type(op_dfs['Devolucion'])
-            gen_222 = MB21(sap_user=sap_user)
-            gen_222.generate_emission_script(project_dfs['221'], '222')
-            gen_222_script.append(gen_222.get_script())
-            
-            gen_202 = MB21(sap_user=sap_user)
-            gen_202.generate_emission_script(project_dfs['201'], '202')
-            gen_202_script.append(gen_202.get_script())
-
-        # 2. Modificaciones (MB22)
-        if not op_dfs['Modificar'].empty:
-            gen_mod = MB22(sap_user=sap_user)
-            gen_mod.generate_modification_script(op_dfs['Modificar'])
-            gen_mod_script.append(gen_mod.get_script())
-            
-        # 3. Borrar Posiciones (MB22)
-        if not op_dfs['Borrar'].empty:
-            gen_del = MB22(sap_user=sap_user)
-            gen_del.generate_deletion_script(op_dfs['Borrar'])
-            gen_del_script.append(gen_del.get_script())
-            
-        # 4. SFIN (MB22)
-        if not op_dfs['Sfin'].empty:
-            gen_sfin = MB22(sap_user=sap_user)
-            gen_sfin.generate_sfin_script(op_dfs['Sfin'])
-            gen_sfin_script.append(gen_sfin.get_script())
-        
-        # Adiciones no está implementado en el script original de la misma forma, se omite por ahora
-        # 5. Adiciones (MB22)
-        if not op_dfs['Adicionar'].empty:
-            gen_add = MB22(sap_user=sap_user)
-            gen_add.generate_addition_script(op_dfs['Adicionar'])
-            gen_add_script.append(gen_add.get_script())
-        
 
-        return JSONResponse(content={
-                "message": "Script de solicitudes generado exitosamente.",
-                "script_222": gen_222_script,
-                "script_202": gen_202_script,
-                "script_add": gen_add_script,
-                "script_mod": gen_mod_script,
-                "script_del": gen_del_script,
-                "script_sfin": gen_sfin_script,
-             })
+@app.get("/jobs/stats", tags=["Trabajos"])
+def read_job_stats():
+    """Workers de la cola y cantidad de trabajos por estado."""
+    return job_manager.stats()
+
+
+@app.get("/jobs/{job_id}", tags=["Trabajos"])
+def read_job(job_id: str):
+    """Estado y progreso de un trabajo (filas leídas/pendientes, POs/VRs generados, etapas)."""
+    return _get_job(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/events", tags=["Trabajos"])
+async def stream_job_events(job_id: str):
+    """Progreso del trabajo como Server-Sent Events: 'progress' en cada cambio y 'done' o 'error' al final."""
+    job = _get_job(job_id)
+
+    async def events():
+        version = -1
+        while True:
+            if version != job.version:
+                version = job.version
+                event = job.status if job.finished else "progress"
+                yield f"event: {event}\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+                if job.finished:
+                    return
+            elif not await job.wait_for_change(version, SSE_KEEPALIVE_SECONDS):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 
+@app.get("/jobs/{job_id}/result", tags=["Trabajos"])
+async def read_job_result(
+    request: Request,
+    job_id: str,
+    output_format: Optional[str] = Query(None, alias="format")  # json (por defecto) o zip
+):
+    """Scripts generados por el trabajo, en JSON o ZIP (?format=zip), igual que /emisiones/ y /solicitudes/."""
+    job = _get_job(job_id)
+    if job.status == "error":
+        raise HTTPException(status_code=500, detail=job.error)
+    if not job.finished:
+        raise HTTPException(status_code=409, detail=f"El trabajo todavía no termina (estado: {job.status})")
+    return await _scripts_response(request, output_format, job.cache_key, job.result)
+
+
+async def _process_batch_file(file: UploadFile, sap_user: str, file_output: str, timer: StageTimer, sessions: int = 1, split_by: str = 'movement', compact: bool = False, checkpoint: bool = False) -> dict:
+    """Procesa un archivo del lote; los errores quedan en el resumen en vez de fallar el lote."""
+    summary = {"file": file.filename, "status": "ok", "message": "", "scripts": {}}
+    if not file.filename.lower().endswith(data_processor.SUPPORTED_EXTENSIONS):
+        summary.update(status="error", message=INVALID_FORMAT_MESSAGE)
+        return summary
+
+    try:
+        with timer.stage("upload"):
+            upload = await read_upload(file)
+        async with upload:
+            key = make_cache_key("emisiones", upload.digest, sap_user, file_output, sessions, split_by, compact, checkpoint)
+
+            async def compute():
+                return await pipeline.run_emisiones_payload(pipeline_executor, upload.source, sap_user, file_output, timer, sessions, split_by, compact=compact, checkpoint=checkpoint)
+
+            payload = await result_cache.get_or_compute(key, compute)
+    except HTTPException as e:
+        summary.update(status="error", message=e.detail)
+        return summary
+    except Exception as e:
+        summary.update(status="error", message=f"Ocurrió un error al procesar el archivo: {e}")
+        return summary
+
+    summary["message"] = payload["message"]
+    summary["scripts"] = payload_scripts(payload)
+    if not summary["scripts"]:
+        summary["status"] = "empty"
+    return summary
+
+
+@app.post("/emisiones/batch/", tags=["Generación de Scripts"])
+async def create_emisiones_batch(
+    request: Request,
+    sap_user: str = Form(...),
+    file_output: str = Form(...),  # Ruta de guardado del archivo VBS
+    files: List[UploadFile] = File(...),  # Un archivo de Emisiones por EECC
+    sessions: int = Form(1),  # Sesiones de SAP GUI en paralelo (un script por sesión)
+    split_by: str = Form('movement'),  # División en 221/201: movement (MOV_SAP) o project (PROYECTO en la cuarta columna)
+    compact: bool = Form(False),  # Formato compacto: Sub + arreglos por PO/VR en lugar del script desenrollado
+    checkpoint: bool = Form(False)   # Scripts reanudables: anotan cada PO/VR completado y saltan los ya anotados
+):
+    """
+    Sube varios archivos de Emisiones y los procesa en paralelo.
+    Retorna un ZIP con una carpeta por archivo (script_221.vbs, script_201.vbs)
+    y un resumen.json con el estado de cada archivo.
+    """
+    _check_sessions(sessions)
+    _check_split(split_by)
+    timer = request.state.timer
+    results = await asyncio.gather(*[_process_batch_file(f, sap_user, file_output, timer, sessions, split_by, compact, checkpoint) for f in files])
+
+    zip_files = {}
+    summary = []
+    used_folders = set()
+    for result in results:
+        stem = folder = PurePath(result["file"] or "archivo").stem
+        suffix = 1
+        while folder in used_folders:
+            suffix += 1
+            folder = f"{stem}_{suffix}"
+        used_folders.add(folder)
+
+        for script_type, content in result["scripts"].items():
+            zip_files[f"{folder}/script_{script_type}.vbs"] = content
+        summary.append({
+            "file": result["file"],
+            "folder": folder,
+            "status": result["status"],
+            "message": result["message"],
+            "scripts": sorted(result["scripts"]),
+        })
+
+    zip_files["resumen.json"] = json.dumps(summary, ensure_ascii=False, indent=2)
+    status_counts = {status: sum(1 for item in summary if item["status"] == status) for status in ("ok", "empty", "error")}
+    with timer.stage("serialize"):
+        zip_content = build_zip(zip_files)
+
+    return Response(
+        content=zip_content,
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="SAP_SCRIPTS_LOTE.zip"',
+            "X-Batch-Status": ", ".join(f"{status}={count}" for status, count in status_counts.items()),
+        },
+    )
+
+
+# Operaciones MB22 disponibles en /solicitudes/stream: clave -> (Tipo Solicitud, generador)
+MB22_STREAM_OPERATIONS = {
+    'add': ('Adicionar', 'iter_addition_script'),
+    'mod': ('Modificar', 'iter_modification_script'),
+    'del': ('Borrar', 'iter_deletion_script'),
+    'sfin': ('Sfin', 'iter_sfin_script'),
+}
+
+
+def _resume_stream(df, key: str, start_from: str):
+    """Filas del script desde el PO/VR start_from; 400 si el script no lo contiene."""
+    df = pipeline.resume_from(df, key, start_from)
+    if df.empty:
+        raise HTTPException(status_code=400, detail=f"No se encontró el PO/VR {start_from} en el archivo")
+    return df
+
+
+def _vbs_streaming_response(blocks, script_type: str) -> StreamingResponse:
+    """Envía el script VBS en trozos a medida que el generador lo produce."""
+    return StreamingResponse(
+        script_generators.BaseGenerator.iter_script_chunks(blocks),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="script_{script_type}.vbs"'},
+    )
+
+
+@app.post("/emisiones/stream", tags=["Generación de Scripts"])
+async def stream_emisiones_script(
+    request: Request,
+    sap_user: str = Form(...),
+    file_output: str = Form(...),  # Ruta de guardado del archivo VBS
+    mov_type: str = Form("221"),  # Movimiento a generar: 221 o 201
+    file: UploadFile = File(...),
+    split_by: str = Form('movement'),  # División en 221/201: movement (MOV_SAP) o project (PROYECTO en la cuarta columna)
+    compact: bool = Form(False),  # Formato compacto: Sub + arreglos por PO/VR en lugar del script desenrollado
+    checkpoint: bool = Form(False),  # Scripts reanudables: anotan cada PO/VR completado y saltan los ya anotados
+    start_from: Optional[str] = Form(None)  # Genera desde este PO/VR (en el orden del archivo)
+):
+    """
+    Sube un archivo Excel de Emisiones y devuelve el script VBS del movimiento indicado
+    como un stream, sin construir el script completo en memoria.
+    """
+    if mov_type not in ('221', '201'):
+        raise HTTPException(status_code=400, detail="Tipo de movimiento inválido. Use 221 o 201")
+    _check_split(split_by)
+    if not file.filename.lower().endswith(data_processor.SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail=INVALID_FORMAT_MESSAGE)
+
+    with request.state.timer.stage("upload"):
+        upload = await read_upload(file)
+    try:
+        async with upload:
+            project_dfs = await pipeline.run_timed(pipeline_executor, request.state.timer, partial(pipeline.parse_emisiones, split_by=split_by), upload.source)
+    except data_processor.UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ocurrió un error al procesar el archivo: {e}")
+
+    if project_dfs is None:
+        return _vbs_streaming_response(iter(()), mov_type)
+
+    df = project_dfs[mov_type]
+    if start_from:
+        df = _resume_stream(df, 'PO', start_from)
+    generator = script_generators.MB21(sap_user=sap_user, file_output=file_output, compact=compact, checkpoint=checkpoint)
+    return _vbs_streaming_response(generator.iter_emission_script(df, mov_type), mov_type)
+
+
+@app.post("/solicitudes/stream", tags=["Generación de Scripts"])
+async def stream_solicitudes_script(
+    request: Request,
+    sap_user: str = Form(...),
+    file_output: str = Form(...),  # Ruta de guardado del archivo VBS
+    operation: str = Form(...),  # 222, 202, add, mod, del o sfin
+    file: UploadFile = File(...),
+    compact: bool = Form(False),  # Formato compacto: Sub + arreglos por PO/VR en lugar del script desenrollado
+    checkpoint: bool = Form(False),  # Scripts reanudables: anotan cada PO/VR completado y saltan los ya anotados
+    start_from: Optional[str] = Form(None)  # Genera desde este PO/VR (en el orden del archivo)
+):
+    """
+    Sube un archivo de Solicitudes y devuelve como stream el script VBS de una sola operación.
+    """
+    if operation not in ('222', '202', *MB22_STREAM_OPERATIONS):
+        raise HTTPException(status_code=400, detail="Operación inválida. Use 222, 202, add, mod, del o sfin")
+    if not file.filename.lower().endswith(data_processor.SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail=INVALID_FORMAT_MESSAGE)
+
+    with request.state.timer.stage("upload"):
+        upload = await read_upload(file)
+    try:
+        async with upload:
+            op_dfs = await pipeline.run_timed(pipeline_executor, request.state.timer, pipeline.parse_solicitudes, upload.source)
+
+        if op_dfs is None:
+            blocks = iter(())
+        elif operation in ('222', '202'):
+            source_mov = '221' if operation == '222' else '201'
+            df = op_dfs[f'Devolucion_{source_mov}']
+            if start_from:
+                df = _resume_stream(df, 'PO', start_from)
+            generator = script_generators.MB21(sap_user=sap_user, file_output=file_output, compact=compact, checkpoint=checkpoint)
+            blocks = generator.iter_emission_script(df, operation)
+        else:
+            tipo_solicitud, method = MB22_STREAM_OPERATIONS[operation]
+            df = op_dfs[tipo_solicitud]
+            if start_from:
+                df = _resume_stream(df, 'VR', start_from)
+            generator = script_generators.MB22(sap_user=sap_user, file_output=file_output, compact=compact, checkpoint=checkpoint)
+            blocks = getattr(generator, method)(df)
+    except HTTPException:
+        raise
+    except data_processor.UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ocurrió un error al procesar el archivo: {e}")
 
+    return _vbs_streaming_response(blocks, operation)
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
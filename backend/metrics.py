@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger("sap_scripts")
+
+
+def configure_logging() -> None:
+    """Logs estructurados del API (una línea JSON por petición) en stderr; nivel con SAP_LOG_LEVEL."""
+    logger.setLevel(os.getenv("SAP_LOG_LEVEL", "INFO").upper())
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+
+# Límites (segundos) de los histogramas de latencia
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class StageTimer:
+    """
+    Acumula la duración de cada etapa de una petición y sus contadores
+    (filas leídas, filas pendientes, POs/VRs, líneas y bytes generados).
+
+    snapshot() es un dict simple, así que puede volver desde un worker del
+    executor y mezclarse con merge() en el proceso del API.
+    """
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def snapshot(self) -> dict:
+        return {"stages": dict(self.stages), "counters": dict(self.counters)}
+
+    def merge(self, snapshot: dict) -> None:
+        for name, seconds in snapshot.get("stages", {}).items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        for name, value in snapshot.get("counters", {}).items():
+            self.count(name, value)
+
+    def server_timing(self) -> str:
+        """Valor del header Server-Timing (duraciones en milisegundos)."""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items())
+
+
+class Histogram:
+    """Histograma acumulativo con el formato de Prometheus (_bucket, _sum, _count)."""
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Registro mínimo de contadores e histogramas, expuesto en texto de Prometheus."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    lines.append(f"{name}{_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        le = 'le="%g"' % bound
+                        lines.append(f"{name}_bucket{_labels(labels, le)} {count}")
+                    le = 'le="+Inf"'
+                    lines.append(f"{name}_bucket{_labels(labels, le)} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {histogram.total:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+registry.describe("sap_requests_total", "Peticiones HTTP atendidas por endpoint y código de estado.")
+registry.describe("sap_request_duration_seconds", "Latencia de las peticiones HTTP por endpoint.")
+registry.describe("sap_stage_duration_seconds", "Duración de cada etapa del pipeline.")
+registry.describe("sap_pipeline_total", "Contadores del pipeline: filas leídas/pendientes, POs/VRs, líneas y bytes generados.")
+
+
+def record_request(endpoint: str, method: str, status: int, seconds: float, timer: Optional[StageTimer] = None) -> None:
+    """Registra una petición en las métricas y deja una línea de log estructurado (JSON)."""
+    registry.inc("sap_requests_total", endpoint=endpoint, method=method, status=str(status))
+    registry.observe("sap_request_duration_seconds", seconds, endpoint=endpoint, method=method)
+
+    event = {"event": "request", "endpoint": endpoint, "method": method, "status": status, "duration_ms": round(seconds * 1000, 1)}
+    if timer is not None:
+        for stage, stage_seconds in timer.stages.items():
+            registry.observe("sap_stage_duration_seconds", stage_seconds, endpoint=endpoint, stage=stage)
+        for counter, value in timer.counters.items():
+            registry.inc("sap_pipeline_total", value, endpoint=endpoint, counter=counter)
+        event["stages_ms"] = {stage: round(s * 1000, 1) for stage, s in timer.stages.items()}
+        event["counters"] = timer.counters
+    logger.info(json.dumps(event, ensure_ascii=False))
@@ -0,0 +1,120 @@
+"""
+Partición de las filas pendientes por operación, movimiento y proyecto en una sola pasada.
+
+Cada clave se factoriza una vez (códigos enteros por fila); cualquier combinación de
+claves se arma con esos códigos, sin volver a comparar las columnas (texto o
+categorías) valor por valor; un grupo que abarca todo el frame se reutiliza
+tal cual. Los grupos conservan el orden original de las filas.
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+from .lazy import lazy_import
+
+# pandas y numpy se importan en el primer uso (backend/lazy.py)
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Proyectos que se emiten con movimiento 201 (el resto va con 221)
+PROYECTOS_201 = ['EDIFICIOS - BROWNFIELD', 'MERMAS 2025', 'DIFERENCIAS 2025', 'VENTAS']
+
+
+def _movement_label(value) -> Hashable:
+    """201, 201.0 y '201' son el mismo movimiento: '201'."""
+    try:
+        return str(int(float(value)))
+    except (TypeError, ValueError):
+        return value
+
+
+def _project_label(value) -> str:
+    return '201' if value in PROYECTOS_201 else '221'
+
+
+# Claves de partición: nombre -> (columna, etiqueta de cada valor distinto o None para usarlo tal cual)
+SPLIT_KEYS: Dict[str, Tuple[str, Optional[Callable]]] = {
+    'operation': ('Tipo Solicitud', None),
+    'movement': ('MOV_SAP', _movement_label),
+    'project': ('PROYECTO', _project_label),
+}
+
+
+def _factorize(series: pd.Series) -> Tuple[np.ndarray, list]:
+    """Códigos por fila y valores distintos; una columna categórica ya trae sus códigos."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        labels = list(series.cat.categories)
+        if (codes < 0).any():
+            codes = np.where(codes < 0, len(labels), codes)
+            labels.append(np.nan)
+        return codes, labels
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    return codes, list(uniques)
+
+
+class Partition(dict):
+    """
+    Grupos de una partición: etiqueta (o tupla de etiquetas) -> DataFrame.
+    Una etiqueta sin filas retorna un DataFrame vacío con las mismas columnas.
+    """
+    def __init__(self, groups: dict, empty: pd.DataFrame):
+        super().__init__(groups)
+        self._empty = empty
+
+    def __missing__(self, key) -> pd.DataFrame:
+        return self._empty
+
+
+class FramePartitioner:
+    """
+    Factoriza las claves de un DataFrame una sola vez y arma particiones por
+    cualquier combinación de ellas:
+
+        parts = FramePartitioner(df, ['operation', 'movement'])
+        parts.split('operation')['Adicionar']
+        parts.split('operation', 'movement')[('Devolucion', '221')]
+    """
+    def __init__(self, df: pd.DataFrame, keys: Sequence[str]):
+        self.df = df
+        self._codes: Dict[str, np.ndarray] = {}
+        self._labels: Dict[str, list] = {}
+        for key in keys:
+            column, label = SPLIT_KEYS[key]
+            codes, labels = _factorize(df[column])
+            if label is not None:
+                labels = [label(value) for value in labels]
+                if len(set(labels)) < len(labels):
+                    # Los valores que comparten etiqueta (201 y '201') se unen en un mismo código
+                    merged, labels = pd.factorize(pd.Series(labels, dtype=object), use_na_sentinel=False)
+                    codes = merged.astype(codes.dtype)[codes]
+            self._codes[key] = codes
+            self._labels[key] = list(labels)
+
+    def split(self, *keys: str) -> Partition:
+        """Partición por las claves indicadas; con una clave las etiquetas son simples, con varias son tuplas."""
+        sizes = [len(self._labels[key]) for key in keys]
+        empty = self.df.iloc[:0]
+        if self.df.empty or 0 in sizes:
+            return Partition({}, empty)
+
+        # Pocas combinaciones (operación x movimiento x proyecto): una comparación de códigos por grupo
+        combined = self._codes[keys[0]]
+        for key, size in zip(keys[1:], sizes[1:]):
+            combined = combined.astype(np.int32) * size + self._codes[key]
+
+        result = {}
+        for group in range(int(np.prod(sizes))):
+            mask = combined == group
+            count = np.count_nonzero(mask)
+            if not count:
+                continue
+            label = tuple(self._labels[key][i] for key, i in zip(keys, np.unravel_index(group, sizes)))
+            # Un grupo que abarca todo el frame (p. ej. un archivo solo con 221) se reutiliza sin copiar
+            result[label if len(keys) > 1 else label[0]] = self.df if count == len(self.df) else self.df[mask]
+        return Partition(result, empty)
+
+
+def partition(df: pd.DataFrame, *keys: str) -> Partition:
+    """Atajo para una sola partición: partition(df, 'operation', 'movement')."""
+    return FramePartitioner(df, keys).split(*keys)
@@ -0,0 +1,371 @@
+import asyncio
+import uuid
+from contextlib import contextmanager
+from functools import partial
+from io import BytesIO
+from typing import BinaryIO, Callable, Dict, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .data_processor import EMISIONES_LAYOUTS, SOLICITUDES_LAYOUT, DataProcessor
+from .ledger import row_ledger
+from .metrics import StageTimer
+from .partition import partition
+from .script_generators import MB21, MB22
+from .sharding import STEP_COSTS, partition_groups, shard_file_output
+
+# Operaciones de Solicitudes: clave de respuesta -> (Tipo Solicitud, método del generador MB22)
+MB22_OPERATIONS = {
+    'script_mod': ('Modificar', 'generate_modification_script'),
+    'script_del': ('Borrar', 'generate_deletion_script'),
+    'script_sfin': ('Sfin', 'generate_sfin_script'),
+    'script_add': ('Adicionar', 'generate_addition_script'),
+}
+
+
+# Contenido de un archivo subido: los bytes o, si es grande, la ruta del archivo temporal en disco
+Content = Union[bytes, str]
+
+
+def open_content(content: Content) -> BinaryIO:
+    """Stream de lectura del contenido: en memoria, o el archivo en disco abierto directamente."""
+    return BytesIO(content) if isinstance(content, bytes) else open(content, 'rb')
+
+
+def _read_and_clean(processor: DataProcessor, content: Content, layout: tuple, timer: StageTimer, kind: str, incremental: bool = False) -> pd.DataFrame:
+    """
+    Lectura y limpieza de un archivo, registrando etapas y filas leídas/pendientes.
+    Con incremental=True se descartan antes de limpiar las filas que ya tienen script;
+    las demás quedan indexadas por su clave del registro.
+    """
+    with timer.stage("read_excel"), open_content(content) as file_stream:
+        df = processor._read_pending_rows(file_stream, *layout)
+    if incremental:
+        with timer.stage("ledger"):
+            df = processor.skip_scripted(df, kind, row_ledger)
+        timer.count("rows_skipped", processor.rows_skipped)
+    with timer.stage("clean"):
+        df = processor._clean(df)
+    timer.count("rows_read", processor.rows_read)
+    timer.count("rows_pending", len(df))
+    return df
+
+
+def parse_emisiones(content: Content, timer: Optional[StageTimer] = None, split_by: str = 'movement', incremental: bool = False) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Lee un archivo de Emisiones y lo divide en 221 y 201 por movimiento (MOV_SAP)
+    o, con split_by='project', por tipo de proyecto. None si no hay filas pendientes.
+    """
+    timer = timer or StageTimer()
+    processor = DataProcessor(streaming=True)
+    df = _read_and_clean(processor, content, EMISIONES_LAYOUTS[split_by], timer, 'emisiones', incremental)
+
+    if df.empty:
+        return None
+    if 'MOV_SAP' not in df.columns:
+        # El proyecto es el que va en movSAP del script
+        df['MOV_SAP'] = df['PROYECTO']
+
+    with timer.stage("split"):
+        project_dfs = partition(df, split_by)
+    return project_dfs
+
+
+def split_solicitudes(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Divide las Solicitudes por operación y las Devoluciones además por movimiento (Devolucion_221, Devolucion_201)."""
+    op_dfs = partition(df, 'operation')
+
+    # 1. Devoluciones (MB21 - 222 y 202)
+    # La plantilla de Solicitudes trae MOV_SAP en lugar de PROYECTO, por eso se divide por movimiento
+    if not op_dfs['Devolucion'].empty:
+        devoluciones = partition(op_dfs['Devolucion'], 'movement')
+        op_dfs['Devolucion_221'] = devoluciones['221']
+        op_dfs['Devolucion_201'] = devoluciones['201']
+    return op_dfs
+
+
+def parse_solicitudes(content: Content, timer: Optional[StageTimer] = None, incremental: bool = False) -> Optional[Dict[str, pd.DataFrame]]:
+    """Lee un archivo de Solicitudes y lo divide por operación. None si no hay filas pendientes."""
+    timer = timer or StageTimer()
+    processor = DataProcessor(streaming=True)
+    df = _read_and_clean(processor, content, SOLICITUDES_LAYOUT, timer, 'solicitudes', incremental)
+
+    if df.empty:
+        return None
+
+    with timer.stage("split"):
+        op_dfs = split_solicitudes(df)
+    return op_dfs
+
+
+def _count_script(timer: StageTimer, script: str) -> None:
+    if script:
+        timer.count("script_lines", script.count("\n") + 1)
+        timer.count("script_bytes", len(script.encode('utf-8')))
+
+
+def render_emission_script(df: pd.DataFrame, mov_type: str, sap_user: str, file_output: str, timer: Optional[StageTimer] = None, shard: Optional[int] = None, compact: bool = False, checkpoint: bool = False) -> str:
+    """
+    Genera un script MB21 (221, 201, 222 o 202).
+    Con shard=k el script se conecta a la sesión k de SAP GUI y escribe su propio archivo de VRs.
+    Con compact=True usa el formato compacto (Sub + arreglos por PO).
+    Con checkpoint=True el script anota cada PO completado y se puede retomar.
+    """
+    timer = timer or StageTimer()
+    with timer.stage(f"generate_{mov_type}"):
+        if shard is None:
+            generator = MB21(sap_user=sap_user, file_output=file_output, compact=compact, checkpoint=checkpoint)
+        else:
+            generator = MB21(sap_user=sap_user, file_output=shard_file_output(file_output, shard), session_index=shard,
+                             compact=compact, checkpoint=checkpoint)
+        generator.generate_emission_script(df, mov_type)
+        script = generator.get_script()
+    if not df.empty:
+        timer.count("pos", df['PO'].nunique())
+    _count_script(timer, script)
+    return script
+
+
+def render_mb22_script(method: str, df: pd.DataFrame, sap_user: str, file_output: str, timer: Optional[StageTimer] = None, shard: Optional[int] = None, compact: bool = False, checkpoint: bool = False) -> str:
+    """
+    Genera un script MB22 con el método indicado (modificación, borrado, SFIN o adición).
+    Con shard=k el script se conecta a la sesión k de SAP GUI.
+    Con compact=True usa el formato compacto (Sub + arreglos por VR).
+    Con checkpoint=True el script anota cada VR completada y se puede retomar.
+    """
+    timer = timer or StageTimer()
+    with timer.stage(method.replace('generate_', '').replace('_script', '')):
+        if shard is None:
+            generator = MB22(sap_user=sap_user, file_output=file_output, compact=compact, checkpoint=checkpoint)
+        else:
+            generator = MB22(sap_user=sap_user, file_output=shard_file_output(file_output, shard), session_index=shard,
+                             compact=compact, checkpoint=checkpoint)
+        getattr(generator, method)(df)
+        script = generator.get_script()
+    timer.count("vrs", df['VR'].nunique())
+    _count_script(timer, script)
+    return script
+
+
+def timed_call(fn, *args):
+    """Ejecuta fn(*args, timer=...) con un StageTimer propio y retorna (resultado, snapshot del timer).
+    Se usa en el executor, donde el timer de la petición no es compartido con el worker."""
+    timer = StageTimer()
+    result = fn(*args, timer=timer)
+    return result, timer.snapshot()
+
+
+def resume_from(df: pd.DataFrame, key: str, start_from: str) -> pd.DataFrame:
+    """
+    Filas desde el grupo start_from de la columna key, en el orden en que los
+    generadores recorren los grupos (primera aparición); vacío si no aparece.
+    """
+    codes, uniques = pd.factorize(df[key].astype(str), use_na_sentinel=False)
+    found = np.flatnonzero(np.asarray(uniques) == str(start_from))
+    if not len(found):
+        return df.iloc[:0]
+    return df[codes >= found[0]]
+
+
+class Tasks(dict):
+    """
+    Trabajos de generación de un archivo: clave -> (función, argumentos).
+    omitted son los scripts que se dejaron fuera por no contener el PO/VR de start_from.
+    """
+    def __init__(self):
+        super().__init__()
+        self.omitted = []
+
+    def frames(self) -> Iterator[pd.DataFrame]:
+        """Filas de cada trabajo (ya recortadas con start_from y repartidas por sesión)."""
+        for _, *args in self.values():
+            yield from (arg for arg in args if isinstance(arg, pd.DataFrame))
+
+
+def _add_task(tasks: Tasks, key: str, fn, make_args: Callable, df: pd.DataFrame, group_key: str, transaction: str, sessions: int,
+              start_from: Optional[str] = None) -> None:
+    """
+    Agrega el trabajo `key` a tasks. Con sessions > 1 agrega uno por sesión (key_s1, key_s2, ...),
+    con los grupos de group_key repartidos según los pasos estimados de la transacción.
+    Con start_from solo entra desde ese PO/VR; si no lo contiene, el script queda en tasks.omitted.
+    """
+    if start_from:
+        df = resume_from(df, group_key, start_from)
+        if df.empty:
+            tasks.omitted.append(key)
+            return
+    if sessions <= 1:
+        tasks[key] = (fn, *make_args(df))
+        return
+    for shard, shard_df in enumerate(partition_groups(df, group_key, sessions, *STEP_COSTS[transaction])):
+        if not shard_df.empty:
+            tasks[f"{key}_s{shard + 1}"] = (partial(fn, shard=shard), *make_args(shard_df))
+
+
+def _renderer(fn, **options):
+    """Función de generación con las opciones de salida activadas (compact, checkpoint)."""
+    enabled = {name: True for name, value in options.items() if value}
+    return partial(fn, **enabled) if enabled else fn
+
+
+class StartNotFoundError(ValueError):
+    """El PO/VR de start_from no está en ningún script del archivo."""
+
+
+def _check_start_from(tasks: Tasks, start_from: Optional[str]) -> None:
+    if start_from and not tasks:
+        raise StartNotFoundError(f"No se encontró el PO/VR {start_from} en el archivo")
+
+
+def _emisiones_tasks(project_dfs: Dict[str, pd.DataFrame], sessions: int = 1, compact: bool = False, checkpoint: bool = False,
+                     start_from: Optional[str] = None) -> Tasks:
+    """Trabajos de generación de un archivo de Emisiones (221 y 201): clave -> (función, argumentos)."""
+    tasks = Tasks()
+    render = _renderer(render_emission_script, compact=compact, checkpoint=checkpoint)
+    for mov_type in ('221', '201'):
+        _add_task(tasks, f'script_{mov_type}', render, lambda df, mov=mov_type: (df, mov),
+                  project_dfs[mov_type], 'PO', 'MB21', sessions, start_from)
+    _check_start_from(tasks, start_from)
+    return tasks
+
+
+def _solicitudes_tasks(op_dfs: Dict[str, pd.DataFrame], sessions: int = 1, compact: bool = False, checkpoint: bool = False,
+                       start_from: Optional[str] = None) -> Tasks:
+    """Trabajos de generación independientes de un archivo de Solicitudes: clave -> (función, argumentos)."""
+    tasks = Tasks()
+    if not op_dfs['Devolucion'].empty:
+        render = _renderer(render_emission_script, compact=compact, checkpoint=checkpoint)
+        for key, movement, mov_type in (('script_222', 'Devolucion_221', '222'), ('script_202', 'Devolucion_201', '202')):
+            _add_task(tasks, key, render, lambda df, mov=mov_type: (df, mov),
+                      op_dfs[movement], 'PO', 'MB21', sessions, start_from)
+    render = _renderer(render_mb22_script, compact=compact, checkpoint=checkpoint)
+    for key, (tipo_solicitud, method) in MB22_OPERATIONS.items():
+        if not op_dfs[tipo_solicitud].empty:
+            _add_task(tasks, key, render, lambda df, method=method: (method, df),
+                      op_dfs[tipo_solicitud], 'VR', 'MB22', sessions, start_from)
+    _check_start_from(tasks, start_from)
+    return tasks
+
+
+def _omitted_payload(message: str, omitted: list) -> dict:
+    """Mensaje y lista de los scripts que start_from dejó fuera (nada si no hubo)."""
+    if not omitted:
+        return {"message": message}
+    return {
+        "message": f"{message} Scripts omitidos (no contienen el PO/VR de inicio): {', '.join(omitted)}.",
+        "omitted_scripts": list(omitted),
+    }
+
+
+def emisiones_payload(scripts: Dict[str, str], omitted: list = ()) -> dict:
+    # Both 221 and 201 scripts are generated, now we need to return them individually
+    # (script_221/script_201, o script_221_s1, script_221_s2, ... si se repartieron en sesiones)
+    if not any(scripts.values()):
+        return {"message": "No se generaron scripts para los tipos de movimiento especificados.", "script": ""}
+
+    return {**_omitted_payload("Script de emisiones generado exitosamente.", omitted), **scripts}
+
+
+def solicitudes_payload(scripts: Dict[str, str], omitted: list = ()) -> dict:
+    payload = _omitted_payload("Script de solicitudes generado exitosamente.", omitted)
+    for key in ['script_222', 'script_202', 'script_add', 'script_mod', 'script_del', 'script_sfin']:
+        payload[key] = [scripts[key]] if key in scripts else []
+    # Scripts por sesión (script_222_s1, script_add_s2, ...)
+    payload.update({key: [script] for key, script in scripts.items() if key not in payload})
+    return payload
+
+
+NO_PENDING_PAYLOAD = {"message": "No se encontraron solicitudes pendientes en el archivo.", "script": ""}
+
+
+@contextmanager
+def ledger_batch(incremental: bool) -> Iterator[Optional[str]]:
+    """
+    Lote del registro incremental: las filas que entran en los scripts quedan reservadas
+    en el lote (_stage_scripted) y se registran solo si los scripts se generan sin error.
+    None si no es incremental.
+    """
+    if not incremental:
+        yield None
+        return
+    batch = uuid.uuid4().hex
+    try:
+        yield batch
+    except BaseException:
+        row_ledger.discard(batch)
+        raise
+    row_ledger.commit(batch)
+
+
+def _stage_scripted(batch: Optional[str], kind: str, tasks: Tasks) -> None:
+    """
+    Reserva en el lote solo las filas que entran en algún script: con start_from, las
+    anteriores al PO/VR de inicio y las de scripts omitidos siguen pendientes en el registro.
+    """
+    if batch is not None:
+        row_ledger.stage(batch, kind, [key for df in tasks.frames() for key in df.index])
+
+
+def build_emisiones_payload(content: Content, sap_user: str, file_output: str, timer: Optional[StageTimer] = None, sessions: int = 1, split_by: str = 'movement', incremental: bool = False, compact: bool = False, checkpoint: bool = False, start_from: Optional[str] = None) -> dict:
+    """Procesa un archivo de Emisiones y retorna la respuesta JSON con los scripts 221 y 201."""
+    with ledger_batch(incremental) as batch:
+        project_dfs = parse_emisiones(content, timer, split_by, incremental)
+        if project_dfs is None:
+            return dict(NO_PENDING_PAYLOAD)
+
+        tasks = _emisiones_tasks(project_dfs, sessions, compact, checkpoint, start_from)
+        _stage_scripted(batch, 'emisiones', tasks)
+        scripts = {key: fn(*args, sap_user, file_output, timer) for key, (fn, *args) in tasks.items()}
+        return emisiones_payload(scripts, tasks.omitted)
+
+
+def build_solicitudes_payload(content: Content, sap_user: str, file_output: str, timer: Optional[StageTimer] = None, sessions: int = 1, incremental: bool = False, compact: bool = False, checkpoint: bool = False, start_from: Optional[str] = None) -> dict:
+    """Procesa un archivo de Solicitudes y retorna la respuesta JSON con un script por operación."""
+    with ledger_batch(incremental) as batch:
+        op_dfs = parse_solicitudes(content, timer, incremental)
+        if op_dfs is None:
+            return dict(NO_PENDING_PAYLOAD)
+
+        tasks = _solicitudes_tasks(op_dfs, sessions, compact, checkpoint, start_from)
+        _stage_scripted(batch, 'solicitudes', tasks)
+        scripts = {key: fn(*args, sap_user, file_output, timer) for key, (fn, *args) in tasks.items()}
+        return solicitudes_payload(scripts, tasks.omitted)
+
+
+async def run_timed(executor, timer: Optional[StageTimer], fn, *args):
+    """Ejecuta fn en el executor y suma sus etapas y contadores al timer de la petición."""
+    result, snapshot = await executor.run(timed_call, fn, *args)
+    if timer is not None:
+        timer.merge(snapshot)
+    return result
+
+
+async def run_emisiones_payload(executor, content: Content, sap_user: str, file_output: str, timer: Optional[StageTimer] = None, sessions: int = 1, split_by: str = 'movement', incremental: bool = False, compact: bool = False, checkpoint: bool = False, start_from: Optional[str] = None) -> dict:
+    """Igual que build_emisiones_payload, pero en el executor y con 221 y 201 (y cada sesión) generados en paralelo."""
+    with ledger_batch(incremental) as batch:
+        project_dfs = await run_timed(executor, timer, partial(parse_emisiones, split_by=split_by, incremental=incremental), content)
+        if project_dfs is None:
+            return dict(NO_PENDING_PAYLOAD)
+
+        tasks = _emisiones_tasks(project_dfs, sessions, compact, checkpoint, start_from)
+        _stage_scripted(batch, 'emisiones', tasks)
+        results = await asyncio.gather(*[
+            run_timed(executor, timer, fn, *args, sap_user, file_output) for fn, *args in tasks.values()
+        ])
+        return emisiones_payload(dict(zip(tasks, results)), tasks.omitted)
+
+
+async def run_solicitudes_payload(executor, content: Content, sap_user: str, file_output: str, timer: Optional[StageTimer] = None, sessions: int = 1, incremental: bool = False, compact: bool = False, checkpoint: bool = False, start_from: Optional[str] = None) -> dict:
+    """Igual que build_solicitudes_payload, pero en el executor y con cada operación (y cada sesión) generada en paralelo."""
+    with ledger_batch(incremental) as batch:
+        op_dfs = await run_timed(executor, timer, partial(parse_solicitudes, incremental=incremental), content)
+        if op_dfs is None:
+            return dict(NO_PENDING_PAYLOAD)
+
+        tasks = _solicitudes_tasks(op_dfs, sessions, compact, checkpoint, start_from)
+        _stage_scripted(batch, 'solicitudes', tasks)
+        results = await asyncio.gather(*[
+            run_timed(executor, timer, fn, *args, sap_user, file_output) for fn, *args in tasks.values()
+        ])
+        return solicitudes_payload(dict(zip(tasks, results)), tasks.omitted)
@@ -1,125 +1,216 @@
+import hashlib
+import re
 import time
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from .templates import DEFAULT_PLANT, MAX_TABLE_ROWS, get_registry
+
+
+def vbs_string(value) -> str:
+    """Literal de texto VBS (las comillas se duplican)."""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def vbs_array(values) -> str:
+    """Arreglo VBS de textos: Array("a","b")."""
+    return 'Array(' + ','.join(map(vbs_string, values)) + ')'
+
+
+def vbs_call(sub: str, *args: str) -> str:
+    """Llamada a un Sub con argumentos ya formateados como VBS."""
+    return sub + ' ' + ','.join(args)
+
+
+def script_run_id(df: pd.DataFrame, kind: str) -> str:
+    """Id de ejecución de un script: huella de sus filas y de su tipo (mismo contenido, mismo id)."""
+    digest = hashlib.sha1(kind.encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:12]
+
+
+def progress_file_output(file_output: str, run_id: str) -> str:
+    """Archivo de avance junto al de VRs: Reservas.txt -> Reservas_avance_<run_id>.txt."""
+    return re.sub(r'(\.[^.\\/]*)?$', lambda match: f"_avance_{run_id}{match.group(1) or ''}", file_output, count=1)
+
 
 class BaseGenerator:
     """
     Clase base con funcionalidades comunes para todos los generadores de scripts.
+
+    Los bloques VBS salen del registro de plantillas (backend/templates.py) de la
+    transacción indicada en `transaction`, compilado para el centro `plant`.
+    session_index es la sesión de SAP GUI (connection.Children(k)) a la que se conecta el script.
+
+    Con compact=True el script no se desenrolla: define unos pocos Sub que recorren
+    arreglos y emite una llamada por PO/VR con sus datos como Array(...). Ejecuta
+    los mismos pasos de SAP GUI en el mismo orden que el formato desenrollado.
+
+    max_items son las filas visibles de la tabla de posiciones (SAP_MAX_TABLE_ROWS;
+    0 = sin límite): los PO/VR con más filas se parten en varias reservas o se recorren paginando.
+
+    Con checkpoint=True cada PO/VR completado se anota en un archivo de avance junto
+    a file_output (progress_file_output) y, al volver a ejecutar el script, los ya
+    anotados se saltan: un script que falló a mitad se retoma donde quedó. El archivo
+    lleva el id de la ejecución (script_run_id), así otro script con los mismos PO/VR
+    no los salta, y se borra cuando el script termina.
     """
-    def __init__(self, sap_user: str , file_output: str):
+    transaction = None
+
+    def __init__(self, sap_user: str , file_output: str, plant: str = DEFAULT_PLANT, session_index: int = 0,
+                 compact: bool = False, max_items: int = MAX_TABLE_ROWS, checkpoint: bool = False):
         self.sap_user = sap_user
         self.file_output = file_output  # Ruta del archivo de salida, se puede definir en cada subclase
+        self.plant = plant
+        self.session_index = session_index
+        self.compact = compact
+        self.max_items = max_items
+        self.checkpoint = checkpoint
         self.today = time.strftime("%d.%m.%Y")
+        self.blocks = get_registry(plant)[self.transaction]
         # El script se construye en una lista de strings en memoria
         self.script_lines = []
 
-    def _get_base_script_header(self):
-        return '''If Not IsObject(application) Then
-  Set SapGuiAuto  = GetObject("SAPGUI")
-  Set application = SapGuiAuto.GetScriptingEngine
-End If
-If Not IsObject(connection) Then
-  Set connection = application.Children(0)
-End If
-If Not IsObject(session) Then
-  Set session    = connection.Children(0)
-End If
-If IsObject(WScript) Then
-  WScript.ConnectObject session,     "on"
-  WScript.ConnectObject application, "on"
-End If
-session.findById("wnd[0]").maximize'''
+    def _get_base_script_header(self, df: pd.DataFrame = None, kind: str = ''):
+        header = self.blocks['header'].render(session=self.session_index)
+        if self.checkpoint:
+            run_id = script_run_id(df, f"{self.transaction}|{kind}")
+            progress = self.blocks['progress'].render(run_id=run_id, progress_path=progress_file_output(self.file_output, run_id))
+            return header + "\n" + progress
+        return header
+
+    def _get_base_script_footer(self) -> str:
+        """Cierre del script (con checkpoint, borra el archivo de avance de la ejecución)."""
+        back = self.blocks['back'].render()
+        if self.checkpoint:
+            return self.blocks['progress_end'].render() + "\n" + back
+        return back
+
+    def _checkpoint(self, key: str, block: str) -> str:
+        """Bloque de una unidad (PO/VR) que se salta si ya figura en el archivo de avance."""
+        if not self.checkpoint:
+            return block
+        template = self.blocks['checkpoint_call' if self.compact else 'checkpoint']
+        return template.render(key=key.replace('"', '""'), body=block)
+
+    @staticmethod
+    def _unit_key(kind: str, unit, part: int, parts: int) -> str:
+        """Clave de avance de una unidad: tipo|PO o VR (|parte si la unidad se partió)."""
+        key = f"{kind}|{unit}"
+        return f"{key}|{part + 1}" if parts > 1 else key
 
     def _select_check_sap(self, cant_mats: int) -> list:
-        return [f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/chkRESB-XWAOK[{n},76]").selected = true' for n in range(cant_mats)]
+        return self.blocks['item_check'].render_rows(row=range(cant_mats))
 
     def _mats_and_cants(self, store: str, mats_cants: dict) -> list:
-        lines = []
-        for i, (mat, cant) in enumerate(mats_cants.items()):
-            lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/ctxtRESB-MATNR[{i},7]").text = "{mat}"')
-            lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/txtRESB-ERFMG[{i},26]").text = "{cant}"')
-            lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/ctxtRESB-LGORT[{i},53]").text = "{store}"')
-        return lines
+        return self.blocks['item_material'].render_rows(
+            row=range(len(mats_cants)), material=mats_cants, quantity=mats_cants.values(), store=repeat(store),
+        )
+
+    def _row_slices(self, count: int) -> list:
+        """Tramos de a lo más max_items filas; uno solo si no hay límite o si las filas caben."""
+        if not self.max_items or count <= self.max_items:
+            return [slice(0, count)]
+        return [slice(start, start + self.max_items) for start in range(0, count, self.max_items)]
+
+    @staticmethod
+    def _compact_sub(name: str, params: list, lines: list) -> str:
+        """Sub del formato compacto; i y n son los contadores de sus ciclos."""
+        return "\n".join([f"Sub {name}({', '.join(params)})", "Dim i, n", *lines, "End Sub"])
+
+    @staticmethod
+    def _compact_loop(first: str, last: str, lines: list) -> list:
+        return [f"For i = {first} To {last}", *lines, "Next"]
+
+    def _iter_groups(self, df: pd.DataFrame, key: str, columns: list):
+        """
+        Agrupa el DataFrame en una sola pasada.
+        Retorna (valor de la clave, {columna: valores del grupo}) en orden de aparición,
+        igual que recorrer df[key].unique() pero sin una máscara por grupo.
+        """
+        codes, uniques = pd.factorize(df[key], use_na_sentinel=False)
+        uniques = np.asarray(uniques).tolist()
+        order = np.argsort(codes, kind='stable')
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(order)]))
+        # Listas de objetos de Python: cortarlas y formatearlas es más barato que con escalares de numpy
+        arrays = {col: df[col].to_numpy()[order].tolist() for col in columns}
+
+        for group, (start, end) in enumerate(zip(starts, ends)):
+            yield uniques[group], {col: values[start:end] for col, values in arrays.items()}
 
     def get_script(self) -> str:
         """Retorna el script completo como un string."""
         return "\n".join(self.script_lines)
 
+    @staticmethod
+    def iter_script_chunks(blocks, chunk_size: int = 64 * 1024):
+        """
+        Une los bloques de un generador iter_* igual que get_script(), pero los
+        emite en trozos de ~chunk_size caracteres a medida que se generan.
+        """
+        buffer = []
+        size = 0
+        separator = ""
+        for block in blocks:
+            buffer.append(separator)
+            buffer.append(block)
+            separator = "\n"
+            size += len(block) + 1
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield "".join(buffer)
+
 
 class MB21(BaseGenerator):
     """
     Genera scripts para la transacción MB21 (Crear Reserva).
     Incluye movimientos 201, 202, 221, 222.
     """
+    transaction = 'MB21'
     proyecto_201_map = {
         '200000703': "90010010", # EDIFICIOS - BROWNFIELD
         '200000702': "92030040", # DIFERENCIAS, MERMAS
     }
 
     def _base_mb21(self, mov_type: str):
-        return f'''session.findById("wnd[0]/tbar[0]/okcd").text = "mb21"
-session.findById("wnd[0]").sendVKey 0
-session.findById("wnd[0]/usr/ctxtRM07M-BWART").text = "{mov_type}"
-session.findById("wnd[0]/usr/ctxtRM07M-WERKS").text = "PE06"
-session.findById("wnd[0]/usr/ctxtRM07M-WERKS").caretPosition = 2
-session.findById("wnd[0]").sendVKey 0'''
+        return self.blocks['start'].render(mov_type=mov_type)
     
-    def get_details_xlsx_save_to_text(self, df, po: str):
+    def get_details_lines(self, po: str, ip_code, proy_code, ec_code):
         #This is designed to save the details of the DataFrame to a text file.
         # You can configure ur structure here.
         # """poCode = "2025-551300301"
         #    ipCode = "P-25-5592736918"
         #    proyCode = "MANTENIMIENTO 2025"
         #    ecCode = "COBRA""""
-        lines = []
-        ip_code = df[df['PO'] == po]['IP']
-        proy_code = df[df['PO'] == po]['MOV_SAP']
-        ec_code = df[df['PO'] == po]['EECC']
-        lines.append(f'poCode = "{po}"')  # Add PO code
-        lines.append(f'ipCode = "{ip_code.iloc[0]}"')  # Add IP code
-        lines.append(f'movSAP = "{proy_code.iloc[0]}"')  # Add Project code
-        lines.append(f'ecCode = "{ec_code.iloc[0]}"')  # Add EECC code
+        return [self.blocks['details'].render(po=po, ip_code=ip_code, proy_code=proy_code, ec_code=ec_code)]
 
-        return lines
+    def get_details_xlsx_save_to_text(self, df, po: str):
+        """Detalles de un PO tomados directamente del DataFrame."""
+        po_df = df[df['PO'] == po]
+        return self.get_details_lines(po, po_df['IP'].iloc[0], po_df['MOV_SAP'].iloc[0], po_df['EECC'].iloc[0])
+
+    def _area_func(self, pep: str) -> str:
+        # 221/222: the PEP is the code that identifies the project in SAP
+        # 201/202: the PEP is a cost center, the proyecto_201_map dictonary gives its area function
+        return self.proyecto_201_map.get(pep, "Default if not found")
 
     def _base_ini(self, pep: str, mov_type: str):
-        if mov_type == '221':
-            # The PEP is the code that identifies the project in SAP
-            return f'''session.findById("wnd[0]/usr/txtRKPF-WEMPF").text = "{self.sap_user}"
-session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:9000/ctxtCOBL-PS_POSID").text = "{pep}"  
-session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:9000/ctxtCOBL-FKBER").text = "NO_PRESUP"'''
-        
-        elif mov_type == '201':
-            # The PEP is the code that identifies what project will be used in SAP, for me this goes to the proyecto_201_map dictonary
-            # it takes 2 codes to identify the area function and the pep
-            area_func = self.proyecto_201_map.get(pep, "Default if not found")
-            return f'''session.findById("wnd[0]/usr/txtRKPF-WEMPF").text = "{self.sap_user}"
-session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:1013/ctxtCOBL-KOSTL").text = "{pep}"
-session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:1013/ctxtCOBL-FKBER").text = "{area_func}"'''
-
-        elif mov_type == '222': # Devolución
-            return f'''session.findById("wnd[0]/usr/ctxtKM07R-SAKNR").text = "2303000000"
-session.findById("wnd[0]/usr/txtRKPF-WEMPF").text = "{self.sap_user}"
-session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:9000/ctxtCOBL-PS_POSID").text = "{pep}"
-session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:9000/ctxtCOBL-FKBER").text = "NO_PRESUP"'''
-        # Agrega el caso para 202 si es diferente de 222
-
-        else: # Devolución 202
-            area_func = self.proyecto_201_map.get(pep, "Default if not found")
-            return f'''session.findById("wnd[0]/usr/txtRKPF-WEMPF").text = "{self.sap_user}"
-session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:1013/ctxtCOBL-KOSTL").text = "{pep}"
-session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:1013/ctxtCOBL-FKBER").text = "{area_func}"'''
-            
+        area_func = self._area_func(pep)
+        block = self.blocks.get(f'ini_{mov_type}', self.blocks['ini_202'])
+        return block.render(sap_user=self.sap_user, pep=pep, area_func=area_func)
 
     def _enter_mats(self, count_mats: int):
-        lines = ['session.findById("wnd[0]").sendVKey 11']
-        lines.extend(['session.findById("wnd[0]").sendVKey 0'] * count_mats)
-        # Click the reservation number from the status bar
-        lines.append('session.findById("wnd[0]/sbar").doubleClick')
-        lines.append('reservationNumber = session.findById("wnd[0]/sbar").Text')
-        lines.append('reservationNumber = Mid(reservationNumber, InStr(reservationNumber, "Reservation") + 14, 7)')
-        # Close and go back
-        lines.append('session.findById("wnd[0]/shellcont").close')
-        lines.append('session.findById("wnd[0]/usr/ctxtRM07M-BWART").caretPosition = 3')
-        lines.append('session.findById("wnd[0]").sendVKey 0')
+        lines = [self.blocks['confirm_items'].render()]
+        lines.extend([self.blocks['enter'].render()] * count_mats)
+        # Click the reservation number from the status bar, close and go back
+        lines.append(self.blocks['read_reservation'].render())
 
         return lines
     
@@ -128,10 +219,10 @@ session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:1013/ctxtCOBL-FKBER").text = "{ar
         if mov_type in ['221', '201']:
             file_path_vr = rf"{self.file_output}"  # Cambia esto por la ruta real del archivo VR
             # This is the base information for the VR file, adjust as needed 221 or 201
-            vr_base_information = 'file.WriteLine reservationNumber & "," & poCode & "," & ipCode & "," & proyCode & "," & ecCode'
+            vr_base_information = self.blocks['vr_record'].render()
         else:  # 202 or 222
             file_path_vr = rf"{self.file_output}"  # Cambia esto por la ruta real del archivo VR
-            vr_base_information = 'file.WriteLine reservationNumber & "," & poCode & "," & ipCode & "," & proyCode & "," & ecCode & "," & svrCode'
+            vr_base_information = self.blocks['vr_record_return'].render()
 
         return file_path_vr, vr_base_information
     
@@ -140,65 +231,109 @@ session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:1013/ctxtCOBL-FKBER").text = "{ar
         """
         Save the reservation details and goes to after the enter materials.
         """
-        lines = []
-        lines.append(f'filePath = "{file_path}"')
-        lines.append('Set fso = CreateObject("Scripting.FileSystemObject")')
-        lines.append("Set file = fso.OpenTextFile(filePath, 8, True) ' 8 = Append mode")
-        lines.append(vr_base_information)
-        lines.append('file.Close')
+        return [self.blocks['save_reservation'].render(file_path=file_path, vr_record=vr_base_information)]
 
-        return lines
+    def _compact_reserve_sub(self, mov_type: str, file_path: str, vr_base_information: str) -> str:
+        """
+        Sub Reserve del formato compacto: los mismos bloques que una reserva
+        desenrollada (detalles, checks, cabecera, materiales, Enter por material
+        y guardado), con los datos del PO como argumentos.
+        """
+        blocks = self.blocks
+        block_ini = blocks.get(f'ini_{mov_type}', blocks['ini_202'])
+        return self._compact_sub('Reserve', ['po', 'ip', 'proy', 'ec', 'pep', 'areaFunc', 'mats', 'cants', 'store'], [
+            "n = UBound(mats) + 1",
+            blocks['details'].render_expr(po='po', ip_code='ip', proy_code='proy', ec_code='ec'),
+            *self._compact_loop('0', 'n - 1', [blocks['item_check'].render_expr(row='i')]),
+            block_ini.render_expr({'sap_user': self.sap_user}, pep='pep', area_func='areaFunc'),
+            *self._compact_loop('0', 'n - 1', [
+                blocks['item_material'].render_expr(row='i', material='mats(i)', quantity='cants(i)', store='store'),
+            ]),
+            blocks['confirm_items'].render(),
+            *self._compact_loop('1', 'n', [blocks['enter'].render()]),
+            blocks['read_reservation'].render(),
+            *self.save_reservation(file_path, vr_base_information),
+        ])
 
     def generate_emission_script(self, df, mov_type: str):
         """Genera un script de emisión (221) o (201)."""
         if df.empty:
             return "No data to generate script."
-            
-        self.script_lines.append(self._get_base_script_header())
-        self.script_lines.append(self._base_mb21(mov_type))
+
+        self.script_lines.extend(self.iter_emission_script(df, mov_type))
+
+    def iter_emission_script(self, df, mov_type: str):
+        """Genera el script de emisión bloque a bloque, sin acumularlo en self.script_lines."""
+        if df.empty:
+            return
+
+        yield self._get_base_script_header(df, mov_type)
+        yield self._base_mb21(mov_type)
 
         group_by_col = 'PO' if 'PO' in df.columns else 'SVR'
 
         
         # Get the path and the vr_base_information for saving the reservation
         file_path_vr, vr_base_information = self.base_save_reservation(mov_type)
-
-        for po in df[group_by_col].unique():
-            filtered_df = df[df[group_by_col] == po]
-            materials_cants = {}
-            storage_pep = []
-
+        # Cierre de cada reserva (ingreso de materiales y guardado): solo depende de la cantidad de materiales
+        closings = {}
+        if self.compact:
+            yield self._compact_reserve_sub(mov_type, file_path_vr, vr_base_information)
+
+        # Una sola pasada de agrupación: cada PO llega con sus columnas ya extraídas
+        detail_cols = ['IP', 'MOV_SAP', 'EECC', 'Codigo Material', 'Cantidad', 'Codigo Almacen', 'ELEMENTO PEP']
+        for po, group in self._iter_groups(df, group_by_col, detail_cols):
             # Collect the details for the request of reservation
-            self.script_lines.extend(self.get_details_xlsx_save_to_text(filtered_df, po))
-            
-            for _, row in filtered_df.iterrows():
-                # Asegurarse que la cantidad es un string para el script
-                materials_cants[str(row['Codigo Material'])] = str(row['Cantidad'])
-                storage_pep.append(str(row['Codigo Almacen']))
-                storage_pep.append(str(row['ELEMENTO PEP']))
-            
-            storage_pep = sorted(list(set(storage_pep)))
+            details = (po, group['IP'][0], group['MOV_SAP'][0], group['EECC'][0])
+            details_lines = self.get_details_lines(*details)
+
+            # Asegurarse que la cantidad es un string para el script
+            materials_cants = dict(zip(map(str, group['Codigo Material']), map(str, group['Cantidad'])))
+            storage_pep = sorted(set(map(str, group['Codigo Almacen'])) | set(map(str, group['ELEMENTO PEP'])))
             # If storage_pep is empty, continue to the next iteration
             if not storage_pep:
+                yield from details_lines
                 continue 
             else:
                 almacen = storage_pep[0]
                 pep = storage_pep[1]
-                
-                self.script_lines.extend(self._select_check_sap(len(materials_cants)))
-                self.script_lines.append(self._base_ini(pep, mov_type))
-                self.script_lines.extend(self._mats_and_cants(almacen, materials_cants))
-                self.script_lines.extend(self._enter_mats(len(materials_cants)))
-                self.script_lines.extend(self.save_reservation(file_path_vr, vr_base_information))  
+                # Un PO con más materiales que filas visibles se reserva en varias partes
+                slices = self._row_slices(len(materials_cants))
+                if len(slices) == 1:
+                    chunks = [materials_cants]
+                else:
+                    items = list(materials_cants.items())
+                    chunks = [dict(items[rows]) for rows in slices]
+
+                for part, chunk in enumerate(chunks):
+                    key = self._unit_key(mov_type, po, part, len(chunks))
+                    if self.compact:
+                        yield self._checkpoint(key, vbs_call(
+                            'Reserve', *map(vbs_string, details), vbs_string(pep), vbs_string(self._area_func(pep)),
+                            vbs_array(chunk), vbs_array(chunk.values()), vbs_string(almacen),
+                        ))
+                        continue
+                    count_mats = len(chunk)
+                    if count_mats not in closings:
+                        closings[count_mats] = "\n".join(self._enter_mats(count_mats) + self.save_reservation(file_path_vr, vr_base_information))
+
+                    # Toda la reserva sale como un solo bloque
+                    lines = list(details_lines)
+                    lines.append(self.blocks['item_check'].render_count(count_mats))
+                    lines.append(self._base_ini(pep, mov_type))
+                    lines.extend(self._mats_and_cants(almacen, chunk))
+                    lines.append(closings[count_mats])
+                    yield self._checkpoint(key, "\n".join(lines))
         
         # End Script
-        self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[15]").press') # Back
+        yield self._get_base_script_footer()
 
 
 class MB22(BaseGenerator):
     """
     Genera scripts para la transacción MB22 (Modificar Reserva).
     """
+    transaction = 'MB22'
     proyecto_201_map = {
         '200000703': "90010010", # EDIFICIOS - BROWNFIELD
         '200000702': "92030040", # DIFERENCIAS, MERMAS
@@ -206,70 +341,45 @@ class MB22(BaseGenerator):
 
     # Base for the MB22 script
     def _base_mb22(self):
-        return '''session.findById("wnd[0]/tbar[0]/okcd").text = "mb22"
-session.findById("wnd[0]").sendVKey 0'''
+        return self.blocks['start'].render()
     
     # Base for joining the VR
     def join_vr(self, vr_number: str):
-        return f'''session.findById("wnd[0]/usr/ctxtRM07M-RSNUM").text = "{vr_number}"
-session.findById("wnd[0]/usr/ctxtRM07M-RSNUM").caretPosition = 7
-session.findById("wnd[0]").sendVKey 0'''
+        return self.blocks['join_vr'].render(vr=vr_number)
 
     # Base for the modification of the reservation  
     def _modify_pos(self, mod_storage: dict):
-        lines = []
-        for pos, cant in mod_storage.items():
-            lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/txtRESB-ERFMG[{pos-1},26]").text = "{cant}"')
-        return lines
+        return self.blocks['modify_item'].render_rows(row=[pos - 1 for pos in mod_storage], quantity=mod_storage.values())
 
     # Base for deleting positions 
     def _delete_pos(self, positions_to_delete: list):
-        lines = []
-        for pos in positions_to_delete:
-            lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/chkRESB-XLOEK[{pos-1},83]").selected = true')
-            lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/txtRESB-ERFMG[{pos-1},26]").text = "0"')
-        return lines
+        return self.blocks['delete_item'].render_rows(row=[pos - 1 for pos in positions_to_delete])
     
     # Base for addition, this is the base for the addition of materials (Addition )
     def _base_addition(self):
         # This is the base for addition, it can be modified to fit your needs
         # mine goes to get the date by dd.mm.yyyy
-        return '''session.findById("wnd[0]/tbar[1]/btn[7]").press
-session.findById("wnd[1]/usr/ctxtRM07M-BDTER").text = "{}"
-session.findById("wnd[1]/usr/ctxtRM07M-WERKS").text = "PE06"
-session.findById("wnd[1]/usr/ctxtRM07M-WERKS").setFocus
-session.findById("wnd[1]/usr/ctxtRM07M-WERKS").caretPosition = 4
-session.findById("wnd[1]").sendVKey 0'''.format(self.today)
+        return self.blocks['addition'].render(date=self.today)
 
     # Base for adding positions (Addition )
     def _add_pos(self, add_storage: dict):
-        lines = []
-        num_items = len(add_storage['Codigo Material'])
-        for i in range(num_items):
-            lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/ctxtRESB-MATNR[{i},7]").text = "{add_storage["Codigo Material"][i]}"')
-            lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/txtRESB-ERFMG[{i},26]").text = "{add_storage["Cantidad"][i]}"')
-            lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/ctxtRESB-LGORT[{i},53]").text = "{add_storage["Codigo Almacen"][i]}"')
-        return lines
+        return self.blocks['item_material'].render_rows(
+            row=range(len(add_storage['Codigo Material'])),
+            material=add_storage['Codigo Material'], quantity=add_storage['Cantidad'], store=add_storage['Codigo Almacen'],
+        )
     
     # Base for entering materials in MB22 (Addition )
     def _enter_mats_mb22(self, count_mats: int, mov_type:str, pep: str):
         lines = []
 
         if mov_type in ['201'] and pep is not None:
-            lines.append('session.findById("wnd[0]/usr/sub:SAPMM07R:0521/chkRESB-XWAOK[0,76]").setFocus')
-            lines.append('session.findById("wnd[0]").sendVKey 11')
-            lines.append('session.findById("wnd[0]").sendVKey 0')
-            lines.append(f'session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:1013/ctxtCOBL-FKBER").text = "{pep}"')
-            lines.append('session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:1013/ctxtCOBL-FKBER").caretPosition = 8')
+            lines.append(self.blocks['enter_items_201'].render(pep=pep))
 
         elif mov_type in ['221'] and pep is None:
-            lines.append('session.findById("wnd[0]/usr/sub:SAPMM07R:0521/chkRESB-XWAOK[1,76]").setFocus')
-            lines.append('session.findById("wnd[0]/tbar[0]/btn[11]").press')
-            lines.append('session.findById("wnd[0]").sendVKey 0')
-            lines.append('session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:9000/ctxtCOBL-FKBER").text = "NO_PRESUP"')
-            lines.append('session.findById("wnd[0]/usr/subBLOCK:SAPLKACB:9000/ctxtCOBL-FKBER").caretPosition = 9')
+            lines.append(self.blocks['enter_items_221'].render())
 
-        lines.extend(['session.findById("wnd[0]").sendVKey 0'] * count_mats)
+        if count_mats:
+            lines.append(self.blocks['enter'].render_count(count_mats))
 
         return lines
 
@@ -278,101 +388,191 @@ session.findById("wnd[1]").sendVKey 0'''.format(self.today)
         # session.findById("wnd[0]/tbar[0]/btn[11]").press''']
 
     def _sfin_pos(self, positions_to_sfin: list):
-        lines = []
-        for pos in positions_to_sfin:
-             lines.append(f'session.findById("wnd[0]/usr/sub:SAPMM07R:0521/chkRESB-KZEAR[{pos-1},78]").selected = true')
-        return lines
+        return self.blocks['sfin_item'].render_rows(row=[pos - 1 for pos in positions_to_sfin])
         
 
-    def generate_modification_script(self, df):
-        if df.empty: 
-            return
-        else:
-            self.script_lines.append(self._get_base_script_header())
-            self.script_lines.append(self._base_mb22())  # No VR needed for modification
-        for vr in df['VR'].unique():
-            self.script_lines.append(self.join_vr(str(vr)))            
-            filtered_df = df[df['VR'] == vr]
-            mod_storage = {row['POS']: row['Cantidad'] for _, row in filtered_df.iterrows()}
-            
-            self.script_lines.extend(self._modify_pos(mod_storage))
-            self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[11]").press') # Save
-        self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[15]").press') # Back
-    
-
-    def generate_deletion_script(self, df):
+    def _compact_subs(self, operation: str) -> list:
+        """
+        Sub del formato compacto para una operación: ingreso a la VR, un ciclo
+        por los arreglos de posiciones/materiales y guardado, igual que _iter_by_vr.
+        """
+        blocks = self.blocks
+        join = blocks['join_vr'].render_expr(vr='vr')
+        save = blocks['save'].render()
+        # Las posiciones existentes se alcanzan bajando `page` páginas (ver _vr_parts)
+        page_down = self._compact_loop('1', 'page', [blocks['page_down'].render()])
+        if operation == 'modification':
+            return [self._compact_sub('Modify', ['vr', 'page', 'rows', 'cants'], [
+                join,
+                *page_down,
+                *self._compact_loop('0', 'UBound(rows)', [blocks['modify_item'].render_expr(row='rows(i)', quantity='cants(i)')]),
+                save,
+            ])]
+        if operation in ('deletion', 'sfin'):
+            name, block = ('Remove', 'delete_item') if operation == 'deletion' else ('Sfin', 'sfin_item')
+            return [self._compact_sub(name, ['vr', 'page', 'rows'], [
+                join,
+                *page_down,
+                *self._compact_loop('0', 'UBound(rows)', [blocks[block].render_expr(row='rows(i)')]),
+                save,
+            ])]
+
+        # Adición: un Sub por tipo de movimiento (el ingreso de materiales cambia entre 201 y 221)
+        def addition_sub(name: str, params: list, enter_items: str) -> str:
+            return self._compact_sub(name, ['vr', 'mats', 'cants', 'stores', *params], [
+                join,
+                "n = UBound(mats) + 1",
+                self._base_addition(),
+                *self._compact_loop('0', 'n - 1', [blocks['item_check'].render_expr(row='i')]),
+                *self._compact_loop('0', 'n - 1', [
+                    blocks['item_material'].render_expr(row='i', material='mats(i)', quantity='cants(i)', store='stores(i)'),
+                ]),
+                enter_items,
+                *self._compact_loop('1', 'n', [blocks['enter'].render()]),
+                save,
+            ])
+
+        return [
+            addition_sub('Add201', ['pep'], blocks['enter_items_201'].render_expr(pep='pep')),
+            addition_sub('Add221', [], blocks['enter_items_221'].render()),
+        ]
+
+    def _vr_parts(self, group: dict, operation: str) -> list:
+        """
+        Partes (página, grupo) de una VR según las filas visibles (max_items); una sola
+        parte (0, group) si caben. Las adiciones se parten en tramos de max_items
+        materiales nuevos; en las demás operaciones cada posición existente queda en
+        la página (POS - 1) // max_items, con POS relativa a esa página.
+        """
+        if not self.max_items:
+            return [(0, group)]
+        if operation == 'addition':
+            slices = self._row_slices(len(group['Codigo Material']))
+            if len(slices) == 1:
+                return [(0, group)]
+            return [(0, {col: values[rows] for col, values in group.items()}) for rows in slices]
+
+        pages = [(pos - 1) // self.max_items for pos in group['POS']]
+        if not any(pages):
+            return [(0, group)]
+        parts = []
+        for page in sorted(set(pages)):
+            index = [i for i, row_page in enumerate(pages) if row_page == page]
+            part = {col: [values[i] for i in index] for col, values in group.items()}
+            part['POS'] = [pos - page * self.max_items for pos in part['POS']]
+            parts.append((page, part))
+        return parts
+
+    def _iter_by_vr(self, df, columns: list, build_vr_lines, operation: str, build_vr_call):
+        """
+        Núcleo común de MB22: particiona el DataFrame por VR una sola vez y
+        arma cada reserva con los arreglos ya extraídos del grupo
+        (build_vr_call en el formato compacto). Una VR con más filas que las
+        visibles se procesa en varias pasadas (ingreso, página, filas, guardado).
+        """
         if df.empty:
             return
-        else:
-            self.script_lines.append(self._get_base_script_header())
-            self.script_lines.append(self._base_mb22())  # No VR needed for deletion
-        for vr in df['VR'].unique():
-            self.script_lines.append(self.join_vr(str(vr)))
-            positions = df[df['VR'] == vr]['POS'].tolist()
-            self.script_lines.extend(self._delete_pos(positions))
-            self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[11]").press') # Save
-        self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[15]").press') # Back
+        yield self._get_base_script_header(df, operation)
+        yield self._base_mb22()  # No VR needed for the base
+
+        if self.compact:
+            yield from self._compact_subs(operation)
+            for vr, group in self._iter_groups(df, 'VR', columns):
+                parts = self._vr_parts(group, operation)
+                for index, (page, part) in enumerate(parts):
+                    yield self._checkpoint(self._unit_key(operation, vr, index, len(parts)), build_vr_call(vbs_string(vr), part, page))
+            yield self._get_base_script_footer()
+            return
 
+        save = self.blocks['save'].render()
+        page_down = self.blocks['page_down']
+        for vr, group in self._iter_groups(df, 'VR', columns):
+            join = self.join_vr(str(vr))
+            parts = self._vr_parts(group, operation)
+            for index, (page, part) in enumerate(parts):
+                # Cada reserva (o cada página de la reserva) sale como un solo bloque
+                paging = [page_down.render_count(page)] if page else []
+                block = "\n".join([join, *paging, *build_vr_lines(part), save])
+                yield self._checkpoint(self._unit_key(operation, vr, index, len(parts)), block)
+        yield self._get_base_script_footer()
+
+    def _modification_lines(self, group: dict) -> list:
+        mod_storage = dict(zip(group['POS'], group['Cantidad']))
+        return self._modify_pos(mod_storage)
+
+    def _deletion_lines(self, group: dict) -> list:
+        return self._delete_pos(list(group['POS']))
+
+    def _sfin_lines(self, group: dict) -> list:
+        return self._sfin_pos(list(group['POS']))
+
+    @staticmethod
+    def _rows_array(positions) -> str:
+        return vbs_array([pos - 1 for pos in positions])
+
+    def _modification_call(self, vr: str, group: dict, page: int) -> str:
+        return vbs_call('Modify', vr, str(page), self._rows_array(group['POS']), vbs_array(group['Cantidad']))
+
+    def _deletion_call(self, vr: str, group: dict, page: int) -> str:
+        return vbs_call('Remove', vr, str(page), self._rows_array(group['POS']))
+
+    def _sfin_call(self, vr: str, group: dict, page: int) -> str:
+        return vbs_call('Sfin', vr, str(page), self._rows_array(group['POS']))
+
+    def _addition_mov_type(self, group: dict):
+        """(tipo de movimiento, PEP) de una adición según el PEP de su primera posición."""
+        first_pep = group['ELEMENTO PEP'][0]
+        if self.proyecto_201_map.get(first_pep) is not None:
+            return '201', first_pep
+        return '221', None
+
+    def _addition_call(self, vr: str, group: dict, page: int = 0) -> str:
+        mov_type, ele_pep = self._addition_mov_type(group)
+        args = [vr, vbs_array(group['Codigo Material']), vbs_array(group['Cantidad']), vbs_array(group['Codigo Almacen'])]
+        if mov_type == '201':
+            return vbs_call('Add201', *args, vbs_string(ele_pep))
+        return vbs_call('Add221', *args)
+
+    def _addition_lines(self, group: dict) -> list:
+        # Working with Codigo Material and Cantidad because is based on my structure
+        # Pendent, add verification of stock for the material
+
+        # Confirm the move type and proyect
+        mov_type, ele_pep = self._addition_mov_type(group)
+
+        #Create a dic for the addition
+        add_storage = {col: list(group[col]) for col in ['Codigo Material', 'Cantidad', 'Codigo Almacen', 'ELEMENTO PEP']}
+        count_mats = len(add_storage['Codigo Material'])
+
+        lines = [self._base_addition()]
+        lines.append(self.blocks['item_check'].render_count(count_mats))
+        lines.extend(self._add_pos(add_storage))
+        lines.extend(self._enter_mats_mb22(count_mats, mov_type, ele_pep))
+        return lines
 
-    def generate_sfin_script(self, df):
-        if df.empty: 
-            return
-        else:
-            self.script_lines.append(self._get_base_script_header())
-            self.script_lines.append(self._base_mb22())  # No VR needed for SFIN
-        for vr in df['VR'].unique():
-            self.script_lines.append(self.join_vr(str(vr)))
-            
-            positions = df[df['VR'] == vr]['POS'].tolist()
+    def iter_modification_script(self, df):
+        return self._iter_by_vr(df, ['POS', 'Cantidad'], self._modification_lines, 'modification', self._modification_call)
 
-            self.script_lines.extend(self._sfin_pos(positions))
-            self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[11]").press') # Save
-        self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[15]").press') # Back
+    def iter_deletion_script(self, df):
+        return self._iter_by_vr(df, ['POS'], self._deletion_lines, 'deletion', self._deletion_call)
 
+    def iter_sfin_script(self, df):
+        return self._iter_by_vr(df, ['POS'], self._sfin_lines, 'sfin', self._sfin_call)
 
     # Generate script for addition
     # Pending, to add a verification for the move type
-    def generate_addition_script(self, df):
-        if df.empty:
-            return
-        else:
-            self.script_lines.append(self._get_base_script_header())
-            self.script_lines.append(self._base_mb22())  # No VR needed for addition
-
-        for vr in df['VR'].unique():
-            self.script_lines.append(self.join_vr(str(vr)))
-            
-            filtered_df = df[df['VR'] == vr]
-            # Working with Codigo Material and Cantidad because is based on my structure
-            # Pendent, add verification of stock for the material
-
-            # Confirm the move type and proyect
-            if self.proyecto_201_map.get(filtered_df['ELEMENTO PEP'].unique()[0]) is not None:
-                ele_pep = filtered_df['ELEMENTO PEP'].unique()[0]
-                mov_type = '201'
-            else:
-                ele_pep = None
-                mov_type = '221'
-
-            #Create a dic for the addition
-            add_storage = {
-                'Codigo Material': [],
-                'Cantidad': [],
-                'Codigo Almacen': [],
-                'ELEMENTO PEP': []
-            }
-
-            for _, row in filtered_df.iterrows():
-                add_storage['Codigo Material'].append(row['Codigo Material'])
-                add_storage['Cantidad'].append(row['Cantidad'])
-                add_storage['Codigo Almacen'].append(row['Codigo Almacen'])
-                add_storage['ELEMENTO PEP'].append(row['ELEMENTO PEP'])
-            
-            self.script_lines.append(self._base_addition())
-            self.script_lines.extend(self._select_check_sap(len(add_storage['Codigo Material'])))
-            self.script_lines.extend(self._add_pos(add_storage))
-            self.script_lines.extend(self._enter_mats_mb22(len(add_storage['Codigo Material']), mov_type,ele_pep))
-            self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[11]").press') # Save
-
-        self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[15]").press')
+    def iter_addition_script(self, df):
+        return self._iter_by_vr(df, ['Codigo Material', 'Cantidad', 'Codigo Almacen', 'ELEMENTO PEP'], self._addition_lines,
+                                'addition', self._addition_call)
 
+    def generate_modification_script(self, df):
+        self.script_lines.extend(self.iter_modification_script(df))
+
+    def generate_deletion_script(self, df):
+        self.script_lines.extend(self.iter_deletion_script(df))
+
+    def generate_sfin_script(self, df):
+        self.script_lines.extend(self.iter_sfin_script(df))
+
+    def generate_addition_script(self, df):
+        self.script_lines.extend(self.iter_addition_script(df))
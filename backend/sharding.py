@@ -0,0 +1,51 @@
+"""
+Reparto de POs/VRs entre varias sesiones de SAP GUI.
+
+Cada shard es un script independiente que se conecta a connection.Children(k)
+y escribe su propio archivo de VRs, así se pueden ejecutar N sesiones en paralelo.
+"""
+import heapq
+import re
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# Pasos SAP GUI estimados por reserva: (fijos por PO/VR, por cada material/posición)
+STEP_COSTS = {
+    'MB21': (18, 5),  # detalles, cabecera, cierre y guardado; check + material + Enter por fila
+    'MB22': (4, 3),   # ingreso y guardado de la VR; líneas por posición (promedio de las operaciones)
+}
+
+# Máximo de sesiones que SAP GUI permite abrir por conexión
+MAX_SESSIONS = 6
+
+
+def partition_groups(df: pd.DataFrame, key: str, shards: int, fixed_steps: int, steps_per_row: int) -> List[pd.DataFrame]:
+    """
+    Reparte los grupos de `key` en `shards` DataFrames balanceados por pasos estimados
+    (fixed_steps + steps_per_row * filas del grupo). Los grupos grandes se asignan
+    primero a la sesión con menos carga; cada grupo queda entero en un shard y
+    conserva su orden original. No retorna shards vacíos.
+    """
+    if df.empty or shards <= 1:
+        return [df]
+
+    codes, _ = pd.factorize(df[key], use_na_sentinel=False)
+    costs = fixed_steps + steps_per_row * np.bincount(codes)
+    shards = min(shards, len(costs))
+
+    loads = [(0, shard) for shard in range(shards)]
+    assignment = np.empty(len(costs), dtype=np.int64)
+    for group in np.argsort(-costs, kind='stable'):
+        load, shard = heapq.heappop(loads)
+        assignment[group] = shard
+        heapq.heappush(loads, (load + int(costs[group]), shard))
+
+    row_shards = assignment[codes]
+    return [df[row_shards == shard] for shard in range(shards)]
+
+
+def shard_file_output(file_output: str, shard: int) -> str:
+    """Archivo de VRs propio de cada sesión: Reservas.txt -> Reservas_s1.txt, Reservas_s2.txt, ..."""
+    return re.sub(r'(\.[^.\\/]*)?$', lambda match: f"_s{shard + 1}{match.group(1) or ''}", file_output, count=1)
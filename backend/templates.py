@@ -0,0 +1,270 @@
+"""
+Registro de plantillas VBS de las transacciones SAP (MB21, MB22).
+
+Cada transacción se declara como un diccionario {nombre del bloque: texto}.
+Los huecos {nombre} que coinciden con una constante (rutas de pantalla, centro)
+se resuelven al compilar; el resto son huecos variables que se llenan al
+renderizar. La compilación se hace una vez por centro y queda en caché.
+
+Para agregar una transacción basta con declarar sus bloques en TRANSACTIONS
+y usarlos desde un generador con self.blocks['nombre'].
+"""
+import os
+import re
+from functools import lru_cache
+from string import Formatter
+from typing import Dict
+
+# Centro (planta) SAP de las reservas
+DEFAULT_PLANT = os.getenv("SAP_PLANT", "PE06")
+# Filas que la tabla de posiciones de MB21/MB22 muestra sin desplazarse. Es un valor
+# conservador: partir o paginar antes de la última fila visible no cambia el resultado
+VISIBLE_TABLE_ROWS = 12
+# Filas visibles de la tabla de posiciones (SAP_MAX_TABLE_ROWS=0 quita el límite). Las
+# reservas con más materiales se parten y las posiciones de más abajo se alcanzan paginando.
+MAX_TABLE_ROWS = int(os.getenv("SAP_MAX_TABLE_ROWS", str(VISIBLE_TABLE_ROWS)))
+
+# Rutas de pantalla que se repiten en los bloques
+SCREENS = {
+    'items': 'wnd[0]/usr/sub:SAPMM07R:0521',           # Tabla de posiciones de la reserva
+    'pep_block': 'wnd[0]/usr/subBLOCK:SAPLKACB:9000',  # Imputación a elemento PEP
+    'kostl_block': 'wnd[0]/usr/subBLOCK:SAPLKACB:1013',  # Imputación a centro de costo
+}
+
+# Bloques comunes a todas las transacciones
+COMMON_BLOCKS = {
+    'header': '''If Not IsObject(application) Then
+  Set SapGuiAuto  = GetObject("SAPGUI")
+  Set application = SapGuiAuto.GetScriptingEngine
+End If
+If Not IsObject(connection) Then
+  Set connection = application.Children(0)
+End If
+If Not IsObject(session) Then
+  Set session    = connection.Children({session})
+End If
+If IsObject(WScript) Then
+  WScript.ConnectObject session,     "on"
+  WScript.ConnectObject application, "on"
+End If
+session.findById("wnd[0]").maximize''',
+    'enter': 'session.findById("wnd[0]").sendVKey 0',
+    'save': 'session.findById("wnd[0]/tbar[0]/btn[11]").press',
+    'back': 'session.findById("wnd[0]/tbar[0]/btn[15]").press',
+    # Página siguiente de la tabla de posiciones (P+)
+    'page_down': 'session.findById("wnd[0]").sendVKey 82',
+    # Avance del script: lee las unidades (PO/VR) ya completadas de una ejecución anterior.
+    # El archivo lleva el id de la ejecución (huella del contenido del script)
+    'progress': '''' Id de ejecucion {run_id}
+progressPath = "{progress_path}"
+Set progressFso = CreateObject("Scripting.FileSystemObject")
+Set progressDone = CreateObject("Scripting.Dictionary")
+If progressFso.FileExists(progressPath) Then
+  Set progressFile = progressFso.OpenTextFile(progressPath, 1)
+  Do Until progressFile.AtEndOfStream
+    progressKey = progressFile.ReadLine
+    If Not progressDone.Exists(progressKey) Then progressDone.Add progressKey, True
+  Loop
+  progressFile.Close
+End If
+Function Pending(key)
+  Pending = Not progressDone.Exists(key)
+End Function
+Sub MarkDone(key)
+  Set progressFile = progressFso.OpenTextFile(progressPath, 8, True) ' 8 = Append mode
+  progressFile.WriteLine key
+  progressFile.Close
+End Sub''',
+    # Una unidad (PO/VR) que se salta si ya figura en el archivo de avance
+    'checkpoint': '''If Pending("{key}") Then
+{body}
+MarkDone "{key}"
+End If''',
+    'checkpoint_call': 'If Pending("{key}") Then {body} : MarkDone "{key}"',
+    # Script completo: el avance de esta ejecución ya no se necesita
+    'progress_end': 'If progressFso.FileExists(progressPath) Then progressFso.DeleteFile progressPath',
+    # Una fila por posición de la tabla
+    'item_check': 'session.findById("{items}/chkRESB-XWAOK[{row},76]").selected = true',
+    'item_material': '''session.findById("{items}/ctxtRESB-MATNR[{row},7]").text = "{material}"
+session.findById("{items}/txtRESB-ERFMG[{row},26]").text = "{quantity}"
+session.findById("{items}/ctxtRESB-LGORT[{row},53]").text = "{store}"''',
+}
+
+# Imputación a centro de costo (201 y su devolución 202)
+_MB21_KOSTL = '''session.findById("wnd[0]/usr/txtRKPF-WEMPF").text = "{sap_user}"
+session.findById("{kostl_block}/ctxtCOBL-KOSTL").text = "{pep}"
+session.findById("{kostl_block}/ctxtCOBL-FKBER").text = "{area_func}"'''
+
+TRANSACTIONS = {
+    'MB21': {
+        'start': '''session.findById("wnd[0]/tbar[0]/okcd").text = "mb21"
+session.findById("wnd[0]").sendVKey 0
+session.findById("wnd[0]/usr/ctxtRM07M-BWART").text = "{mov_type}"
+session.findById("wnd[0]/usr/ctxtRM07M-WERKS").text = "{plant}"
+session.findById("wnd[0]/usr/ctxtRM07M-WERKS").caretPosition = 2
+session.findById("wnd[0]").sendVKey 0''',
+        'details': '''poCode = "{po}"
+ipCode = "{ip_code}"
+movSAP = "{proy_code}"
+ecCode = "{ec_code}"''',
+        # Cabecera de la reserva por tipo de movimiento
+        'ini_221': '''session.findById("wnd[0]/usr/txtRKPF-WEMPF").text = "{sap_user}"
+session.findById("{pep_block}/ctxtCOBL-PS_POSID").text = "{pep}"  
+session.findById("{pep_block}/ctxtCOBL-FKBER").text = "NO_PRESUP"''',
+        'ini_201': _MB21_KOSTL,
+        'ini_222': '''session.findById("wnd[0]/usr/ctxtKM07R-SAKNR").text = "2303000000"
+session.findById("wnd[0]/usr/txtRKPF-WEMPF").text = "{sap_user}"
+session.findById("{pep_block}/ctxtCOBL-PS_POSID").text = "{pep}"
+session.findById("{pep_block}/ctxtCOBL-FKBER").text = "NO_PRESUP"''',
+        'ini_202': _MB21_KOSTL,
+        'confirm_items': 'session.findById("wnd[0]").sendVKey 11',
+        'read_reservation': '''session.findById("wnd[0]/sbar").doubleClick
+reservationNumber = session.findById("wnd[0]/sbar").Text
+reservationNumber = Mid(reservationNumber, InStr(reservationNumber, "Reservation") + 14, 7)
+session.findById("wnd[0]/shellcont").close
+session.findById("wnd[0]/usr/ctxtRM07M-BWART").caretPosition = 3
+session.findById("wnd[0]").sendVKey 0''',
+        # Línea del archivo de VRs creadas (emisión y devolución)
+        'vr_record': 'file.WriteLine reservationNumber & "," & poCode & "," & ipCode & "," & proyCode & "," & ecCode',
+        'vr_record_return': 'file.WriteLine reservationNumber & "," & poCode & "," & ipCode & "," & proyCode & "," & ecCode & "," & svrCode',
+        'save_reservation': '''filePath = "{file_path}"
+Set fso = CreateObject("Scripting.FileSystemObject")
+Set file = fso.OpenTextFile(filePath, 8, True) ' 8 = Append mode
+{vr_record}
+file.Close''',
+    },
+    'MB22': {
+        'start': '''session.findById("wnd[0]/tbar[0]/okcd").text = "mb22"
+session.findById("wnd[0]").sendVKey 0''',
+        'join_vr': '''session.findById("wnd[0]/usr/ctxtRM07M-RSNUM").text = "{vr}"
+session.findById("wnd[0]/usr/ctxtRM07M-RSNUM").caretPosition = 7
+session.findById("wnd[0]").sendVKey 0''',
+        'modify_item': 'session.findById("{items}/txtRESB-ERFMG[{row},26]").text = "{quantity}"',
+        'delete_item': '''session.findById("{items}/chkRESB-XLOEK[{row},83]").selected = true
+session.findById("{items}/txtRESB-ERFMG[{row},26]").text = "0"''',
+        'sfin_item': 'session.findById("{items}/chkRESB-KZEAR[{row},78]").selected = true',
+        'addition': '''session.findById("wnd[0]/tbar[1]/btn[7]").press
+session.findById("wnd[1]/usr/ctxtRM07M-BDTER").text = "{date}"
+session.findById("wnd[1]/usr/ctxtRM07M-WERKS").text = "{plant}"
+session.findById("wnd[1]/usr/ctxtRM07M-WERKS").setFocus
+session.findById("wnd[1]/usr/ctxtRM07M-WERKS").caretPosition = 4
+session.findById("wnd[1]").sendVKey 0''',
+        'enter_items_201': '''session.findById("{items}/chkRESB-XWAOK[0,76]").setFocus
+session.findById("wnd[0]").sendVKey 11
+session.findById("wnd[0]").sendVKey 0
+session.findById("{kostl_block}/ctxtCOBL-FKBER").text = "{pep}"
+session.findById("{kostl_block}/ctxtCOBL-FKBER").caretPosition = 8''',
+        'enter_items_221': '''session.findById("{items}/chkRESB-XWAOK[1,76]").setFocus
+session.findById("wnd[0]/tbar[0]/btn[11]").press
+session.findById("wnd[0]").sendVKey 0
+session.findById("{pep_block}/ctxtCOBL-FKBER").text = "NO_PRESUP"
+session.findById("{pep_block}/ctxtCOBL-FKBER").caretPosition = 9''',
+    },
+}
+
+
+def _escape(text: str) -> str:
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+# Literal de texto VBS ("" es una comilla dentro del literal) y marca de un hueco con expresión
+_VBS_STRING = re.compile(r'"(?:[^"]|"")*"')
+_EXPR_MARK = re.compile(r'\x00(\d+)\x00')
+
+
+class Template:
+    """
+    Bloque VBS compilado: los tramos constantes ya unidos y solo los huecos
+    variables (slots) por llenar.
+
+    render(**valores) arma un bloque; render_rows(**columnas) arma un bloque por
+    fila recorriendo las columnas en paralelo (una llamada a str.format por fila).
+    """
+    __slots__ = ('slots', 'text', '_format_map', '_format_row', '_counts')
+
+    def __init__(self, source: str, constants: Dict[str, str]):
+        named, positional, slots = [], [], []
+        for literal, field, _, _ in Formatter().parse(source):
+            named.append(_escape(literal))
+            positional.append(_escape(literal))
+            if field is None:
+                continue
+            if field in constants:
+                named.append(_escape(str(constants[field])))
+                positional.append(_escape(str(constants[field])))
+                continue
+            if field not in slots:
+                slots.append(field)
+            named.append('{' + field + '}')
+            positional.append('{' + str(slots.index(field)) + '}')
+
+        self.slots = tuple(slots)
+        # Sin huecos variables el bloque ya es el texto final
+        self.text = ''.join(named).format() if not slots else None
+        self._format_map = ''.join(named).format_map
+        self._format_row = ''.join(positional).format
+        self._counts = {}
+
+    def render(self, **values) -> str:
+        if self.text is not None:
+            return self.text
+        return self._format_map(values)
+
+    def render_expr(self, values: Dict[str, str] = None, **expressions) -> str:
+        """
+        Bloque con los huecos de `expressions` reemplazados por expresiones VBS
+        (variables, elementos de arreglo) en lugar de valores: .text = "{x}" queda
+        .text = x y "[{row},76]" queda "[" & row & ",76]". Los huecos de `values`
+        se llenan como en render(). Se usa en los Sub del formato compacto.
+        """
+        exprs = list(expressions.values())
+        text = self.render(**(values or {}), **{slot: f'\x00{i}\x00' for i, slot in enumerate(expressions)})
+
+        def concat(literal):
+            # Tramos del literal y expresiones alternados; solo se unen los que no están vacíos
+            pieces = _EXPR_MARK.split(literal.group()[1:-1])
+            segments = [exprs[int(piece)] if i % 2 else f'"{piece}"' for i, piece in enumerate(pieces) if piece]
+            return ' & '.join(segments) or '""'
+
+        text = _VBS_STRING.sub(concat, text)
+        return _EXPR_MARK.sub(lambda mark: exprs[int(mark.group(1))], text)
+
+    def render_rows(self, **columns) -> list:
+        return list(map(self._format_row, *[columns[slot] for slot in self.slots]))
+
+    def render_count(self, count: int) -> str:
+        """
+        Bloque repetido count veces (filas 0..count-1 si el único hueco es {row}),
+        unido con saltos de línea; queda en caché por count.
+        """
+        block = self._counts.get(count)
+        if block is None:
+            rows = self.render_rows(row=range(count)) if self.slots else [self.text] * count
+            block = self._counts[count] = "\n".join(rows)
+        return block
+
+
+class TemplateRegistry:
+    """Plantillas compiladas por transacción; registry['MB21'] incluye los bloques comunes."""
+    def __init__(self, transactions: Dict[str, Dict[str, str]], constants: Dict[str, str]):
+        common = {name: Template(source, constants) for name, source in COMMON_BLOCKS.items()}
+        self._blocks = {
+            transaction: {**common, **{name: Template(source, constants) for name, source in blocks.items()}}
+            for transaction, blocks in transactions.items()
+        }
+
+    def __getitem__(self, transaction: str) -> Dict[str, Template]:
+        return self._blocks[transaction]
+
+    def transactions(self) -> list:
+        return list(self._blocks)
+
+
+@lru_cache(maxsize=None)
+def get_registry(plant: str = DEFAULT_PLANT) -> TemplateRegistry:
+    """Registro compilado para un centro; se compila una sola vez por centro."""
+    return TemplateRegistry(TRANSACTIONS, {**SCREENS, 'plant': plant})
+
+
+# Compilado al importar con el centro por defecto
+registry = get_registry()
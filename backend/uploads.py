@@ -0,0 +1,205 @@
+"""
+Lectura acotada en memoria de los archivos subidos.
+
+Cada subida se lee una sola vez: se calcula su hash (clave de caché) mientras
+se lee y, si supera UPLOAD_SPOOL_BYTES, se vuelca a un archivo temporal en
+disco; el pipeline recibe los bytes (archivos chicos) o la ruta del archivo
+(archivos grandes) y el lector abre el archivo directamente, sin otra copia.
+
+Los archivos multipart (UploadFile) ya llegan guardados por Starlette en
+file.file y se leen de ahí, sin pasar por otro búfer. Solo los grandes se
+copian a un archivo con nombre: el temporal de Starlette no tiene ruta (se
+borra al crearse) y los workers del executor son otros procesos, que solo
+pueden abrir el archivo por su ruta.
+
+Las peticiones de más de MAX_UPLOAD_BYTES se rechazan con 413: de inmediato si
+traen Content-Length, o en cuanto se pasa el límite mientras se recibe el cuerpo.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import AsyncIterator, BinaryIO, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+MB = 1024 * 1024
+
+# Tamaño máximo del cuerpo de una petición (archivo o filas)
+MAX_UPLOAD_BYTES = int(float(os.getenv("SAP_MAX_UPLOAD_MB", "100")) * MB)
+# Por encima de este tamaño la subida se guarda en disco en lugar de en memoria
+UPLOAD_SPOOL_BYTES = int(float(os.getenv("SAP_UPLOAD_SPOOL_MB", "8")) * MB)
+# Directorio de los archivos temporales (por defecto el del sistema)
+UPLOAD_DIR = os.getenv("SAP_UPLOAD_DIR") or None
+# Tamaño de cada bloque leído de la subida
+CHUNK_BYTES = MB
+
+
+def _too_large_detail(max_bytes: int) -> str:
+    return f"El archivo supera el tamaño máximo permitido ({max_bytes / MB:g} MB)"
+
+
+class Upload:
+    """
+    Archivo subido, ya leído: en memoria (content) o en un archivo temporal (path).
+    source es lo que recibe el pipeline; close() borra el archivo temporal.
+    """
+    def __init__(self, digest: str, size: int, content: Optional[bytes] = None, path: Optional[str] = None):
+        self.digest = digest
+        self.size = size
+        self.content = content
+        self.path = path
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        return self.content if self.path is None else self.path
+
+    def close(self) -> None:
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+    async def __aenter__(self) -> "Upload":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+
+async def spool_chunks(chunks: AsyncIterator[bytes], max_bytes: int = MAX_UPLOAD_BYTES, spool_bytes: int = UPLOAD_SPOOL_BYTES) -> Upload:
+    """Lee los bloques de una subida hasta el límite (413 si lo supera), con hash y volcado a disco."""
+    digest = hashlib.sha256()
+    size = 0
+    buffer = []
+    spool = None
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=_too_large_detail(max_bytes))
+            digest.update(chunk)
+            if spool is None and size > spool_bytes:
+                spool = tempfile.NamedTemporaryFile(prefix="sap_upload_", dir=UPLOAD_DIR, delete=False)
+                spool.writelines(buffer)
+                buffer = []
+            if spool is None:
+                buffer.append(chunk)
+            else:
+                spool.write(chunk)
+    except BaseException:
+        if spool is not None:
+            spool.close()
+            os.remove(spool.name)
+        raise
+
+    if spool is None:
+        return Upload(digest.hexdigest(), size, content=b"".join(buffer))
+    spool.close()
+    return Upload(digest.hexdigest(), size, path=spool.name)
+
+
+class _HashingReader:
+    """Lectura de un archivo que va actualizando el hash con cada bloque leído."""
+    def __init__(self, file: BinaryIO, digest):
+        self.file = file
+        self.digest = digest
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.file.read(size)
+        self.digest.update(chunk)
+        return chunk
+
+
+def _copy_to_spool(file: BinaryIO) -> Upload:
+    """Copia el archivo a un temporal con nombre, calculando el hash en la misma pasada."""
+    digest = hashlib.sha256()
+    spool = tempfile.NamedTemporaryFile(prefix="sap_upload_", dir=UPLOAD_DIR, delete=False)
+    try:
+        with spool:
+            shutil.copyfileobj(_HashingReader(file, digest), spool, CHUNK_BYTES)
+    except BaseException:
+        os.remove(spool.name)
+        raise
+    return Upload(digest.hexdigest(), os.path.getsize(spool.name), path=spool.name)
+
+
+async def read_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES, spool_bytes: int = UPLOAD_SPOOL_BYTES) -> Upload:
+    """
+    Lee un archivo subido (multipart) directamente del archivo en que Starlette lo
+    guardó (413 si supera max_bytes): los chicos en una sola lectura y los que superan
+    spool_bytes copiándolos a un temporal con nombre, con el hash en la misma pasada.
+    """
+    size = file.size
+    if size is None:
+        size = await run_in_threadpool(file.file.seek, 0, os.SEEK_END)
+    if size > max_bytes:
+        raise HTTPException(status_code=413, detail=_too_large_detail(max_bytes))
+
+    await file.seek(0)
+    if size <= spool_bytes:
+        content = await file.read()
+        return Upload(hashlib.sha256(content).hexdigest(), len(content), content=content)
+    return await run_in_threadpool(_copy_to_spool, file.file)
+
+
+class UploadLimitMiddleware:
+    """
+    Rechaza con 413 las peticiones cuyo cuerpo supera max_bytes, antes de que el
+    cuerpo (multipart o filas) se termine de recibir y se guarde.
+    """
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": _too_large_detail(self.max_bytes)})
+            return await response(scope, receive, send)
+
+        # Sin Content-Length (chunked) se cuenta lo recibido y, al pasar el límite, se
+        # responde 413 aquí mismo y la aplicación ve la conexión cerrada; lo que intente
+        # enviar después se descarta
+        received = 0
+        started = False
+        rejected = False
+
+        async def limited_send(message):
+            nonlocal started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    rejected = True
+                    if not started:
+                        response = JSONResponse(status_code=413, content={"detail": _too_large_detail(self.max_bytes)})
+                        await response(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except Exception:
+            if not rejected:
+                raise
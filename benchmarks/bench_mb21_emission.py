@@ -0,0 +1,103 @@
+"""
+Benchmark de MB21.generate_emission_script.
+
+Compara el motor agrupado en una sola pasada contra la implementación anterior
+(una máscara por PO + iterrows) y verifica que los scripts sean idénticos.
+
+Uso:
+    python -m benchmarks.bench_mb21_emission --rows 10000 100000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from backend.script_generators import MB21
+
+
+class LegacyMB21(MB21):
+    """Implementación previa de generate_emission_script, solo como referencia."""
+
+    def generate_emission_script(self, df, mov_type: str):
+        if df.empty:
+            return "No data to generate script."
+
+        self.script_lines.append(self._get_base_script_header())
+        self.script_lines.append(self._base_mb21(mov_type))
+
+        group_by_col = 'PO' if 'PO' in df.columns else 'SVR'
+        file_path_vr, vr_base_information = self.base_save_reservation(mov_type)
+
+        for po in df[group_by_col].unique():
+            filtered_df = df[df[group_by_col] == po]
+            materials_cants = {}
+            storage_pep = []
+
+            self.script_lines.extend(self.get_details_xlsx_save_to_text(filtered_df, po))
+
+            for _, row in filtered_df.iterrows():
+                materials_cants[str(row['Codigo Material'])] = str(row['Cantidad'])
+                storage_pep.append(str(row['Codigo Almacen']))
+                storage_pep.append(str(row['ELEMENTO PEP']))
+
+            storage_pep = sorted(list(set(storage_pep)))
+            if not storage_pep:
+                continue
+            almacen = storage_pep[0]
+            pep = storage_pep[1]
+
+            self.script_lines.extend(self._select_check_sap(len(materials_cants)))
+            self.script_lines.append(self._base_ini(pep, mov_type))
+            self.script_lines.extend(self._mats_and_cants(almacen, materials_cants))
+            self.script_lines.extend(self._enter_mats(len(materials_cants)))
+            self.script_lines.extend(self.save_reservation(file_path_vr, vr_base_information))
+
+        self.script_lines.append('session.findById("wnd[0]/tbar[0]/btn[15]").press')
+
+
+def make_emisiones_df(rows: int, mats_per_po: int = 5, seed: int = 0) -> pd.DataFrame:
+    """DataFrame de emisiones ya limpio (como lo entrega DataProcessor), para un solo movimiento."""
+    rng = random.Random(seed)
+    data = {col: [] for col in ['PO', 'EECC', 'MOV_SAP', 'IP', 'Codigo Material', 'Cantidad', 'Codigo Almacen', 'ELEMENTO PEP']}
+    po_number = 0
+    while len(data['PO']) < rows:
+        po_number += 1
+        almacen = str(rng.choice([4, 16, 38])).zfill(4)
+        pep = f"P-2000-25-0002-{po_number % 97:05d}-008"
+        for _ in range(min(rng.randint(1, mats_per_po * 2 - 1), rows - len(data['PO']))):
+            data['PO'].append(f"2025-{540000000 + po_number}")
+            data['EECC'].append(f"EECC_{po_number % 13}")
+            data['MOV_SAP'].append(221)
+            data['IP'].append(f"IP_{po_number}")
+            data['Codigo Material'].append(str(10402520000 + rng.randint(0, 500)))
+            data['Cantidad'].append(str(rng.randint(1, 100)))
+            data['Codigo Almacen'].append(almacen)
+            data['ELEMENTO PEP'].append(pep)
+    return pd.DataFrame(data)
+
+
+def _time_generator(cls, df: pd.DataFrame):
+    generator = cls(sap_user="YP00118", file_output=r"C:\Descargas\Reservas_creadas_SAP.txt")
+    start = time.perf_counter()
+    generator.generate_emission_script(df, '221')
+    return time.perf_counter() - start, generator.get_script()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'POs':>7} {'legacy (s)':>11} {'grouped (s)':>12} {'speedup':>8}")
+    for rows in args.rows:
+        df = make_emisiones_df(rows)
+        legacy_time, legacy_script = _time_generator(LegacyMB21, df)
+        grouped_time, grouped_script = _time_generator(MB21, df)
+        if legacy_script != grouped_script:
+            raise SystemExit(f"Los scripts difieren para {rows} filas")
+        print(f"{rows:>8} {df['PO'].nunique():>7} {legacy_time:>11.3f} {grouped_time:>12.3f} {legacy_time / grouped_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
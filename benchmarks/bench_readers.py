@@ -0,0 +1,130 @@
+"""
+Benchmark de los lectores de .xlsx (EXCEL_READERS de DataProcessor).
+
+Escala el libro de ejemplo de Emisiones (examples/TEST_FILE_VR_201_221_.xlsx)
+repitiendo sus filas hasta --rows filas y, opcionalmente, genera un libro
+sintético de Solicitudes; luego mide la lectura con filtro PENDIENTE de cada
+lector (mejor tiempo de --repeat) y verifica que todos entreguen las mismas
+filas ya limpias. Los lectores que no están instalados se informan y se omiten.
+
+Uso:
+    python -m benchmarks.bench_readers --rows 10000 100000 --repeat 3
+"""
+import argparse
+import importlib.util
+import json
+import time
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from backend.data_processor import EMISIONES_LAYOUT, EXCEL_READERS, SOLICITUDES_LAYOUT, DataProcessor
+
+from .synthetic import SyntheticSpec, write_workbook
+
+EXAMPLE_FILE = Path(__file__).resolve().parent.parent / "examples" / "TEST_FILE_VR_201_221_.xlsx"
+
+# Módulo opcional de cada lector que no viene con las dependencias básicas
+OPTIONAL_MODULES = {'calamine': 'python_calamine'}
+
+
+def scale_example(path: Path, rows: int, example: Path = EXAMPLE_FILE) -> None:
+    """Escribe un libro con las filas del ejemplo repetidas hasta completar rows (un PO distinto por copia)."""
+    source = load_workbook(example, read_only=True, data_only=True)
+    try:
+        sheet = source[EMISIONES_LAYOUT[0]]
+        header, *body = sheet.iter_rows(values_only=True)
+    finally:
+        source.close()
+
+    workbook = Workbook(write_only=True)
+    target = workbook.create_sheet(EMISIONES_LAYOUT[0])
+    target.append(header)
+    for i in range(rows):
+        copy, row = divmod(i, len(body))
+        values = list(body[row])
+        values[0] = f"{values[0]}-{copy}"
+        target.append(values)
+    workbook.save(path)
+
+
+def _workbooks(rows: int, layouts: list, data_dir: Path):
+    """(plantilla, layout de lectura, contenido) de cada libro a medir; se generan una vez por tamaño."""
+    for layout in layouts:
+        path = data_dir / f"readers_{layout}_{rows}.xlsx"
+        if not path.exists():
+            if layout == "emisiones":
+                scale_example(path, rows)
+            else:
+                write_workbook(path, layout, SyntheticSpec(rows))
+        yield layout, EMISIONES_LAYOUT if layout == "emisiones" else SOLICITUDES_LAYOUT, path.read_bytes()
+
+
+def measure(reader: str, content: bytes, layout: tuple, repeat: int):
+    """Mejor tiempo de lectura de un lector y las filas que entregó (limpias), o None si no está instalado."""
+    module = OPTIONAL_MODULES.get(reader)
+    if module and importlib.util.find_spec(module) is None:
+        return None, None
+
+    best = float("inf")
+    df = None
+    for _ in range(repeat):
+        # Sin cadena de respaldo: solo el lector medido
+        processor = DataProcessor(streaming=True)
+        processor.excel_readers = (reader,)
+        start = time.perf_counter()
+        df = processor._read_pending_rows(BytesIO(content), *layout)
+        best = min(best, time.perf_counter() - start)
+    return best, processor._clean(df)
+
+
+def _same_rows(expected: pd.DataFrame, actual: pd.DataFrame) -> bool:
+    """Mismas filas y valores (los dtypes intermedios pueden variar entre lectores)."""
+    try:
+        pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True), check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--layout", choices=["emisiones", "solicitudes"], nargs="+", default=["emisiones", "solicitudes"])
+    parser.add_argument("--reader", choices=list(EXCEL_READERS), nargs="+", default=list(EXCEL_READERS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", default="benchmarks/.data", help="Directorio donde se guardan los libros escalados")
+    parser.add_argument("--output", default=None, help="Archivo JSON con los resultados (opcional)")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    print(f"{'plantilla':<12} {'rows':>8} {'lector':<9} {'best (s)':>9} {'filas/s':>11} {'igual':>6}")
+    for rows in args.rows:
+        for layout, read_layout, content in _workbooks(rows, args.layout, data_dir):
+            reference = None
+            for reader in args.reader:
+                seconds, df = measure(reader, content, read_layout, args.repeat)
+                if seconds is None:
+                    print(f"{layout:<12} {rows:>8} {reader:<9} {'no instalado':>9}")
+                    continue
+                if reference is None:
+                    reference = df
+                same = _same_rows(reference, df)
+                print(f"{layout:<12} {rows:>8} {reader:<9} {seconds:>9.4f} {rows / seconds:>11,.0f} {'sí' if same else 'NO':>6}")
+                results.append({
+                    "layout": layout, "rows": rows, "reader": reader, "file_bytes": len(content),
+                    "seconds": round(seconds, 4), "pending_rows": len(df), "same_rows": same,
+                })
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"pandas": pd.__version__, "results": results}, indent=2))
+        print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
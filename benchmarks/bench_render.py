@@ -0,0 +1,80 @@
+"""
+Benchmark del renderizado VBS (solo generación, sin lectura ni limpieza).
+
+Mide cada script MB21/MB22 sobre DataFrames ya limpios y reporta el mejor
+tiempo de --repeat ejecuciones, las líneas de script por segundo y el tamaño
+del script. Con --compact mide el formato compacto (Sub + arreglos).
+
+Uso:
+    python -m benchmarks.bench_render --rows 100000 --repeat 5
+    python -m benchmarks.bench_render --rows 100000 --compact
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from backend.script_generators import MB21, MB22
+
+from .bench_mb21_emission import make_emisiones_df
+
+SAP_USER = "YP00118"
+FILE_OUTPUT = r"C:\Descargas\Reservas_creadas_SAP.txt"
+
+
+def make_solicitudes_df(rows: int, mats_per_vr: int = 5, seed: int = 0) -> pd.DataFrame:
+    """DataFrame de solicitudes ya limpio (como lo entrega DataProcessor) para una operación MB22."""
+    rng = random.Random(seed)
+    data = {col: [] for col in ['VR', 'POS', 'Codigo Material', 'Cantidad', 'Codigo Almacen', 'ELEMENTO PEP']}
+    vr = 4000000
+    while len(data['VR']) < rows:
+        vr += 1
+        almacen = str(rng.choice([4, 16, 38])).zfill(4)
+        pep = rng.choice(['200000703', f"P-2000-25-0002-{vr % 97:05d}-008"])
+        for pos in range(1, min(rng.randint(1, mats_per_vr * 2 - 1), rows - len(data['VR'])) + 1):
+            data['VR'].append(vr)
+            data['POS'].append(pos)
+            data['Codigo Material'].append(str(10402520000 + rng.randint(0, 500)))
+            data['Cantidad'].append(str(rng.randint(1, 100)))
+            data['Codigo Almacen'].append(almacen)
+            data['ELEMENTO PEP'].append(pep)
+    return pd.DataFrame(data)
+
+
+def _cases(rows: int):
+    emisiones = make_emisiones_df(rows)
+    solicitudes = make_solicitudes_df(rows)
+    return [
+        ("MB21 221", MB21, lambda g: g.generate_emission_script(emisiones, '221')),
+        ("MB21 202", MB21, lambda g: g.generate_emission_script(emisiones, '202')),
+        ("MB22 mod", MB22, lambda g: g.generate_modification_script(solicitudes)),
+        ("MB22 del", MB22, lambda g: g.generate_deletion_script(solicitudes)),
+        ("MB22 sfin", MB22, lambda g: g.generate_sfin_script(solicitudes)),
+        ("MB22 add", MB22, lambda g: g.generate_addition_script(solicitudes)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compact", action="store_true", help="Formato compacto en lugar del desenrollado")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'script':<10} {'best (s)':>9} {'lines':>9} {'lines/s':>11} {'KB':>9}")
+    for rows in args.rows:
+        for name, cls, generate in _cases(rows):
+            best = float("inf")
+            for _ in range(args.repeat):
+                generator = cls(sap_user=SAP_USER, file_output=FILE_OUTPUT, compact=args.compact)
+                start = time.perf_counter()
+                generate(generator)
+                script = generator.get_script()
+                best = min(best, time.perf_counter() - start)
+            lines = script.count("\n") + 1
+            print(f"{rows:>8} {name:<10} {best:>9.4f} {lines:>9} {lines / best:>11,.0f} {len(script.encode('utf-8')) / 1024:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark (y control de presupuesto) del arranque en frío del API.
+
+En cada ejecución lanza un intérprete nuevo que importa backend.main y
+responde GET / sin lifespan (sin warm-up), y reporta:
+
+    import_ms          importación de backend.main (con FastAPI)
+    first_response_ms  importación más la primera respuesta de GET /
+    heavy_modules      módulos pesados (pandas, numpy, openpyxl, ...) ya importados
+
+Termina con código 1 si la mediana de import_ms supera --budget-ms o si
+algún módulo pesado se importó al arrancar, para usarlo en CI después de un
+cambio de dependencias o de imports.
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Módulos que no deben importarse al arrancar el API (se cargan en el warm-up o en el primer uso)
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow", "python_calamine")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter()
+# El cliente de prueba (httpx) no es parte del arranque del API: no se cuenta
+from fastapi.testclient import TestClient
+client = TestClient(app)
+requested = time.perf_counter()
+response = client.get("/")
+done = time.perf_counter()
+print(json.dumps({
+    "status": response.status_code,
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (imported - start + done - requested) * 1000,
+    "heavy_modules": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def probe() -> dict:
+    """Un arranque en frío en un proceso nuevo."""
+    root = Path(__file__).resolve().parent.parent
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(root), os.environ.get("PYTHONPATH")]))}
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE % (HEAVY_MODULES,)],
+        cwd=root, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=500, help="Máximo para la mediana de import_ms")
+    args = parser.parse_args()
+
+    results = [probe() for _ in range(args.runs)]
+    import_ms = statistics.median(r["import_ms"] for r in results)
+    first_response_ms = statistics.median(r["first_response_ms"] for r in results)
+    heavy = sorted({name for r in results for name in r["heavy_modules"]})
+
+    print(f"import backend.main   mediana {import_ms:8.1f} ms  (presupuesto {args.budget_ms:g} ms)")
+    print(f"primera respuesta GET / mediana {first_response_ms:8.1f} ms")
+    print(f"módulos pesados al arrancar: {', '.join(heavy) or 'ninguno'}")
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"la importación supera el presupuesto ({import_ms:.1f} > {args.budget_ms:g} ms)")
+    if heavy:
+        failures.append(f"se importaron módulos pesados al arrancar: {', '.join(heavy)}")
+    if any(r["status"] != 200 for r in results):
+        failures.append("GET / no respondió 200")
+    for failure in failures:
+        print(f"FALLA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
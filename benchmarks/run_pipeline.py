@@ -0,0 +1,162 @@
+"""
+Benchmark por etapas del pipeline de ingesta y generación.
+
+Para cada tamaño genera (o reutiliza) un libro sintético y mide, por etapa,
+el tiempo y el pico de memoria de Python (tracemalloc); en las etapas que
+producen un DataFrame también su tamaño en memoria (frame_bytes):
+
+    read       lectura de la hoja y filtro PENDIENTE
+    clean      limpieza y conversión de tipos
+    split      división por movimiento / operación
+    generate   generación de los scripts VBS
+    serialize  respuesta JSON y ZIP de los scripts
+
+Los resultados se escriben en JSON para compararlos entre versiones.
+
+Uso:
+    python -m benchmarks.run_pipeline --rows 1000 100000 1000000 --output bench_results.json
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+from backend import pipeline
+from backend.archive import build_zip, payload_scripts
+from backend.data_processor import EMISIONES_LAYOUT, SOLICITUDES_LAYOUT, DataProcessor
+
+from .synthetic import SyntheticSpec, write_workbook
+
+SAP_USER = "YP00118"
+FILE_OUTPUT = r"C:\Descargas\Reservas_creadas_SAP.txt"
+
+
+def _measure(fn, memory: bool):
+    """Ejecuta fn() y retorna (resultado, segundos, pico de memoria en bytes o None)."""
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        # Segunda ejecución bajo tracemalloc, para no inflar el tiempo medido
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _emisiones_stages(processor: DataProcessor, content: bytes):
+    """Etapas del pipeline de Emisiones como (nombre, función que recibe el resultado anterior)."""
+    return [
+        ("read", lambda _: processor._read_pending_rows(BytesIO(content), *EMISIONES_LAYOUT)),
+        ("clean", processor._clean),
+        ("split", processor.split_by_movement_type),
+        ("generate", lambda dfs: pipeline.emisiones_payload({
+            key: fn(*args, SAP_USER, FILE_OUTPUT) for key, (fn, *args) in pipeline._emisiones_tasks(dfs).items()
+        })),
+        ("serialize", _serialize),
+    ]
+
+
+def _solicitudes_stages(processor: DataProcessor, content: bytes):
+    """Etapas del pipeline de Solicitudes como (nombre, función que recibe el resultado anterior)."""
+    def generate(op_dfs):
+        scripts = {
+            key: fn(*args, SAP_USER, FILE_OUTPUT)
+            for key, (fn, *args) in pipeline._solicitudes_tasks(op_dfs).items()
+        }
+        return pipeline.solicitudes_payload(scripts)
+
+    return [
+        ("read", lambda _: processor._read_pending_rows(BytesIO(content), *SOLICITUDES_LAYOUT)),
+        ("clean", processor._clean),
+        ("split", pipeline.split_solicitudes),
+        ("generate", generate),
+        ("serialize", _serialize),
+    ]
+
+
+def _serialize(payload: dict) -> dict:
+    body = json.dumps(payload)
+    zip_content = build_zip({f"script_{k}.vbs": v for k, v in payload_scripts(payload).items()})
+    return {"json_bytes": len(body.encode('utf-8')), "zip_bytes": len(zip_content)}
+
+
+def run_case(layout: str, spec: SyntheticSpec, data_dir: Path, streaming: bool, memory: bool) -> dict:
+    path = data_dir / f"{layout}_{spec.rows}_{spec.units}_{spec.pending_ratio}_{spec.seed}.xlsx"
+    if not path.exists():
+        write_workbook(path, layout, spec)
+    content = path.read_bytes()
+
+    processor = DataProcessor(streaming=streaming)
+    stages_fn = _emisiones_stages if layout == "emisiones" else _solicitudes_stages
+
+    stages = []
+    value = None
+    for name, fn in stages_fn(processor, content):
+        value, seconds, peak = _measure(lambda: fn(value), memory)
+        stage = {"stage": name, "seconds": round(seconds, 4), "peak_bytes": peak}
+        if isinstance(value, pd.DataFrame):
+            stage["rows"] = len(value)
+            stage["frame_bytes"] = int(value.memory_usage(deep=True).sum())
+        stages.append(stage)
+
+    return {
+        "layout": layout,
+        "reader": "streaming" if streaming else "pandas",
+        "rows": spec.rows,
+        "units": spec.units,
+        "pending_ratio": spec.pending_ratio,
+        "file_bytes": len(content),
+        "stages": stages,
+        "output": value,
+        "total_seconds": round(sum(stage["seconds"] for stage in stages), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--layout", choices=["emisiones", "solicitudes"], nargs="+", default=["emisiones", "solicitudes"])
+    parser.add_argument("--reader", choices=["streaming", "pandas"], nargs="+", default=["streaming"])
+    parser.add_argument("--materials-per-po", type=int, default=5)
+    parser.add_argument("--pending-ratio", type=float, default=0.1)
+    parser.add_argument("--no-memory", action="store_true", help="No medir memoria (evita la segunda pasada con tracemalloc)")
+    parser.add_argument("--data-dir", default="benchmarks/.data", help="Directorio donde se guardan los libros sintéticos")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for rows in args.rows:
+        for layout in args.layout:
+            for reader in args.reader:
+                spec = SyntheticSpec(rows, materials_per_po=args.materials_per_po, pending_ratio=args.pending_ratio)
+                result = run_case(layout, spec, data_dir, reader == "streaming", not args.no_memory)
+                results.append(result)
+                stages = ", ".join(f"{s['stage']}={s['seconds']:.3f}s" for s in result["stages"])
+                print(f"{layout:<12} {reader:<9} {rows:>9} filas  {stages}")
+
+    report = {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "openpyxl": openpyxl.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Generador de libros Excel sintéticos con las plantillas de Emisiones y Solicitudes.
+
+Las columnas siguen EMISIONES_HEADERS / SOLICITUDES_HEADERS de DataProcessor, así
+que los archivos pasan por el mismo pipeline que los archivos reales.
+
+Uso:
+    python -m benchmarks.synthetic emisiones 100000 --output emisiones_100k.xlsx
+"""
+import argparse
+import datetime
+import random
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from openpyxl import Workbook
+
+from backend.data_processor import EMISIONES_HEADERS, SOLICITUDES_HEADERS
+
+LOCALIDADES = ['AREQUIPA', 'CUZCO', 'LIMA', 'PIURA', 'TRUJILLO']
+ALMACENES = [4, 16, 38, 2]
+OPERACIONES = ['Devolucion', 'Adicionar', 'Modificar', 'Sfin', 'Borrar']
+# Centros de costo de proyecto_201_map, usados como ELEMENTO PEP en los movimientos 201
+CENTROS_201 = [200000703, 200000702]
+
+
+@dataclass
+class SyntheticSpec:
+    """
+    Parámetros del libro sintético.
+
+    rows: filas de datos en la hoja.
+    pos: número de POs (emisiones) o VRs (solicitudes); si es None se deriva de materials_per_po.
+    materials_per_po: materiales promedio por PO/VR.
+    pending_ratio: fracción de POs/VRs en estado PENDIENTE.
+    """
+    rows: int
+    pos: Optional[int] = None
+    materials_per_po: int = 5
+    pending_ratio: float = 0.1
+    seed: int = 0
+
+    @property
+    def units(self) -> int:
+        return self.pos or max(1, self.rows // max(1, self.materials_per_po))
+
+
+def _unit_sizes(spec: SyntheticSpec) -> Iterator[int]:
+    """Reparte spec.rows entre spec.units bloques contiguos (PO o VR)."""
+    base, extra = divmod(spec.rows, spec.units)
+    for unit in range(spec.units):
+        size = base + (1 if unit < extra else 0)
+        if size:
+            yield size
+
+
+def emisiones_rows(spec: SyntheticSpec) -> Iterator[list]:
+    """Filas de la plantilla de Emisiones (sin encabezado)."""
+    rng = random.Random(spec.seed)
+    fecha = datetime.datetime(2025, 7, 1)
+    for registro, size in enumerate(_unit_sizes(spec), start=1):
+        mov_sap = rng.choice([221, 201])
+        po = f"2025-{540000000 + registro}"
+        pep = f"P-2000-25-0002-{registro % 997:05d}-008" if mov_sap == 221 else rng.choice(CENTROS_201)
+        almacen = rng.choice(ALMACENES)
+        localidad = rng.choice(LOCALIDADES)
+        estado = 'PENDIENTE' if rng.random() < spec.pending_ratio else 'ATENDIDO'
+        for material in rng.sample(range(10402520000, 10402560000), size):
+            yield [
+                po, f"EECC_{registro % 17}", localidad, mov_sap, 'Emision', material,
+                f"MATERIAL {material}", rng.randint(1, 200), almacen, pep, f"IP_{registro}",
+                None, fecha, 'YP00118', 'GESTOR', registro, estado,
+            ]
+
+
+def solicitudes_rows(spec: SyntheticSpec) -> Iterator[list]:
+    """Filas de la plantilla de Solicitudes (hoja DETALLE, sin encabezado)."""
+    rng = random.Random(spec.seed)
+    fecha = datetime.datetime(2025, 7, 1)
+    numero = 0
+    for unit, size in enumerate(_unit_sizes(spec), start=1):
+        mov_sap = rng.choice([221, 201])
+        vr = 4000000 + unit
+        pep = f"P-2000-25-0002-{unit % 997:05d}-008" if mov_sap == 221 else rng.choice(CENTROS_201)
+        operacion = rng.choice(OPERACIONES)
+        estado = 'PENDIENTE' if rng.random() < spec.pending_ratio else 'ATENDIDO'
+        almacen = rng.choice(ALMACENES)
+        for pos, material in enumerate(rng.sample(range(10402520000, 10402560000), size), start=1):
+            numero += 1
+            yield [
+                f"SVR-{unit}", f"2025-{540000000 + unit}", f"IP_{unit}", f"EECC_{unit % 17}", mov_sap,
+                pos, material, f"MATERIAL {material}", rng.randint(1, 200), operacion.upper(), operacion,
+                vr, None, almacen, pep, None, 'YP00118', estado, fecha, 'GESTOR', numero,
+            ]
+
+
+def write_workbook(path, layout: str, spec: SyntheticSpec) -> None:
+    """Escribe un libro con la hoja de la plantilla indicada ('emisiones' o 'solicitudes')."""
+    if layout == 'emisiones':
+        sheet_name, headers, rows = "Sheet1", EMISIONES_HEADERS, emisiones_rows(spec)
+    elif layout == 'solicitudes':
+        sheet_name, headers, rows = "DETALLE", SOLICITUDES_HEADERS, solicitudes_rows(spec)
+    else:
+        raise ValueError(f"Plantilla desconocida: {layout}")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("layout", choices=["emisiones", "solicitudes"])
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--pos", type=int, default=None, help="POs/VRs en el archivo")
+    parser.add_argument("--materials-per-po", type=int, default=5)
+    parser.add_argument("--pending-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(args.rows, args.pos, args.materials_per_po, args.pending_ratio, args.seed)
+    write_workbook(args.output, args.layout, spec)
+
+
+if __name__ == "__main__":
+    main()
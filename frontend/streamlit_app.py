@@ -1,11 +1,27 @@
 import streamlit as st
-import requests
-import pandas as pd
 from datetime import date
 import random
+import hashlib
 import io
+import os
+import sys
+import threading
+import time
 import zipfile
-from typing import Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple
+
+# El frontend usa el mismo helper de importación diferida que el API (backend/lazy.py,
+# sin dependencias); con streamlit run fuera del proyecto instalado se toma de la raíz
+try:
+    from backend.lazy import ensure_loaded, lazy_import
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from backend.lazy import ensure_loaded, lazy_import
+
+
+# pandas y requests se importan en el primer uso: la app arranca (y se recarga) sin esperarlos
+requests = lazy_import("requests")
+pd = lazy_import("pandas")
 
 
 # ========================================
@@ -18,10 +34,56 @@ st.set_page_config(
     layout="wide"
 )
 
+BACKEND_URL = "http://127.0.0.1:8000"
+# Archivos más grandes que esto se envían como trabajo en segundo plano (/jobs/) con barra de progreso
+JOB_THRESHOLD_BYTES = 2 * 1024 * 1024
+# Cada cuánto se consulta el estado de un trabajo y cuánto se espera como máximo
+JOB_POLL_SECONDS = 1.0
+JOB_MAX_WAIT_SECONDS = 60 * 60
+# Conexiones keep-alive que se mantienen abiertas hacia el backend
+HTTP_POOL_SIZE = 4
+# Resultados (descargas por archivo subido y opciones) que se guardan en caché, y por cuánto tiempo
+RESULT_CACHE_ENTRIES = 16
+RESULT_CACHE_TTL_SECONDS = 600
+
+
+# Importa pandas y requests en segundo plano al arrancar (SAP_FRONTEND_WARM_UP=0 lo desactiva)
+WARM_UP = os.getenv("SAP_FRONTEND_WARM_UP", "1") != "0"
+
+
+class BackendError(Exception):
+    """El backend no pudo generar los scripts; el mensaje ya está listo para mostrarse."""
+
+
+@st.cache_resource
+def start_warm_up() -> threading.Thread:
+    """Una sola vez por proceso: termina de importar los módulos diferidos en un hilo aparte."""
+    thread = threading.Thread(
+        target=ensure_loaded,
+        args=(requests, pd),
+        name="sap-frontend-warm-up",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
 # ========================================
 # FUNCIONES AUXILIARES
 # ========================================
 
+@st.cache_resource
+def get_http_session() -> "requests.Session":
+    """
+    Sesión HTTP compartida por todas las ejecuciones de la app: reutiliza las
+    conexiones keep-alive hacia el backend en vez de abrir una por petición.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def create_vbs_from_json_data(data: dict) -> Optional[Dict[str, str]]:
     """
     Recibe un diccionario JSON, extrae el contenido del VBScript
@@ -34,64 +96,139 @@ def create_vbs_from_json_data(data: dict) -> Optional[Dict[str, str]]:
         dict: Diccionario con los scripts encontrados {tipo: contenido}
         None: Si no se encuentra ningún script válido
     """
-    try:
-        script_content = {}
+    script_content = {}
 
-        # Verificar scripts 221 y 201 (valores directos)
-        if 'script_221' in data and len(data['script_221']) > 0:
-            script_content['221'] = data['script_221']
-            
-        if 'script_201' in data and len(data['script_201']) > 0:
-            script_content['201'] = data['script_201']
-
-        # Verificar otros scripts (listas - tomar primer elemento)
-        script_list_keys = {
-            'script_222': '222',
-            'script_202': '202', 
-            'script_add': 'add',
-            'script_mod': 'mod',
-            'script_del': 'del',
-            'script_sfin': 'sfin'
+    # Verificar scripts 221 y 201 (valores directos)
+    if 'script_221' in data and len(data['script_221']) > 0:
+        script_content['221'] = data['script_221']
+        
+    if 'script_201' in data and len(data['script_201']) > 0:
+        script_content['201'] = data['script_201']
+
+    # Verificar otros scripts (listas - tomar primer elemento)
+    script_list_keys = {
+        'script_222': '222',
+        'script_202': '202', 
+        'script_add': 'add',
+        'script_mod': 'mod',
+        'script_del': 'del',
+        'script_sfin': 'sfin'
+    }
+
+    for json_key, script_key in script_list_keys.items():
+        if json_key in data and len(data[json_key]) > 0:
+            script_content[script_key] = data[json_key][0]
+
+    # Scripts repartidos por sesión de SAP GUI (script_221_s1, script_add_s2, ...)
+    for json_key, value in data.items():
+        if json_key.startswith('script_') and '_s' in json_key[len('script_'):] and len(value) > 0:
+            script_content[json_key[len('script_'):]] = value[0] if isinstance(value, list) else value
+
+    return script_content or None
+
+
+def create_vbs_from_zip(zip_content: bytes) -> Optional[Dict[str, str]]:
+    """
+    Extrae los scripts VBS de un ZIP generado por el backend.
+
+    Args:
+        zip_content (bytes): ZIP retornado por FastAPI con ?format=zip
+
+    Returns:
+        dict: Diccionario con los scripts encontrados {tipo: contenido}
+        None: Si el ZIP no contiene scripts
+    """
+    with zipfile.ZipFile(io.BytesIO(zip_content)) as zip_file:
+        script_content = {
+            name[len("script_"):-len(".vbs")]: zip_file.read(name).decode('utf-8')
+            for name in zip_file.namelist()
+            if name.startswith("script_") and name.endswith(".vbs")
         }
+    return script_content or None
+
 
-        for json_key, script_key in script_list_keys.items():
-            if json_key in data and len(data[json_key]) > 0:
-                script_content[script_key] = data[json_key][0]
+def _scripts_result(response: "requests.Response") -> dict:
+    """Resultado de una respuesta con scripts: {"zip", "message"} si viene ZIP, o el JSON del backend."""
+    if response.headers.get("content-type", "").startswith("application/zip"):
+        return {"zip": response.content, "message": response.headers.get("X-Message", "")}
+    return response.json()
 
-        if not script_content:
-            st.warning("⚠️ No se encontraron scripts válidos en la respuesta del servidor.")
-            return None
 
-        st.success(f"✅ Scripts encontrados: {', '.join(script_content.keys())}")
-        return script_content
+def send_job_to_backend(files_data: dict, user_data: dict) -> Tuple[bool, Optional[dict], Optional[str]]:
+    """
+    Envía un archivo grande como trabajo en segundo plano: lo encola en /jobs/emisiones/,
+    muestra el progreso consultando /jobs/{id} y descarga el resultado al terminar.
+
+    Returns:
+        tuple: (success: bool, result: dict, error_message: str), igual que send_to_backend
+    """
+    try:
+        with st.spinner("🔄 Enviando archivo al servidor..."):
+            response = get_http_session().post(f"{BACKEND_URL}/jobs/emisiones/", data=user_data, files=files_data, timeout=120)
+        if response.status_code != 202:
+            return False, None, f"Error {response.status_code}: {response.text}"
+        job_id = response.json()["job_id"]
+
+        progress_bar = st.progress(0.0, text="⏳ Trabajo en cola...")
+        deadline = time.monotonic() + JOB_MAX_WAIT_SECONDS
+        while True:
+            job = get_http_session().get(f"{BACKEND_URL}/jobs/{job_id}", timeout=10).json()
+            progress = job["progress"]
+            if job["status"] == "error":
+                progress_bar.empty()
+                return False, None, job["error"]
+            if job["status"] == "done":
+                progress_bar.progress(1.0, text="✅ Scripts generados")
+                break
+            if job["status"] == "running":
+                # La lectura es ~la mitad del trabajo; después avanza con cada script generado
+                fraction = 0.1 if not progress["rows_read"] else min(0.5 + 0.2 * (progress["tasks_done"] - 1), 0.95)
+                progress_bar.progress(
+                    fraction,
+                    text=f"⚙️ {job['stage'] or 'leyendo archivo'} · filas leídas: {progress['rows_read']:,} · POs generados: {progress['pos']:,}",
+                )
+            if time.monotonic() > deadline:
+                return False, None, "⏱️ El trabajo sigue en proceso. Intenta nuevamente más tarde."
+            time.sleep(JOB_POLL_SECONDS)
 
+        response = get_http_session().get(f"{BACKEND_URL}/jobs/{job_id}/result", params={"format": "zip"}, timeout=120)
+        if response.status_code != 200:
+            return False, None, f"Error {response.status_code}: {response.text}"
+        return True, _scripts_result(response), None
+
+    except requests.exceptions.Timeout:
+        return False, None, "⏱️ Tiempo de espera agotado. El servidor tardó demasiado en responder."
+    except requests.exceptions.ConnectionError:
+        return False, None, "🔌 No se pudo conectar con el servidor. Verifica que esté ejecutándose."
     except Exception as e:
-        st.error(f"❌ Error procesando el JSON: {e}")
-        return None
+        return False, None, f"❌ Error inesperado: {str(e)}"
 
 
 def send_to_backend(files_data: dict, user_data: dict) -> Tuple[bool, Optional[dict], Optional[str]]:
     """
     Envía datos al backend FastAPI y maneja la respuesta.
+    Los scripts se piden ya empaquetados en un ZIP (?format=zip).
+    No muestra nada en pantalla: se llama desde fetch_downloads, que queda en caché.
 
     Args:
         files_data (dict): Archivos para enviar
-        user_data (dict): Datos del usuario (sap_user, file_output)
+        user_data (dict): Datos del usuario (sap_user, file_output) y opciones de generación (sessions, compact, ...)
 
     Returns:
-        tuple: (success: bool, json_response: dict, error_message: str)
+        tuple: (success: bool, result: dict, error_message: str)
+            result contiene "zip" (bytes) y "message", o la respuesta JSON del backend
     """
     try:
-        with st.spinner("🔄 Enviando datos al servidor..."):
-            response = requests.post(
-                "http://127.0.0.1:8000/emisiones/",
-                data=user_data,
-                files=files_data,
-                timeout=30  # Timeout de 30 segundos
-            )
-            
+        response = get_http_session().post(
+            f"{BACKEND_URL}/emisiones/",
+            params={"format": "zip"},
+            data=user_data,
+            files=files_data,
+            timeout=30  # Timeout de 30 segundos
+        )
+
         if response.status_code == 200:
-            return True, response.json(), None
+            return True, _scripts_result(response), None
         else:
             error_msg = f"Error {response.status_code}: {response.text}"
             return False, None, error_msg
@@ -104,6 +241,35 @@ def send_to_backend(files_data: dict, user_data: dict) -> Tuple[bool, Optional[d
         return False, None, f"❌ Error inesperado: {str(e)}"
 
 
+def send_records_to_backend(content: bytes, content_type: str, user_data: dict) -> Tuple[bool, Optional[dict], Optional[str]]:
+    """
+    Envía filas directamente (JSON o stream de Arrow) a /emisiones/records, sin archivo Excel.
+    Igual que send_to_backend, no muestra nada en pantalla.
+
+    Returns:
+        tuple: (success: bool, result: dict, error_message: str), igual que send_to_backend
+    """
+    try:
+        response = get_http_session().post(
+            f"{BACKEND_URL}/emisiones/records",
+            params={"format": "zip", **user_data},
+            data=content,
+            headers={"Content-Type": content_type},
+            timeout=30
+        )
+
+        if response.status_code == 200:
+            return True, _scripts_result(response), None
+        return False, None, f"Error {response.status_code}: {response.text}"
+
+    except requests.exceptions.Timeout:
+        return False, None, "⏱️ Tiempo de espera agotado. El servidor tardó demasiado en responder."
+    except requests.exceptions.ConnectionError:
+        return False, None, "🔌 No se pudo conectar con el servidor. Verifica que esté ejecutándose."
+    except Exception as e:
+        return False, None, f"❌ Error inesperado: {str(e)}"
+
+
 def create_zip_download(vbs_scripts: Dict[str, str], filename: str = "SAP_SCRIPTS.zip") -> bytes:
     """
     Crea un archivo ZIP en memoria con los scripts VBS.
@@ -125,16 +291,74 @@ def create_zip_download(vbs_scripts: Dict[str, str], filename: str = "SAP_SCRIPT
     return zip_buffer.getvalue()
 
 
-def process_and_download_scripts(json_data: dict) -> None:
+def build_downloads(result: dict) -> dict:
     """
-    Procesa la respuesta JSON y genera los botones de descarga.
+    Scripts codificados y ZIP listos para los botones de descarga. Solo decodifica:
+    los mensajes los muestra process_and_download_scripts.
 
     Args:
-        json_data (dict): Respuesta JSON del backend
+        result (dict): Respuesta del backend: {"zip": bytes, "message": str} o el JSON con los scripts
+
+    Returns:
+        dict: {"scripts": {tipo: bytes del script}, "zip": bytes del ZIP}; ambos None si no hay scripts
     """
-    vbs_scripts = create_vbs_from_json_data(json_data)
-    
+    if "zip" in result:
+        vbs_scripts = create_vbs_from_zip(result["zip"])
+    else:
+        vbs_scripts = create_vbs_from_json_data(result)
+
+    if not vbs_scripts:
+        return {"scripts": None, "zip": None}
+    # El backend ya envía el ZIP armado; solo se arma aquí si llegó JSON
+    zip_content = result.get("zip") or create_zip_download(vbs_scripts)
+    return {
+        "scripts": {script_type: content.encode('utf-8') for script_type, content in vbs_scripts.items()},
+        "zip": zip_content,
+    }
+
+
+def upload_digest(content: bytes) -> str:
+    """Huella (sha256) del archivo subido; junto con las opciones identifica un resultado."""
+    return hashlib.sha256(content).hexdigest()
+
+
+@st.cache_data(show_spinner=False, max_entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL_SECONDS)
+def fetch_downloads(digest: str, source: Tuple[str, ...], options: Tuple[Tuple[str, Any], ...], day: str, _content: bytes) -> dict:
+    """
+    Descargas de un archivo (o de filas enviadas directo) para unas opciones, en caché por
+    huella del contenido, opciones y día (los scripts de adición llevan la fecha). No muestra
+    nada en pantalla, así un acierto no repite spinners ni mensajes; los errores se lanzan
+    como BackendError y no quedan en caché.
+
+    Args:
+        digest (str): upload_digest del contenido
+        source (tuple): ("file", nombre, tipo MIME) o ("records", Content-Type)
+        options (tuple): Datos del usuario y opciones de generación como pares ordenados
+        day (str): Fecha del día
+        _content (bytes): Contenido (no entra en la clave: la representa digest)
+    """
+    user_data = dict(options)
+    if source[0] == "records":
+        success, result, error = send_records_to_backend(_content, source[1], user_data)
+    else:
+        _, file_name, mime = source
+        success, result, error = send_to_backend({"file": (file_name, io.BytesIO(_content), mime)}, user_data)
+    if not success:
+        raise BackendError(error)
+    return build_downloads(result)
+
+
+def process_and_download_scripts(downloads: dict, key_prefix: str = "") -> None:
+    """
+    Genera los botones de descarga de un resultado.
+
+    Args:
+        downloads (dict): Resultado de build_downloads
+        key_prefix (str): Prefijo de las keys de los botones, para no repetirlas entre pestañas
+    """
+    vbs_scripts, zip_content = downloads["scripts"], downloads["zip"]
     if vbs_scripts:
+        st.success(f"✅ Scripts encontrados: {', '.join(vbs_scripts.keys())}")
         # Crear columnas para los botones de descarga
         cols = st.columns([2, 2, 2])
         
@@ -144,23 +368,23 @@ def process_and_download_scripts(json_data: dict) -> None:
             for script_type, content in vbs_scripts.items():
                 st.download_button(
                     label=f"Descargar Script {script_type.upper()}",
-                    data=content.encode('utf-8'),
+                    data=content,
                     file_name=f"script_{script_type}.vbs",
                     mime="text/plain",
                     use_container_width=True,
-                    key=f"download_{script_type}"
+                    key=f"{key_prefix}download_{script_type}"
                 )
         
         with cols[1]:
             st.subheader("🗜️ Descarga Combinada")
             # Descarga ZIP con todos los scripts
-            zip_content = create_zip_download(vbs_scripts)
             st.download_button(
                 label="Descargar Todos (ZIP)",
                 data=zip_content,
                 file_name="SAP_SCRIPTS.zip",
                 mime="application/zip",
-                use_container_width=True
+                use_container_width=True,
+                key=f"{key_prefix}download_zip"
             )
         
         with cols[2]:
@@ -173,7 +397,7 @@ def process_and_download_scripts(json_data: dict) -> None:
         st.warning("⚠️ No se generó ningún script desde los datos proporcionados.")
 
 
-def create_interactive_dataframe(num_rows: int, mov_sap: str) -> pd.DataFrame:
+def create_interactive_dataframe(num_rows: int, mov_sap: str) -> "pd.DataFrame":
     """
     Crea un DataFrame interactivo con datos por defecto para el modo manual.
 
@@ -209,28 +433,80 @@ def create_interactive_dataframe(num_rows: int, mov_sap: str) -> pd.DataFrame:
     return df
 
 
-def dataframe_to_excel_buffer(df: pd.DataFrame, filename: str = "datos_interactivos.xlsx") -> io.BytesIO:
+def dataframe_to_records_payload(df: "pd.DataFrame") -> Tuple[bytes, str]:
     """
-    Convierte un DataFrame a un buffer de Excel en memoria.
+    Serializa el DataFrame para /emisiones/records: un stream IPC de Arrow si pyarrow
+    está instalado y, si no, una lista JSON de registros. El backend toma las columnas
+    por posición, en el orden de la plantilla de Emisiones.
 
     Args:
         df (pd.DataFrame): DataFrame a convertir
-        filename (str): Nombre del archivo
 
     Returns:
-        io.BytesIO: Buffer con el archivo Excel
+        tuple: (contenido, Content-Type)
     """
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False)
-    output.seek(0)
-    return output
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return df.to_json(orient="records", force_ascii=False).encode("utf-8"), "application/json"
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes(), "application/vnd.apache.arrow.stream"
 
 
 # ========================================
 # FUNCIONES DE INTERFAZ
 # ========================================
 
+def generate_scripts(state_key: str, content: bytes, user_data: dict, source: Tuple[str, ...]) -> None:
+    """
+    Pide los scripts y guarda las descargas en st.session_state[state_key], así siguen
+    visibles al re-ejecutar la app. Volver a enviar el mismo contenido con las mismas
+    opciones lo resuelve fetch_downloads desde su caché, sin ninguna petición. Los archivos
+    de más de JOB_THRESHOLD_BYTES van como trabajo con barra de progreso, fuera de esa caché
+    (el backend ya reutiliza su resultado por la huella del archivo).
+
+    Args:
+        source: ("file", nombre, tipo MIME) para archivos o ("records", Content-Type) para filas
+    """
+    try:
+        if source[0] == "file" and len(content) > JOB_THRESHOLD_BYTES:
+            _, file_name, mime = source
+            success, result, error = send_job_to_backend({"file": (file_name, io.BytesIO(content), mime)}, user_data)
+            if not success:
+                raise BackendError(error)
+            downloads = build_downloads(result)
+        else:
+            with st.spinner("🔄 Enviando datos al servidor..."):
+                downloads = fetch_downloads(
+                    upload_digest(content), source, tuple(sorted(user_data.items())), date.today().isoformat(), content
+                )
+    except BackendError as e:
+        st.session_state.pop(state_key, None)
+        st.error(str(e))
+        return
+    except zipfile.BadZipFile as e:
+        st.session_state.pop(state_key, None)
+        st.error(f"❌ Error procesando el ZIP: {e}")
+        return
+    except Exception as e:
+        st.session_state.pop(state_key, None)
+        st.error(f"❌ Error procesando el JSON: {e}")
+        return
+    st.session_state[state_key] = downloads
+
+
+def render_scripts_result(state_key: str, success_message: str) -> None:
+    """Muestra el último resultado guardado por generate_scripts con sus botones de descarga."""
+    downloads = st.session_state.get(state_key)
+    if downloads is not None:
+        st.success(success_message)
+        process_and_download_scripts(downloads, key_prefix=f"{state_key}_")
+
+
 def render_user_config_sidebar():
     """Renderiza la configuración de usuario en la sidebar."""
     with st.sidebar:
@@ -248,25 +524,57 @@ def render_user_config_sidebar():
             help="Directorio donde se guardarán los archivos VBS"
         )
         
-        st.info("💡 Asegúrate de que el servidor FastAPI esté ejecutándose en http://127.0.0.1:8000")
+        sessions = st.number_input(
+            "Sesiones SAP en paralelo",
+            min_value=1,
+            max_value=6,
+            value=1,
+            help="Reparte los POs/VRs en un script por sesión de SAP GUI (connection.Children(k)), cada uno con su propio archivo de VRs (_s1, _s2, ...)"
+        )
         
-        return sap_user, save_dir
+        compact = st.checkbox(
+            "Scripts compactos",
+            value=False,
+            help="Genera los scripts con Sub y arreglos por PO/VR: mismos pasos en SAP, archivos mucho más livianos"
+        )
+        
+        checkpoint = st.checkbox(
+            "Scripts reanudables",
+            value=False,
+            help="Cada PO/VR completado se anota en un archivo de avance junto al de VRs (_avance_<id>); si el script falla, al volver a ejecutarlo se saltan los ya completados"
+        )
+        
+        start_from = st.text_input(
+            "Iniciar desde PO/VR (opcional)",
+            value="",
+            help="Genera los scripts desde este PO/VR, en el orden del archivo"
+        ).strip()
+        
+        st.info(f"💡 Asegúrate de que el servidor FastAPI esté ejecutándose en {BACKEND_URL}")
+        
+        # Opciones de generación que se envían tal cual al backend
+        script_options = {"sessions": int(sessions), "compact": compact, "checkpoint": checkpoint}
+        if start_from:
+            script_options["start_from"] = start_from
+        
+        return sap_user, save_dir, script_options
 
 
-def render_excel_upload_tab(sap_user: str, save_dir: str):
+def render_excel_upload_tab(sap_user: str, save_dir: str, script_options: Optional[dict] = None):
     """
     Renderiza la pestaña de carga de archivos Excel.
     
     Args:
         sap_user (str): Usuario SAP configurado
         save_dir (str): Directorio de guardado configurado
+        script_options (dict): Opciones de generación (sessions, compact, checkpoint, start_from)
     """
     st.subheader("📁 Subir Archivo Excel")
-    st.info("Sube un archivo Excel con los datos de emisiones para generar los scripts SAP automáticamente.")
+    st.info("Sube un archivo Excel (o un CSV/Parquet con las mismas columnas) con los datos de emisiones para generar los scripts SAP automáticamente.")
     
     upload_file = st.file_uploader(
         "Selecciona el archivo Excel de Emisiones", 
-        type=["xlsx"],
+        type=["xlsx", "csv", "parquet"],
         help="El archivo debe contener las columnas necesarias para generar los vales SAP"
     )
     
@@ -279,32 +587,31 @@ def render_excel_upload_tab(sap_user: str, save_dir: str):
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("🚀 Generar Scripts desde Excel", use_container_width=True, type="primary"):
-                # Preparar datos para enviar
-                files_data = {
-                    "file": (upload_file.name, upload_file, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-                }
                 user_data = {
                     "sap_user": sap_user,
-                    "file_output": save_dir
+                    "file_output": save_dir,
+                    **(script_options or {}),
                 }
                 
-                # Enviar al backend
-                success, json_data, error = send_to_backend(files_data, user_data)
-                
-                if success:
-                    st.success("✅ Archivo procesado exitosamente!")
-                    process_and_download_scripts(json_data)
-                else:
-                    st.error(error)
+                # Enviar al backend (o tomar el resultado en caché si el archivo ya se procesó)
+                generate_scripts(
+                    "excel_result",
+                    upload_file.getvalue(),
+                    user_data,
+                    ("file", upload_file.name, upload_file.type or "application/octet-stream"),
+                )
+        
+        render_scripts_result("excel_result", "✅ Archivo procesado exitosamente!")
 
 
-def render_interactive_tab(sap_user: str, save_dir: str):
+def render_interactive_tab(sap_user: str, save_dir: str, script_options: Optional[dict] = None):
     """
     Renderiza la pestaña de modo interactivo.
     
     Args:
         sap_user (str): Usuario SAP configurado
         save_dir (str): Directorio de guardado configurado
+        script_options (dict): Opciones de generación (sessions, compact, checkpoint, start_from)
     """
     st.subheader("✏️ Modo Interactivo")
     st.info("Crea y edita los datos directamente en la interfaz para generar scripts personalizados.")
@@ -378,26 +685,24 @@ def render_interactive_tab(sap_user: str, save_dir: str):
         
         with col2:
             if st.button("🚀 Enviar al Servidor", use_container_width=True, type="primary"):
-                # Convertir DataFrame a Excel en memoria
-                excel_buffer = dataframe_to_excel_buffer(st.session_state.interactive_df)
+                # Las filas van directo al backend (Arrow o JSON), sin armar un Excel
+                content, content_type = dataframe_to_records_payload(st.session_state.interactive_df)
                 
-                # Preparar datos para envío
-                files_data = {
-                    "file": ("datos_interactivos.xlsx", excel_buffer, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-                }
                 user_data = {
                     "sap_user": sap_user,
-                    "file_output": save_dir
+                    "file_output": save_dir,
+                    **(script_options or {}),
                 }
                 
-                # Enviar al backend
-                success, json_data, error = send_to_backend(files_data, user_data)
-                
-                if success:
-                    st.success("✅ Datos procesados exitosamente!")
-                    process_and_download_scripts(json_data)
-                else:
-                    st.error(error)
+                # Enviar al backend (o tomar el resultado en caché si los datos no cambiaron)
+                generate_scripts(
+                    "interactive_result",
+                    content,
+                    user_data,
+                    ("records", content_type),
+                )
+        
+        render_scripts_result("interactive_result", "✅ Datos procesados exitosamente!")
 
 
 # ========================================
@@ -406,13 +711,15 @@ def render_interactive_tab(sap_user: str, save_dir: str):
 
 def main():
     """Función principal de la aplicación Streamlit."""
-    
+    if WARM_UP:
+        start_warm_up()
+
     # Título principal
     st.title("📊 Generador de Scripts SAP")
     st.markdown("---")
     
     # Configuración de usuario en sidebar
-    sap_user, save_dir = render_user_config_sidebar()
+    sap_user, save_dir, script_options = render_user_config_sidebar()
     
     # Selector de modo principal
     mode_initial = st.radio(
@@ -431,10 +738,10 @@ def main():
         tab1, tab2 = st.tabs(["📁 Subir Excel", "✏️ Modo Interactivo"])
         
         with tab1:
-            render_excel_upload_tab(sap_user, save_dir)
+            render_excel_upload_tab(sap_user, save_dir, script_options)
         
         with tab2:
-            render_interactive_tab(sap_user, save_dir)
+            render_interactive_tab(sap_user, save_dir, script_options)
     
     elif mode_initial == "Modificaciones de Vales de Reserva - Add/Mod/Del/SFin/Dev":
         st.header("🔧 Modificaciones de Vales SAP MB22")
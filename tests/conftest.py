@@ -0,0 +1,94 @@
+"""
+Datos compartidos por las pruebas: dos libros sintéticos chicos (tests/data, con
+todas las filas PENDIENTE), el cliente del API y la comparación con los scripts de
+referencia de tests/golden. Los libros se pueden regenerar con benchmarks/synthetic.py:
+
+    python -m benchmarks.synthetic emisiones 48 --materials-per-po 4 --pending-ratio 1 --seed 3 --output tests/data/emisiones.xlsx
+    python -m benchmarks.synthetic solicitudes 100 --materials-per-po 4 --pending-ratio 1 --seed 5 --output tests/data/solicitudes.xlsx
+
+tests/golden/baseline tiene la salida del generador antes de las optimizaciones; el
+resto son capturas de la salida actual. Con SAP_UPDATE_GOLDEN=1 las capturas se
+reescriben con la salida de la ejecución (las de baseline no se tocan).
+"""
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+# El API de las pruebas corre el pipeline en hilos: mismo código, sin hacer fork del proceso de pytest
+os.environ.setdefault("SAP_EXECUTOR", "thread")
+# El registro incremental de las pruebas vive en un directorio temporal, no en el del repo
+os.environ.setdefault("SAP_LEDGER_PATH", os.path.join(tempfile.mkdtemp(prefix="sap-ledger-"), "ledger.sqlite3"))
+
+from backend.main import app  # noqa: E402
+
+DATA_DIR = Path(__file__).parent / "data"
+GOLDEN_DIR = Path(__file__).parent / "golden"
+UPDATE_GOLDEN = os.getenv("SAP_UPDATE_GOLDEN") == "1"
+
+SAP_USER = "YP00118"
+FILE_OUTPUT = r"C:\SAP\Reservas.txt"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def emisiones_xlsx() -> bytes:
+    """12 POs de 4 materiales, movimientos 221 y 201."""
+    return (DATA_DIR / "emisiones.xlsx").read_bytes()
+
+
+@pytest.fixture(scope="session")
+def solicitudes_xlsx() -> bytes:
+    """25 VRs de 4 posiciones con todas las operaciones (devoluciones 222/202 y MB22)."""
+    return (DATA_DIR / "solicitudes.xlsx").read_bytes()
+
+
+def scripts_of(payload: dict) -> dict:
+    """Scripts de una respuesta por nombre ('221', 'add', ...); las listas traen uno."""
+    scripts = {}
+    for key, value in payload.items():
+        if key.startswith('script_') and value:
+            scripts[key[len('script_'):]] = value[0] if isinstance(value, list) else value
+    return scripts
+
+
+def upload(client: TestClient, endpoint: str, content: bytes, filename: str = "archivo.xlsx", headers=None, **form):
+    """POST multipart de un archivo con el usuario SAP y la ruta de salida de las pruebas."""
+    return client.post(
+        endpoint,
+        headers=headers,
+        data={'sap_user': SAP_USER, 'file_output': FILE_OUTPUT, **form},
+        files={'file': (filename, content, XLSX_MIME)},
+    )
+
+
+def generate(client: TestClient, endpoint: str, content: bytes, **form) -> dict:
+    """Scripts de la respuesta de /emisiones/ o /solicitudes/ por nombre."""
+    response = upload(client, endpoint, content, **form)
+    assert response.status_code == 200, response.text
+    return scripts_of(response.json())
+
+
+def normalize(script: str) -> str:
+    """La fecha del día (adiciones de MB22) queda como DD.MM.YYYY."""
+    return script.replace(time.strftime("%d.%m.%Y"), "DD.MM.YYYY")
+
+
+def assert_golden(name: str, script: str) -> None:
+    """Compara el script byte a byte con tests/golden/<name>."""
+    path = GOLDEN_DIR / name
+    text = normalize(script)
+    if UPDATE_GOLDEN and not name.startswith("baseline/"):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, newline="")
+        return
+    assert path.exists(), f"Falta el script de referencia {name} (SAP_UPDATE_GOLDEN=1 lo genera)"
+    assert text == path.read_text(newline=""), f"El script difiere de {name}"
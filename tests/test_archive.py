@@ -0,0 +1,31 @@
+"""
+/emisiones/ y /solicitudes/ con ?format=zip o Accept: application/zip: un ZIP con
+los mismos scripts de la respuesta JSON.
+"""
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from .conftest import generate, upload
+
+
+@pytest.mark.parametrize("endpoint, workbook", [
+    ("/emisiones/", "emisiones_xlsx"),
+    ("/solicitudes/", "solicitudes_xlsx"),
+])
+@pytest.mark.parametrize("ask", ["query", "accept"])
+def test_zip_has_the_json_scripts(client, request, endpoint, workbook, ask):
+    content = request.getfixturevalue(workbook)
+    expected = generate(client, endpoint, content)
+    if ask == "query":
+        response = upload(client, f"{endpoint}?format=zip", content)
+    else:
+        response = upload(client, endpoint, content, headers={"Accept": "application/zip"})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+    assert response.headers["X-Scripts"].split(",") == list(expected)
+
+    archive = zipfile.ZipFile(BytesIO(response.content))
+    assert {name: archive.read(f"script_{name}.vbs").decode() for name in expected} == expected
+    assert len(archive.namelist()) == len(expected)
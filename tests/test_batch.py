@@ -0,0 +1,53 @@
+"""
+/emisiones/batch/: un ZIP con una carpeta por libro y un resumen.json con el estado
+de cada archivo (ok, empty o error) sin que un archivo malo haga fallar el lote.
+"""
+import json
+import zipfile
+from io import BytesIO
+
+from openpyxl import load_workbook
+
+from .conftest import FILE_OUTPUT, SAP_USER, XLSX_MIME, assert_golden
+
+
+def _attended(content: bytes) -> bytes:
+    """El mismo libro con todas las filas ATENDIDO (sin nada que generar)."""
+    workbook = load_workbook(BytesIO(content))
+    sheet = workbook.active
+    estado = [cell.value for cell in sheet[1]].index('ESTADO') + 1
+    for row in range(2, sheet.max_row + 1):
+        sheet.cell(row=row, column=estado, value='ATENDIDO')
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_batch_returns_a_folder_per_workbook(client, emisiones_xlsx):
+    response = client.post(
+        "/emisiones/batch/",
+        data={'sap_user': SAP_USER, 'file_output': FILE_OUTPUT},
+        files=[
+            ('files', ('EECC_1.xlsx', emisiones_xlsx, XLSX_MIME)),
+            ('files', ('EECC_1.xlsx', emisiones_xlsx, XLSX_MIME)),
+            ('files', ('atendidos.xlsx', _attended(emisiones_xlsx), XLSX_MIME)),
+            ('files', ('notas.pdf', b'%PDF-1.4', 'application/pdf')),
+        ],
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+    assert response.headers["X-Batch-Status"] == "ok=2, empty=1, error=1"
+
+    archive = zipfile.ZipFile(BytesIO(response.content))
+    summary = json.loads(archive.read("resumen.json"))
+    assert [(item["folder"], item["status"]) for item in summary] == [
+        ("EECC_1", "ok"), ("EECC_1_2", "ok"), ("atendidos", "empty"), ("notas", "error"),
+    ]
+    assert summary[3]["message"]
+    # Los nombres repetidos no se pisan: cada carpeta trae sus dos scripts
+    for folder in ("EECC_1", "EECC_1_2"):
+        for mov_type in ('221', '201'):
+            assert_golden(f"baseline/{mov_type}.vbs", archive.read(f"{folder}/script_{mov_type}.vbs").decode())
+    assert sorted(archive.namelist()) == sorted([
+        "resumen.json", *(f"{folder}/script_{mov}.vbs" for folder in ("EECC_1", "EECC_1_2") for mov in ('201', '221')),
+    ])
@@ -0,0 +1,156 @@
+"""
+ResultCache: aciertos, un solo cálculo para peticiones concurrentes, TTL, desalojo
+LRU y claves por endpoint, archivo, parámetros y fecha.
+"""
+import asyncio
+import hashlib
+
+import pytest
+
+from backend import cache as cache_module
+from backend.cache import ResultCache, make_cache_key
+
+from .conftest import generate
+
+# Hash de los archivos subidos, como lo calcula read_upload
+DIGEST = hashlib.sha256(b"archivo").hexdigest()
+OTHER_DIGEST = hashlib.sha256(b"otro archivo").hexdigest()
+
+
+def _counting(value):
+    """compute() que retorna value y anota cada llamada."""
+    calls = []
+
+    async def compute():
+        calls.append(value)
+        await asyncio.sleep(0)
+        return value
+    return compute, calls
+
+
+async def test_hit_returns_cached_value():
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+    compute, calls = _counting({'script_221': 'x'})
+    assert await cache.get_or_compute("k", compute) == {'script_221': 'x'}
+    assert await cache.get_or_compute("k", compute) == {'script_221': 'x'}
+    assert len(calls) == 1
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+
+async def test_concurrent_requests_share_one_computation():
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+    release = asyncio.Event()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await release.wait()
+        return 'ok'
+
+    tasks = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*tasks) == ['ok'] * 5
+    assert len(calls) == 1
+    assert cache.stats()['coalesced'] == 4
+
+
+async def test_failures_reach_every_waiter_and_are_not_cached():
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("archivo inválido")
+
+    results = await asyncio.gather(*(cache.get_or_compute("k", failing) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    compute, calls = _counting('ok')
+    assert await cache.get_or_compute("k", compute) == 'ok'
+    assert len(calls) == 1
+
+
+async def test_cancelled_leader_does_not_cancel_the_waiters():
+    cache = ResultCache(max_entries=4, ttl_seconds=60)
+    started, release = asyncio.Event(), asyncio.Event()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        started.set()
+        await release.wait()
+        return 'ok'
+
+    leader = asyncio.create_task(cache.get_or_compute("k", compute))
+    await started.wait()
+    waiters = [asyncio.create_task(cache.get_or_compute("k", compute)) for _ in range(2)]
+    await asyncio.sleep(0)
+    # Quien inició el cálculo se desconecta: uno de los que esperaban lo vuelve a hacer
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiters) == ['ok', 'ok']
+    assert leader.cancelled()
+    assert len(calls) == 2
+    assert await cache.get_or_compute("k", compute) == 'ok'
+
+
+async def test_entries_expire_after_ttl():
+    cache = ResultCache(max_entries=4, ttl_seconds=0.01)
+    compute, calls = _counting('ok')
+    await cache.get_or_compute("k", compute)
+    await asyncio.sleep(0.02)
+    await cache.get_or_compute("k", compute)
+    assert len(calls) == 2
+    assert cache.stats()['expirations'] == 1
+
+
+async def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    computes = {key: _counting(key) for key in 'abc'}
+    for key in 'aba':
+        await cache.get_or_compute(key, computes[key][0])
+    # 'a' es la más reciente: al entrar 'c' sale 'b'
+    await cache.get_or_compute('c', computes['c'][0])
+    assert cache.stats()['evictions'] == 1
+    for key in 'ab':
+        await cache.get_or_compute(key, computes[key][0])
+    assert (len(computes['a'][1]), len(computes['b'][1])) == (1, 2)
+
+
+async def test_zero_entries_disables_the_cache():
+    cache = ResultCache(max_entries=0, ttl_seconds=60)
+    compute, calls = _counting('ok')
+    await cache.get_or_compute("k", compute)
+    await cache.get_or_compute("k", compute)
+    assert len(calls) == 2
+    assert cache.stats()['entries'] == 0
+
+
+@pytest.mark.parametrize("other", [
+    ("solicitudes", DIGEST, "YP00118", "C:\\SAP\\Reservas.txt"),
+    ("emisiones", OTHER_DIGEST, "YP00118", "C:\\SAP\\Reservas.txt"),
+    ("emisiones", DIGEST, "YP00119", "C:\\SAP\\Reservas.txt"),
+])
+def test_cache_key_changes_with_endpoint_file_and_parameters(other):
+    key = make_cache_key("emisiones", DIGEST, "YP00118", "C:\\SAP\\Reservas.txt")
+    assert key == make_cache_key("emisiones", DIGEST, "YP00118", "C:\\SAP\\Reservas.txt")
+    assert key != make_cache_key(*other)
+
+
+def test_cache_key_does_not_mix_parameters_that_print_alike():
+    assert make_cache_key("emisiones", DIGEST, "a|b", "c") != make_cache_key("emisiones", DIGEST, "a", "b|c")
+    assert make_cache_key("emisiones", DIGEST, None) != make_cache_key("emisiones", DIGEST, "None")
+    assert make_cache_key("emisiones", DIGEST, 1) != make_cache_key("emisiones", DIGEST, "1")
+
+
+def test_cache_key_changes_with_the_date(monkeypatch):
+    key = make_cache_key("solicitudes", DIGEST, "YP00118")
+    monkeypatch.setattr(cache_module, "_today", lambda: "01.01.2099")
+    assert make_cache_key("solicitudes", DIGEST, "YP00118") != key
+
+
+def test_repeated_upload_is_served_from_cache(client, emisiones_xlsx):
+    first = generate(client, "/emisiones/", emisiones_xlsx)
+    hits = client.get("/cache/stats").json()['hits']
+    assert generate(client, "/emisiones/", emisiones_xlsx) == first
+    assert client.get("/cache/stats").json()['hits'] == hits + 1
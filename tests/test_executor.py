@@ -0,0 +1,21 @@
+"""
+PipelineExecutor: ejecuta las funciones del pipeline en un pool de procesos o de
+hilos sin bloquear el event loop.
+"""
+import os
+
+import pytest
+
+from backend.executor import PipelineExecutor, _ping
+
+
+@pytest.mark.parametrize("kind", ["process", "thread"])
+async def test_runs_in_the_pool(kind):
+    executor = PipelineExecutor(kind=kind, max_workers=1)
+    try:
+        pid = await executor.run(_ping)
+    finally:
+        executor.shutdown()
+    assert executor.kind == kind
+    # En procesos la función corre en el worker; en hilos, en el proceso del API
+    assert (pid != os.getpid()) == (kind == "process")
@@ -0,0 +1,182 @@
+"""
+Salida de los generadores contra los scripts de referencia (tests/golden):
+
+    baseline/  formato por defecto, byte a byte igual al generador original
+    compact/   formato compacto (compact=True)
+    paging/    POs/VRs de más filas que SAP_MAX_TABLE_ROWS (partidos o paginados)
+
+Los scripts reanudables (checkpoint=True) se comparan quitándoles el avance: deben
+ser el mismo script, con cada PO/VR envuelto en Pending/MarkDone.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from backend.script_generators import progress_file_output
+from backend.templates import VISIBLE_TABLE_ROWS, get_registry
+
+from .conftest import FILE_OUTPUT, assert_golden, generate, scripts_of, upload
+
+SCRIPTS = ['221', '201', '222', '202', 'add', 'mod', 'del', 'sfin']
+ROOT = Path(__file__).resolve().parent.parent
+
+# Filas visibles de la tabla de posiciones para las pruebas de paginación (los POs/VRs tienen 4)
+MAX_TABLE_ROWS = 3
+
+
+def _build_scripts(client, emisiones_xlsx: bytes, solicitudes_xlsx: bytes, **form) -> dict:
+    scripts = generate(client, "/emisiones/", emisiones_xlsx, **form)
+    scripts.update(generate(client, "/solicitudes/", solicitudes_xlsx, **form))
+    return scripts
+
+
+@pytest.fixture(scope="module")
+def default_scripts(client, emisiones_xlsx, solicitudes_xlsx) -> dict:
+    return _build_scripts(client, emisiones_xlsx, solicitudes_xlsx)
+
+
+@pytest.fixture(scope="module")
+def compact_scripts(client, emisiones_xlsx, solicitudes_xlsx) -> dict:
+    return _build_scripts(client, emisiones_xlsx, solicitudes_xlsx, compact="true")
+
+
+_PAGING_PROBE = """
+import json, sys
+from backend import pipeline
+emisiones, solicitudes, file_output = open(sys.argv[1], 'rb').read(), open(sys.argv[2], 'rb').read(), sys.argv[3]
+print(json.dumps({
+    "emisiones": pipeline.build_emisiones_payload(emisiones, 'YP00118', file_output),
+    "solicitudes": pipeline.build_solicitudes_payload(solicitudes, 'YP00118', file_output),
+}))
+"""
+
+
+@pytest.fixture(scope="module")
+def paging_scripts(emisiones_xlsx, solicitudes_xlsx, tmp_path_factory) -> dict:
+    """Scripts generados en un proceso nuevo con SAP_MAX_TABLE_ROWS (se lee al importar)."""
+    directory = tmp_path_factory.mktemp("paging")
+    emisiones, solicitudes = directory / "emisiones.xlsx", directory / "solicitudes.xlsx"
+    emisiones.write_bytes(emisiones_xlsx)
+    solicitudes.write_bytes(solicitudes_xlsx)
+    env = {**os.environ, "SAP_MAX_TABLE_ROWS": str(MAX_TABLE_ROWS),
+           "PYTHONPATH": os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))}
+    output = subprocess.run(
+        [sys.executable, "-c", _PAGING_PROBE, str(emisiones), str(solicitudes), FILE_OUTPUT],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    payloads = json.loads(output.strip().splitlines()[-1])
+    return {**scripts_of(payloads["emisiones"]), **scripts_of(payloads["solicitudes"])}
+
+
+def strip_checkpoints(script: str) -> tuple:
+    """(script sin el avance, claves de las unidades): quita el bloque de avance, Pending/MarkDone y el borrado final."""
+    blocks = get_registry()['MB21']
+    run_id = re.search(r"^' Id de ejecucion (\w+)$", script, re.M).group(1)
+    progress = blocks['progress'].render(run_id=run_id, progress_path=progress_file_output(FILE_OUTPUT, run_id))
+    assert script.count(progress) == 1
+    lines = script.replace(progress + "\n", "", 1).split("\n")
+
+    keys, stripped, closing = [], [], False
+    for line in lines:
+        compact = re.match(r'^If Pending\("([^"]*)"\) Then (.*) : MarkDone "\1"$', line)
+        if compact:
+            keys.append(compact.group(1))
+            stripped.append(compact.group(2))
+        elif re.match(r'^If Pending\("([^"]*)"\) Then$', line):
+            keys.append(line.split('"')[1])
+        elif line.startswith('MarkDone '):
+            closing = True
+        elif closing:
+            assert line == 'End If'
+            closing = False
+        elif line != blocks['progress_end'].render():
+            stripped.append(line)
+    return "\n".join(stripped), keys
+
+
+@pytest.mark.parametrize("name", SCRIPTS)
+def test_default_output_matches_baseline(default_scripts, name):
+    assert_golden(f"baseline/{name}.vbs", default_scripts[name])
+
+
+@pytest.mark.parametrize("name", SCRIPTS)
+def test_compact_output(compact_scripts, name):
+    assert_golden(f"compact/{name}.vbs", compact_scripts[name])
+
+
+def test_compact_output_is_smaller(default_scripts, compact_scripts):
+    for name in SCRIPTS:
+        assert len(compact_scripts[name]) < len(default_scripts[name]), name
+
+
+@pytest.mark.parametrize("name", SCRIPTS)
+def test_paging_output(paging_scripts, name):
+    assert_golden(f"paging/{name}.vbs", paging_scripts[name])
+
+
+def test_paging_stays_within_visible_rows(default_scripts, paging_scripts):
+    rows = [int(row) for script in paging_scripts.values() for row in re.findall(r'RESB-\w+\[(\d+),', script)]
+    assert rows and max(rows) < MAX_TABLE_ROWS
+    # Con el límite por defecto (más filas) los mismos scripts sí pasan de esa fila
+    assert max(int(row) for script in default_scripts.values() for row in re.findall(r'RESB-\w+\[(\d+),', script)) >= MAX_TABLE_ROWS
+    page_down = get_registry()['MB22']['page_down'].render()
+    for name in ('mod', 'del', 'sfin'):
+        assert page_down in paging_scripts[name], name
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["default", "compact"])
+def test_checkpoint_wraps_each_unit(client, emisiones_xlsx, solicitudes_xlsx, default_scripts, compact_scripts, compact):
+    reference = compact_scripts if compact else default_scripts
+    resumable = _build_scripts(client, emisiones_xlsx, solicitudes_xlsx, compact=str(compact).lower(), checkpoint="true")
+    assert sorted(resumable) == sorted(reference)
+    for name, script in resumable.items():
+        stripped, keys = strip_checkpoints(script)
+        assert stripped == reference[name], name
+        assert keys and len(keys) == len(set(keys)), name
+
+
+def test_start_from_resumes_at_the_vr(client, solicitudes_xlsx, default_scripts):
+    response = upload(client, "/solicitudes/", solicitudes_xlsx, start_from="4000021")
+    assert response.status_code == 200, response.text
+    scripts = scripts_of(response.json())
+    assert list(scripts) == ['del']
+    assert sorted(response.json()["omitted_scripts"]) == sorted(f"script_{name}" for name in default_scripts if name not in {'del', '221', '201'})
+    vrs = re.findall(r'RSNUM"\)\.text = "(\d+)"', default_scripts['del'])
+    assert re.findall(r'RSNUM"\)\.text = "(\d+)"', scripts['del']) == vrs[vrs.index("4000021"):]
+
+    response = upload(client, "/solicitudes/", solicitudes_xlsx, start_from="9999999")
+    assert response.status_code == 400
+    assert "9999999" in response.json()["detail"]
+
+
+def test_checkpoint_progress_file_is_per_run(client, emisiones_xlsx, solicitudes_xlsx):
+    first = _build_scripts(client, emisiones_xlsx, solicitudes_xlsx, checkpoint="true")
+    again = _build_scripts(client, emisiones_xlsx, solicitudes_xlsx, checkpoint="true", compact="true")
+    run_ids = {name: re.search(r"^' Id de ejecucion (\w+)$", script, re.M).group(1) for name, script in first.items()}
+    # Cada script tiene su propio archivo de avance; el mismo script regenerado conserva el suyo
+    assert len(set(run_ids.values())) == len(run_ids)
+    for name, script in again.items():
+        assert progress_file_output(FILE_OUTPUT, run_ids[name]) in script, name
+        assert script.rstrip().endswith(get_registry()['MB21']['back'].render()), name
+        assert get_registry()['MB21']['progress_end'].render() in script, name
+
+
+def _max_table_rows(**env) -> int:
+    """MAX_TABLE_ROWS leído al importar en un proceso nuevo, sin SAP_MAX_TABLE_ROWS salvo lo que se pase."""
+    environ = {k: v for k, v in os.environ.items() if k != "SAP_MAX_TABLE_ROWS"}
+    output = subprocess.run(
+        [sys.executable, "-c", "from backend.templates import MAX_TABLE_ROWS; print(MAX_TABLE_ROWS)"],
+        cwd=ROOT, env={**environ, **env}, capture_output=True, text=True, check=True,
+    ).stdout
+    return int(output)
+
+
+def test_table_rows_default_to_the_visible_rows():
+    assert _max_table_rows() == VISIBLE_TABLE_ROWS
+    assert _max_table_rows(SAP_MAX_TABLE_ROWS="0") == 0
+    assert _max_table_rows(SAP_MAX_TABLE_ROWS=str(MAX_TABLE_ROWS)) == MAX_TABLE_ROWS
@@ -0,0 +1,120 @@
+"""
+Trabajos en segundo plano: ciclo queued -> running -> done | error, progreso por
+/jobs/{id} y por SSE, resultado igual al de los endpoints síncronos y cola acotada.
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.jobs import JobManager, QueueFullError
+from backend.main import app
+
+from .conftest import generate, upload
+
+# Otra ruta de salida para que el trabajo no acierte en la caché y pase por el pipeline
+JOB_OUTPUT = r"C:\SAP\Trabajo.txt"
+
+
+@pytest.fixture(scope="module")
+def live_client():
+    """Cliente con lifespan: un solo event loop para la cola de trabajos y sus workers."""
+    with TestClient(app) as client:
+        yield client
+
+
+def _events(client, url: str) -> list:
+    """Eventos SSE del trabajo como [(evento, datos)] hasta 'done' o 'error'."""
+    events = []
+    with client.stream("GET", url) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        name = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                name = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((name, json.loads(line[len("data: "):])))
+    return events
+
+
+def test_job_lifecycle(live_client, solicitudes_xlsx):
+    response = upload(live_client, "/jobs/solicitudes/", solicitudes_xlsx, file_output=JOB_OUTPUT)
+    assert response.status_code == 202, response.text
+    job = response.json()
+    assert response.headers["Location"] == job["status_url"] == f"/jobs/{job['job_id']}"
+
+    events = _events(live_client, job["events_url"])
+    assert [name for name, _ in events[:-1]] == ["progress"] * (len(events) - 1)
+    name, final = events[-1]
+    assert name == "done" and final["status"] == "done"
+    assert final["progress"]["rows_read"] == 100
+    assert final["progress"]["vrs"] > 0 and final["progress"]["tasks_done"] > 0
+    # El progreso solo avanza
+    tasks_done = [data["progress"]["tasks_done"] for _, data in events]
+    assert tasks_done == sorted(tasks_done)
+
+    assert live_client.get(job["status_url"]).json()["status"] == "done"
+    result = live_client.get(job["result_url"])
+    assert result.status_code == 200
+    assert result.json() == upload(live_client, "/solicitudes/", solicitudes_xlsx, file_output=JOB_OUTPUT).json()
+
+
+def test_job_result_as_zip(live_client, emisiones_xlsx):
+    job = upload(live_client, "/jobs/emisiones/", emisiones_xlsx).json()
+    assert _events(live_client, job["events_url"])[-1][0] == "done"
+    response = live_client.get(job["result_url"], params={"format": "zip"})
+    assert response.headers["content-type"] == "application/zip"
+    assert response.headers["X-Scripts"].split(",") == list(generate(live_client, "/emisiones/", emisiones_xlsx))
+
+
+def test_unknown_jobs_and_kinds(live_client, emisiones_xlsx):
+    assert live_client.get("/jobs/no-existe").status_code == 404
+    assert live_client.get("/jobs/no-existe/result").status_code == 404
+    assert upload(live_client, "/jobs/otro/", emisiones_xlsx).status_code == 404
+
+
+async def test_manager_runs_queued_jobs_and_reports_errors():
+    manager = JobManager(workers=1, max_queued=4)
+    release = asyncio.Event()
+
+    async def slow(timer):
+        await release.wait()
+        return {"message": "ok"}
+
+    async def failing(timer):
+        raise ValueError("hoja DETALLE no encontrada")
+
+    try:
+        first = manager.submit("emisiones", "k1", slow)
+        second = manager.submit("solicitudes", "k2", failing)
+        await asyncio.sleep(0)
+        assert (first.status, second.status) == ("running", "queued")
+        assert manager.stats()["running"] == 1 and manager.stats()["queued"] == 1
+
+        release.set()
+        while not second.finished:
+            await second.wait_for_change(second.version, 1)
+        assert first.status == "done" and first.to_dict()["message"] == "ok"
+        assert second.status == "error" and "hoja DETALLE" in second.error
+    finally:
+        await manager.stop()
+
+
+async def test_full_queue_is_rejected():
+    manager = JobManager(workers=1, max_queued=1)
+    release = asyncio.Event()
+
+    async def slow(timer):
+        await release.wait()
+        return {}
+
+    try:
+        manager.submit("emisiones", "k1", slow)
+        await asyncio.sleep(0)  # el worker toma el primero
+        manager.submit("emisiones", "k2", slow)
+        with pytest.raises(QueueFullError):
+            manager.submit("emisiones", "k3", slow)
+    finally:
+        release.set()
+        await manager.stop()
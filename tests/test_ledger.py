@@ -0,0 +1,75 @@
+"""
+Modo incremental: las filas que ya tienen script de una subida anterior se omiten
+hasta que se borra el registro.
+"""
+import io
+
+import openpyxl
+import pytest
+
+from .conftest import generate, scripts_of, upload
+
+
+@pytest.fixture(autouse=True)
+def empty_ledger(client):
+    client.delete("/ledger/")
+    yield
+    client.delete("/ledger/")
+
+
+@pytest.mark.parametrize("endpoint, kind, fixture", [
+    ("/emisiones/", "emisiones", "emisiones_xlsx"),
+    ("/solicitudes/", "solicitudes", "solicitudes_xlsx"),
+])
+def test_second_upload_skips_scripted_rows(client, request, endpoint, kind, fixture):
+    content = request.getfixturevalue(fixture)
+    first = generate(client, endpoint, content, incremental="true")
+    assert first == generate(client, endpoint, content)
+
+    second = upload(client, endpoint, content, incremental="true")
+    assert second.status_code == 200, second.text
+    assert scripts_of(second.json()) == {}
+
+    stats = client.get("/ledger/stats").json()
+    assert stats["kinds"][kind]["rows"] > 0
+    assert client.delete("/ledger/", params={"kind": kind}).json()["deleted"] == stats["kinds"][kind]["rows"]
+    assert generate(client, endpoint, content, incremental="true") == first
+
+
+def test_ledger_endpoints_check_the_kind(client):
+    assert client.get("/ledger/otros").status_code == 404
+    assert client.delete("/ledger/", params={"kind": "otros"}).status_code == 404
+
+
+def test_start_from_leaves_the_skipped_rows_pending(client, solicitudes_xlsx):
+    resumed = generate(client, "/solicitudes/", solicitudes_xlsx, incremental="true", start_from="4000021")
+    assert list(resumed) == ['del']
+
+    # Las filas anteriores al VR de inicio y las de los scripts omitidos no quedaron registradas
+    rest = generate(client, "/solicitudes/", solicitudes_xlsx, incremental="true")
+    full = generate(client, "/solicitudes/", solicitudes_xlsx)
+    assert sorted(rest) == sorted(full)
+    assert "4000021" not in rest['del'] and "4000001" in rest['del']
+
+
+def _first_rows(content: bytes, rows: int) -> bytes:
+    """Copia del libro con solo las primeras filas de datos."""
+    workbook = openpyxl.load_workbook(io.BytesIO(content))
+    sheet = workbook.active
+    sheet.delete_rows(rows + 2, sheet.max_row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_rows_sharing_a_registro_are_tracked_separately(client, emisiones_xlsx):
+    # Las 4 primeras filas son el mismo PO (mismo número de registro) con materiales distintos
+    first = generate(client, "/emisiones/", _first_rows(emisiones_xlsx, 1), incremental="true")
+    assert "10402551067" in first['221']
+    assert client.get("/ledger/stats").json()["kinds"]["emisiones"]["rows"] == 1
+
+    second = generate(client, "/emisiones/", _first_rows(emisiones_xlsx, 4), incremental="true")
+    for material in ("10402558066", "10402524294", "10402559688"):
+        assert material in second['221']
+    assert "10402551067" not in second['221']
+    assert client.get("/ledger/stats").json()["kinds"]["emisiones"]["rows"] == 4
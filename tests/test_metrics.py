@@ -0,0 +1,59 @@
+"""
+Métricas del API: Server-Timing por etapa, contadores y latencias por endpoint en
+/metrics, y StageTimer mezclando lo que mide cada worker.
+"""
+from backend.metrics import StageTimer
+
+from .conftest import upload
+
+
+def _sample(client, name: str, **labels) -> float:
+    """Valor actual de una serie de /metrics (0 si todavía no existe)."""
+    series = name + "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_request_is_timed_and_counted(client, emisiones_xlsx):
+    requests = _sample(client, "sap_requests_total", endpoint="/emisiones/", method="POST", status="200")
+    rows = _sample(client, "sap_pipeline_total", endpoint="/emisiones/", counter="rows_read")
+
+    # Otra ruta de salida para no acertar en la caché de resultados y pasar por el pipeline
+    response = upload(client, "/emisiones/", emisiones_xlsx, file_output=r"C:\SAP\Metricas.txt")
+    assert response.status_code == 200, response.text
+
+    stages = {part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")}
+    assert {"upload", "read_excel", "generate_221", "generate_201"} <= stages
+    assert _sample(client, "sap_requests_total", endpoint="/emisiones/", method="POST", status="200") == requests + 1
+    assert _sample(client, "sap_pipeline_total", endpoint="/emisiones/", counter="rows_read") == rows + 48
+    assert _sample(client, "sap_request_duration_seconds_count", endpoint="/emisiones/", method="POST") >= 1
+
+
+def test_error_status_is_labelled(client):
+    errors = _sample(client, "sap_requests_total", endpoint="/emisiones/", method="POST", status="422")
+    assert client.post("/emisiones/", data={}).status_code == 422
+    assert _sample(client, "sap_requests_total", endpoint="/emisiones/", method="POST", status="422") == errors + 1
+
+
+def test_unmatched_routes_share_one_label(client):
+    unmatched = _sample(client, "sap_requests_total", endpoint="unmatched", method="GET", status="404")
+    for path in ("/no-existe", "/no-existe/otra", "/emisiones/x/y"):
+        assert client.get(path).status_code == 404
+    assert _sample(client, "sap_requests_total", endpoint="unmatched", method="GET", status="404") == unmatched + 3
+    assert 'endpoint="/no-existe"' not in client.get("/metrics").text
+
+
+def test_stage_timer_merges_worker_snapshots():
+    worker = StageTimer()
+    with worker.stage("read_excel"):
+        pass
+    worker.count("rows_read", 10)
+
+    timer = StageTimer()
+    timer.count("rows_read", 5)
+    timer.merge(worker.snapshot())
+    assert timer.counters == {"rows_read": 15}
+    assert set(timer.stages) == {"read_excel"}
+    assert timer.server_timing().startswith("read_excel;dur=")
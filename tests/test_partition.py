@@ -0,0 +1,47 @@
+"""
+Partición de filas pendientes: 201, 201.0 y '201' caen en el mismo grupo, los
+grupos conservan el orden y una etiqueta sin filas retorna un frame vacío.
+"""
+import pandas as pd
+
+from backend.partition import FramePartitioner, partition
+
+
+def _frame(movements):
+    return pd.DataFrame({
+        'Tipo Solicitud': ['Devolucion'] * len(movements),
+        'MOV_SAP': movements,
+        'fila': range(len(movements)),
+    })
+
+
+def test_movement_values_are_normalized():
+    df = _frame([201, 201.0, '201', 221, '221', 221.0])
+    parts = partition(df, 'movement')
+    assert set(parts) == {'201', '221'}
+    assert parts['201']['fila'].tolist() == [0, 1, 2]
+    assert parts['221']['fila'].tolist() == [3, 4, 5]
+
+
+def test_movement_values_are_normalized_in_categories():
+    df = _frame(['201', '201.0', '221', '201'])
+    df['MOV_SAP'] = df['MOV_SAP'].astype('category')
+    parts = partition(df, 'movement')
+    assert parts['201']['fila'].tolist() == [0, 1, 3]
+    assert parts['221']['fila'].tolist() == [2]
+
+
+def test_combined_keys_and_missing_labels():
+    df = _frame([221, 201, 221])
+    df.loc[1, 'Tipo Solicitud'] = 'Adicionar'
+    parts = FramePartitioner(df, ['operation', 'movement']).split('operation', 'movement')
+    assert parts[('Adicionar', '201')]['fila'].tolist() == [1]
+    assert parts[('Devolucion', '221')]['fila'].tolist() == [0, 2]
+    missing = parts[('Devolucion', '201')]
+    assert missing.empty and list(missing.columns) == list(df.columns)
+
+
+def test_single_group_reuses_the_frame():
+    df = _frame([221, '221'])
+    assert partition(df, 'movement')['221'] is df
+    assert partition(df.iloc[:0], 'movement') == {}
@@ -0,0 +1,168 @@
+"""
+Los mismos datos generan los mismos scripts sin importar el formato de entrada
+(.xlsx con cualquier lector, CSV, Parquet, stream de Arrow o registros JSON) y las
+mismas filas limpias, con el tipo de COLUMN_SCHEMA; un contenido que no es ninguno responde 415.
+"""
+import io
+from functools import partial
+
+import pandas as pd
+import pytest
+
+from backend import pipeline
+from backend.data_processor import COLUMN_SCHEMA, CSV_INT_COLUMNS, EXCEL_READERS, DataProcessor, UnsupportedFormatError, detect_file_format
+
+from .conftest import FILE_OUTPUT, SAP_USER, upload
+
+LAYOUTS = {
+    'emisiones': ('Sheet1', pipeline.build_emisiones_payload),
+    'solicitudes': ('DETALLE', pipeline.build_solicitudes_payload),
+}
+PROCESS = {'emisiones': 'process_emisiones_file', 'solicitudes': 'process_solicitudes_file'}
+
+
+def _typed_for_arrow(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas de texto con algún número (ELEMENTO PEP de los 201) como texto, igual que una exportación."""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def _to_csv(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _to_parquet(df: pd.DataFrame) -> bytes:
+    pytest.importorskip("pyarrow")
+    buffer = io.BytesIO()
+    _typed_for_arrow(df).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _to_arrow(df: pd.DataFrame) -> bytes:
+    pa = pytest.importorskip("pyarrow")
+    table = pa.Table.from_pandas(_typed_for_arrow(df), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _to_json(df: pd.DataFrame) -> bytes:
+    return df.to_json(orient="records", date_format="iso", force_ascii=False).encode("utf-8")
+
+
+CONVERTERS = {'csv': _to_csv, 'parquet': _to_parquet, 'arrow': _to_arrow, 'json': _to_json}
+RECORDS_CONTENT_TYPES = {'json': 'application/json', 'arrow': 'application/vnd.apache.arrow.stream'}
+
+
+@pytest.fixture(scope="module")
+def workbooks(emisiones_xlsx, solicitudes_xlsx) -> dict:
+    return {'emisiones': emisiones_xlsx, 'solicitudes': solicitudes_xlsx}
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("file_format", CONVERTERS)
+def test_formats_generate_the_same_scripts(workbooks, layout, file_format):
+    sheet_name, build = LAYOUTS[layout]
+    content = workbooks[layout]
+    df = pd.read_excel(io.BytesIO(content), sheet_name=sheet_name)
+    expected = build(content, SAP_USER, FILE_OUTPUT)
+    assert build(CONVERTERS[file_format](df), SAP_USER, FILE_OUTPUT) == expected
+
+
+def _cleaned(layout: str, content: bytes) -> pd.DataFrame:
+    return getattr(DataProcessor(streaming=True), PROCESS[layout])(io.BytesIO(content)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("file_format", CONVERTERS)
+def test_formats_clean_to_the_same_rows(workbooks, layout, file_format):
+    """Mismas columnas, valores y tipos que el .xlsx después de leer y limpiar."""
+    sheet_name, _ = LAYOUTS[layout]
+    content = workbooks[layout]
+    df = pd.read_excel(io.BytesIO(content), sheet_name=sheet_name)
+    pd.testing.assert_frame_equal(_cleaned(layout, CONVERTERS[file_format](df)), _cleaned(layout, content))
+
+
+@pytest.mark.parametrize("file_format", ['parquet', 'arrow'])
+def test_numbers_exported_as_text_are_normalized(workbooks, file_format):
+    """Un Parquet/Arrow con MOV_SAP y N° como texto queda igual que el .xlsx."""
+    content = workbooks['solicitudes']
+    df = pd.read_excel(io.BytesIO(content), sheet_name='DETALLE')
+    df = df.astype({col: str for col in CSV_INT_COLUMNS if col in df.columns})
+    pd.testing.assert_frame_equal(_cleaned('solicitudes', CONVERTERS[file_format](df)), _cleaned('solicitudes', content))
+
+
+@pytest.mark.parametrize("content", [b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + bytes(56), b'%PDF-1.7\n\x00\x01\x02'], ids=["xls", "pdf"])
+def test_unknown_content_is_rejected(client, content):
+    with pytest.raises(UnsupportedFormatError):
+        detect_file_format(io.BytesIO(content))
+    for endpoint, form in [("/emisiones/", {}), ("/solicitudes/", {}), ("/emisiones/stream", {'mov_type': '221'}), ("/solicitudes/stream", {'operation': 'add'})]:
+        response = upload(client, endpoint, content, **form)
+        assert response.status_code == 415, (endpoint, response.text)
+        assert "formato" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+@pytest.mark.parametrize("reader", [*EXCEL_READERS, "full"])
+def test_excel_readers_generate_the_same_scripts(workbooks, monkeypatch, layout, reader):
+    """Cada lector de .xlsx en modo streaming, y la lectura completa de la hoja (streaming=False)."""
+    if reader == "calamine":
+        pytest.importorskip("python_calamine")
+    _, build = LAYOUTS[layout]
+    content = workbooks[layout]
+    expected = build(content, SAP_USER, FILE_OUTPUT)
+    if reader == "full":
+        monkeypatch.setattr(pipeline, "DataProcessor", partial(DataProcessor, streaming=False))
+    else:
+        monkeypatch.setattr(pipeline, "DataProcessor", partial(DataProcessor, streaming=True, reader=reader))
+    assert build(content, SAP_USER, FILE_OUTPUT) == expected
+
+
+@pytest.mark.parametrize("records", RECORDS_CONTENT_TYPES)
+def test_records_endpoint_matches_the_upload(client, emisiones_xlsx, records):
+    df = pd.read_excel(io.BytesIO(emisiones_xlsx), sheet_name='Sheet1')
+    response = client.post(
+        "/emisiones/records", params={'sap_user': SAP_USER, 'file_output': FILE_OUTPUT},
+        content=CONVERTERS[records](df), headers={'Content-Type': RECORDS_CONTENT_TYPES[records]},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == upload(client, "/emisiones/", emisiones_xlsx).json()
+
+
+def test_records_endpoint_checks_the_body(client):
+    params = {'sap_user': SAP_USER, 'file_output': FILE_OUTPUT}
+    assert client.post("/emisiones/records", params=params, content=b"a,b", headers={'Content-Type': 'text/csv'}).status_code == 415
+    assert client.post("/emisiones/records", params=params, content=b"a,b", headers={'Content-Type': 'application/json'}).status_code == 400
+
+
+def test_unsupported_extension_is_rejected(client, emisiones_xlsx):
+    response = upload(client, "/emisiones/", emisiones_xlsx, filename="emisiones.xls")
+    assert response.status_code == 400
+    assert ".csv" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("file_format", ['xlsx', 'csv'])
+def test_cleaned_columns_follow_the_schema(workbooks, file_format):
+    content = workbooks['solicitudes']
+    if file_format == 'csv':
+        content = _to_csv(pd.read_excel(io.BytesIO(content), sheet_name='DETALLE'))
+    df = DataProcessor().process_solicitudes_file(io.BytesIO(content))
+
+    assert not df.empty
+    for col, kind in COLUMN_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if kind == 'category':
+            assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+        elif kind == 'int':
+            assert pd.api.types.is_integer_dtype(df[col]), col
+        elif kind == 'int_str':
+            assert df[col].map(lambda value: isinstance(value, str) and value.isdigit()).all(), col
+        elif kind == 'almacen':
+            assert df[col].map(lambda value: len(value) == 4 and value.isdigit()).all(), col
@@ -0,0 +1,72 @@
+"""
+Reparto de POs/VRs entre sesiones de SAP GUI: shards balanceados por pasos, grupos
+enteros y en su orden, nombres _sN estables y un archivo de VRs por sesión.
+"""
+import re
+
+import pandas as pd
+import pytest
+
+from backend import pipeline
+from backend.sharding import partition_groups, shard_file_output
+
+from .conftest import FILE_OUTPUT, SAP_USER, generate, scripts_of, upload
+
+PO_CODE = re.compile(r'^poCode = "([^"]*)"$', re.M)
+
+
+def test_partition_keeps_groups_whole_and_balanced():
+    sizes = [9, 1, 4, 4, 2, 7, 3, 3, 5, 1, 6, 2]
+    df = pd.DataFrame({'PO': [f"PO{i}" for i, size in enumerate(sizes) for _ in range(size)]})
+    df['fila'] = range(len(df))
+
+    shards = partition_groups(df, 'PO', 3, 18, 5)
+    assert len(shards) == 3
+    assert sorted(po for shard in shards for po in shard['PO'].unique()) == sorted(df['PO'].unique())
+    for shard in shards:
+        # Cada PO entero en un solo shard y en el orden del archivo
+        assert list(shard['fila']) == sorted(shard['fila'])
+        assert all((df['PO'] == po).sum() == (shard['PO'] == po).sum() for po in shard['PO'].unique())
+    loads = [18 * shard['PO'].nunique() + 5 * len(shard) for shard in shards]
+    # El reparto greedy deja las cargas a menos de un grupo (el más grande) de distancia
+    assert max(loads) - min(loads) <= 18 + 5 * max(sizes)
+
+
+def test_partition_never_returns_empty_shards():
+    df = pd.DataFrame({'PO': ['a', 'a', 'b']})
+    assert [list(shard['PO']) for shard in partition_groups(df, 'PO', 6, 18, 5)] == [['a', 'a'], ['b']]
+    assert partition_groups(df, 'PO', 1, 18, 5)[0] is df
+
+
+@pytest.mark.parametrize("file_output, shard, expected", [
+    (r"C:\SAP\Reservas.txt", 0, r"C:\SAP\Reservas_s1.txt"),
+    (r"C:\SAP\Reservas.txt", 2, r"C:\SAP\Reservas_s3.txt"),
+    (r"C:\SAP.2025\Reservas", 0, r"C:\SAP.2025\Reservas_s1"),
+    ("reservas.v2.txt", 1, "reservas.v2_s2.txt"),
+])
+def test_shard_file_output(file_output, shard, expected):
+    assert shard_file_output(file_output, shard) == expected
+
+
+def test_sessions_split_each_script(client, emisiones_xlsx):
+    single = generate(client, "/emisiones/", emisiones_xlsx)
+    sharded = generate(client, "/emisiones/", emisiones_xlsx, sessions=3)
+    for mov_type in ('221', '201'):
+        names = sorted(name for name in sharded if name.startswith(f"{mov_type}_s"))
+        assert names == [f"{mov_type}_s{k}" for k in range(1, len(names) + 1)] and len(names) > 1
+
+        pos = []
+        for k, name in enumerate(names):
+            script = sharded[name]
+            assert f"connection.Children({k})" in script
+            assert f"Reservas_s{k + 1}.txt" in script
+            pos.extend(PO_CODE.findall(script))
+        # Cada PO aparece en un solo shard y ninguno se pierde
+        assert sorted(pos) == sorted(PO_CODE.findall(single[mov_type]))
+    # Recalculado fuera de la caché da los mismos nombres y scripts
+    assert scripts_of(pipeline.build_emisiones_payload(emisiones_xlsx, SAP_USER, FILE_OUTPUT, sessions=3)) == sharded
+
+
+def test_sessions_out_of_range_are_rejected(client, emisiones_xlsx):
+    assert upload(client, "/emisiones/", emisiones_xlsx, sessions=0).status_code == 400
+    assert upload(client, "/emisiones/", emisiones_xlsx, sessions=7).status_code == 400
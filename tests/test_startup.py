@@ -0,0 +1,73 @@
+"""
+Arranque en frío del API: backend.main no debe importar los módulos pesados y su
+importación debe quedar bajo el presupuesto (SAP_STARTUP_BUDGET_MS, por defecto
+1000 ms; benchmarks/bench_startup.py mide lo mismo con más detalle). Los módulos
+diferidos (backend/lazy.py) se cargan una sola vez aunque varios hilos los usen a la vez.
+"""
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks.bench_startup import HEAVY_MODULES, probe
+
+STARTUP_BUDGET_MS = float(os.getenv("SAP_STARTUP_BUDGET_MS", "1000"))
+RUNS = 3
+
+
+@pytest.fixture(scope="module")
+def cold_starts() -> list:
+    return [probe() for _ in range(RUNS)]
+
+
+def test_no_heavy_modules_at_startup(cold_starts):
+    imported = sorted({name for result in cold_starts for name in result["heavy_modules"]})
+    assert not imported, f"backend.main importó al arrancar: {', '.join(imported)} (de {', '.join(HEAVY_MODULES)})"
+
+
+def test_first_request_is_served(cold_starts):
+    assert all(result["status"] == 200 for result in cold_starts)
+
+
+def test_import_time_under_budget(cold_starts):
+    import_ms = statistics.median(result["import_ms"] for result in cold_starts)
+    assert import_ms < STARTUP_BUDGET_MS, f"import backend.main: {import_ms:.1f} ms (presupuesto {STARTUP_BUDGET_MS:g} ms)"
+
+
+def _run(code: str) -> str:
+    """Ejecuta el código en un intérprete nuevo (sin módulos ya importados) y retorna su salida."""
+    root = Path(__file__).resolve().parent.parent
+    return subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+
+
+def test_data_processor_defers_heavy_modules():
+    output = _run(
+        "import sys, types\n"
+        "import backend.data_processor\n"
+        f"print([n for n in {HEAVY_MODULES!r} if type(sys.modules.get(n)) is types.ModuleType])\n"
+    )
+    assert output.strip() == "[]", f"backend.data_processor importó: {output.strip()}"
+
+
+def test_concurrent_first_access_waits_for_the_load():
+    output = _run(
+        "import threading\n"
+        "from backend.lazy import lazy_import\n"
+        "pd = lazy_import('pandas')\n"
+        "barrier = threading.Barrier(8)\n"
+        "errors = []\n"
+        "def use():\n"
+        "    barrier.wait()\n"
+        "    try:\n"
+        "        pd.DataFrame({'a': [1]})\n"
+        "    except Exception as e:\n"
+        "        errors.append(repr(e))\n"
+        "threads = [threading.Thread(target=use) for _ in range(8)]\n"
+        "for t in threads: t.start()\n"
+        "for t in threads: t.join()\n"
+        "print(errors)\n"
+    )
+    assert output.strip() == "[]", output
@@ -0,0 +1,31 @@
+"""
+/emisiones/stream y /solicitudes/stream envían en trozos el mismo script que la
+respuesta JSON (los scripts de referencia de tests/golden/baseline).
+"""
+import pytest
+
+from .conftest import assert_golden, upload
+
+
+def _stream(client, endpoint: str, content: bytes, **form) -> str:
+    response = upload(client, endpoint, content, **form)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/plain")
+    return response.text
+
+
+@pytest.mark.parametrize("mov_type", ['221', '201'])
+def test_stream_emisiones(client, emisiones_xlsx, mov_type):
+    script = _stream(client, "/emisiones/stream", emisiones_xlsx, mov_type=mov_type)
+    assert_golden(f"baseline/{mov_type}.vbs", script)
+
+
+@pytest.mark.parametrize("operation", ['222', '202', 'add', 'mod', 'del', 'sfin'])
+def test_stream_solicitudes(client, solicitudes_xlsx, operation):
+    script = _stream(client, "/solicitudes/stream", solicitudes_xlsx, operation=operation)
+    assert_golden(f"baseline/{operation}.vbs", script)
+
+
+def test_stream_rejects_unknown_operation(client, solicitudes_xlsx):
+    assert upload(client, "/solicitudes/stream", solicitudes_xlsx, operation='999').status_code == 400
+    assert upload(client, "/emisiones/stream", solicitudes_xlsx, mov_type='999').status_code == 400
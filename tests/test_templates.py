@@ -0,0 +1,60 @@
+"""
+Plantillas VBS compiladas: constantes resueltas al compilar, huecos variables al
+renderizar, y un registro por centro.
+"""
+from backend.templates import SCREENS, Template, get_registry
+
+
+def test_constants_are_resolved_at_compile_time():
+    template = Template('session.findById("{items}/txtRESB-ERFMG[{row},26]").text = "{quantity}"', SCREENS)
+    assert template.slots == ('row', 'quantity')
+    assert template.render(row=2, quantity='15') == f'session.findById("{SCREENS["items"]}/txtRESB-ERFMG[2,26]").text = "15"'
+
+
+def test_block_without_slots_is_plain_text():
+    template = Template('session.findById("{items}").setFocus', SCREENS)
+    assert template.slots == ()
+    assert template.render() == template.text == f'session.findById("{SCREENS["items"]}").setFocus'
+
+
+def test_literal_braces_survive():
+    template = Template('x = "{{literal}}" & "{value}"', {})
+    assert template.render(value='v') == 'x = "{literal}" & "v"'
+    assert template.render_rows(value=['a', 'b']) == ['x = "{literal}" & "a"', 'x = "{literal}" & "b"']
+
+
+def test_render_rows_matches_render_per_row():
+    template = get_registry()['MB21']['item_material']
+    columns = {'row': [0, 1, 2], 'material': ['10', '20', '30'], 'quantity': ['1', '2', '3'], 'store': ['0004'] * 3}
+    rows = [template.render(**{slot: values[i] for slot, values in columns.items()}) for i in range(3)]
+    assert template.render_rows(**columns) == rows
+
+
+def test_render_count_repeats_rows_and_is_cached():
+    template = get_registry()['MB21']['item_check']
+    block = template.render_count(3)
+    assert block == "\n".join(template.render(row=row) for row in range(3))
+    assert template.render_count(3) is block
+
+
+def test_registry_per_plant():
+    assert get_registry('PE07') is get_registry('PE07')
+    start = get_registry('PE07')['MB21']['start'].render(mov_type='221')
+    assert 'ctxtRM07M-WERKS").text = "PE07"' in start
+    assert 'PE07' not in get_registry()['MB21']['start'].render(mov_type='221')
+    # Cada transacción trae también los bloques comunes
+    assert {'header', 'enter', 'save', 'back'} <= set(get_registry()['MB22'])
+
+
+def test_render_expr_joins_only_non_empty_segments():
+    template = Template('session.findById("{items}/txtRESB-ERFMG[{row},26]").text = "{quantity}"', SCREENS)
+    assert template.render_expr(row='i', quantity='q(i)') == \
+        f'session.findById("{SCREENS["items"]}/txtRESB-ERFMG[" & i & ",26]").text = q(i)'
+    assert Template('x = "{a}{b}"', {}).render_expr(a='p', b='r') == 'x = p & r'
+    assert Template('x = "{a}" & y', {}).render_expr(values={'a': ''}) == 'x = "" & y'
+
+
+def test_render_expr_keeps_literal_text():
+    # Texto del literal que se parece a una concatenación vacía no se toca
+    template = Template('x = "a"" & ""b{v}" : y = "{w}"', {})
+    assert template.render_expr(values={'w': 'c'}, v='n') == 'x = "a"" & ""b" & n : y = "c"'
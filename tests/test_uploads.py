@@ -0,0 +1,87 @@
+"""
+Límite y volcado a disco de las subidas: los cuerpos de más de max_bytes reciben 413
+(con o sin Content-Length) y las subidas de más de spool_bytes se guardan en un
+temporal con nombre sin cambiar los scripts.
+"""
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.cache import result_cache
+from backend.main import app
+from backend.uploads import UploadLimitMiddleware, read_upload, spool_chunks
+
+from .conftest import FILE_OUTPUT, SAP_USER, assert_golden, generate, upload
+
+LIMIT = 4 * 1024
+
+
+@pytest.fixture
+def limited_client() -> TestClient:
+    return TestClient(UploadLimitMiddleware(app, max_bytes=LIMIT))
+
+
+def test_content_length_over_the_limit_is_rejected(limited_client, emisiones_xlsx):
+    assert len(emisiones_xlsx) > LIMIT
+    response = upload(limited_client, "/emisiones/", emisiones_xlsx)
+    assert response.status_code == 413
+    assert "tamaño máximo" in response.json()["detail"]
+
+
+def test_chunked_body_over_the_limit_is_rejected(limited_client):
+    def body():
+        yield b"["
+        for _ in range(64):
+            yield b'{"PO": "2025-540000001", "Codigo Material": 10402551067},' * 8
+        yield b"{}]"
+
+    response = limited_client.post(
+        "/emisiones/records", params={'sap_user': SAP_USER, 'file_output': FILE_OUTPUT},
+        content=body(), headers={'Content-Type': 'application/json'},
+    )
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
+    assert "tamaño máximo" in response.json()["detail"]
+
+
+async def _chunks(content: bytes, size: int):
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
+
+
+async def test_spool_chunks_writes_large_uploads_to_disk(emisiones_xlsx):
+    async with await spool_chunks(_chunks(emisiones_xlsx, 1000), spool_bytes=4096) as spooled:
+        assert spooled.content is None and os.path.exists(spooled.path)
+        with open(spooled.path, "rb") as f:
+            assert f.read() == emisiones_xlsx
+        assert spooled.digest == hashlib.sha256(emisiones_xlsx).hexdigest()
+        assert spooled.size == len(emisiones_xlsx)
+        path = spooled.path
+    assert not os.path.exists(path)
+
+    in_memory = await spool_chunks(_chunks(emisiones_xlsx, 1000))
+    assert in_memory.path is None and in_memory.content == emisiones_xlsx
+
+    with pytest.raises(HTTPException) as error:
+        await spool_chunks(_chunks(emisiones_xlsx, 1000), max_bytes=4096)
+    assert error.value.status_code == 413
+
+
+def test_spooled_upload_generates_the_same_scripts(client, monkeypatch, emisiones_xlsx):
+    paths = []
+
+    async def spooling_read_upload(file):
+        spooled = await read_upload(file, spool_bytes=1024)
+        paths.append(spooled.path)
+        return spooled
+
+    monkeypatch.setattr(main, "read_upload", spooling_read_upload)
+    result_cache.clear()
+    scripts = generate(client, "/emisiones/", emisiones_xlsx)
+    assert paths and paths[0] is not None and not os.path.exists(paths[0])
+    for mov_type in ('221', '201'):
+        assert_golden(f"baseline/{mov_type}.vbs", scripts[mov_type])